@@ -10,19 +10,41 @@ import os
 import traceback
 import jwt
 import re
+import time
+import json
+import uuid
+import hashlib
+import mimetypes
 import random
+import bisect
 import logging
-from logging.handlers import TimedRotatingFileHandler
+import threading
+from collections import OrderedDict, namedtuple
 from datetime import datetime, timedelta
+from urllib.parse import quote
 
-from flask import Flask, request, jsonify, g, send_from_directory, render_template, redirect
+from flask import Flask, request, jsonify, g, send_from_directory, send_file, render_template, redirect, abort
+from flask import Response, stream_with_context, has_request_context
+from flask.logging import default_handler
 from flask_sqlalchemy import SQLAlchemy
+from werkzeug.security import safe_join
 from flask_cors import CORS
-from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from sqlalchemy import func, or_, and_, event
+from sqlalchemy.engine import Engine
+from decimal import Decimal
 
 from config import Config
-from utils import log_operation
+from utils import log_operation, encode_cursor, decode_cursor, generate_bill_number, set_operation_log_writer
+from cache import GenerationStamp, VersionedCache
+from db_pool import MonitoredQueuePool, pool_stats
+from db_routing import RoutingSession, primary_pins, REPLICA_BIND
+from metrics import MetricsRegistry
+from oplog_writer import OperationLogWriter
+from app_logging import setup_queue_logging
+from assets import AssetManifest, is_fingerprinted
+from order_events import OrderEventBroker
+from pricing import PricingEngine, PricingError, cents_to_decimal, parse_cents
 
 # ========== 初始化Flask应用 ==========
 basedir = os.path.abspath(os.path.dirname(__file__))
@@ -38,15 +60,18 @@ app.config.from_object(Config)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-2025-wjwy-system')
 app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'jwt-dev-secret-2025-wjwy-system')
 
+# 连接池使用带等待统计的 QueuePool（参数见 Config.SQLALCHEMY_ENGINE_OPTIONS）
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = dict(Config.SQLALCHEMY_ENGINE_OPTIONS, poolclass=MonitoredQueuePool)
+
 # 允许跨域请求，支持凭证（用于开发环境）
 CORS(app, resources={r"/api/*": {"origins": "*", "supports_credentials": True}})
 
-# 数据库初始化
-db = SQLAlchemy(app)
+# 数据库初始化（RoutingSession 负责读写分离，未配置从库时全部走主库）
+db = SQLAlchemy(app, session_options={'class_': RoutingSession})
 
 # ========== 日志配置 ==========
 def setup_logging():
-    """配置日志轮转：每天一个日志文件，保留7天"""
+    """配置日志：经队列由后台线程写入 logs/app.log（JSON 每行一条），每天轮转，保留7天"""
     # 创建日志目录
     log_dir = os.path.join(basedir, 'logs')
     if not os.path.exists(log_dir):
@@ -55,36 +80,112 @@ def setup_logging():
     # 配置日志文件路径
     log_file = os.path.join(log_dir, 'app.log')
     
-    # 创建时间轮转处理器：每天午夜轮转，保留7天备份
-    file_handler = TimedRotatingFileHandler(
+    # 请求线程只入队，文件写入与轮转在后台线程完成；多个 worker 轮转时加文件锁
+    queue_handler = setup_queue_logging(
+        app.logger,
         log_file,
-        when='midnight',  # 每天午夜轮转
-        interval=1,       # 每天一次
-        backupCount=7,    # 保留7天备份
-        encoding='utf-8'
+        level=logging.INFO,
+        backup_count=7,
+        maxsize=Config.LOG_QUEUE_SIZE
     )
     
-    # 设置日志格式
-    formatter = logging.Formatter(
-        '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
-    )
-    file_handler.setFormatter(formatter)
-    file_handler.setLevel(logging.INFO)
+    # 去掉 Flask 默认的控制台输出，避免请求线程同步写 stderr
+    app.logger.removeHandler(default_handler)
     
-    # 配置应用日志
-    app.logger.addHandler(file_handler)
-    app.logger.setLevel(logging.INFO)
+    # 项目模块（操作日志写入器、utils）的日志经同一队列写入 app.log
+    for name in ('oplog_writer', 'utils'):
+        module_logger = logging.getLogger(name)
+        module_logger.addHandler(queue_handler)
+        module_logger.setLevel(logging.INFO)
     
     # 减少第三方库的日志级别
     logging.getLogger('werkzeug').setLevel(logging.WARNING)
     
     app.logger.info('公寓物业收费系统启动')
-    return file_handler
+    return queue_handler
 
 # 初始化日志
-file_handler = setup_logging()
+log_handler = setup_logging()
+
+@app.before_request
+def start_request_logging():
+    """分配请求ID，并按接口采样决定本次请求的 INFO 日志是否输出"""
+    g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex[:16]
+    rate = Config.LOG_SAMPLE_RATES.get(request.endpoint, 1.0)
+    g.log_sampled = rate >= 1.0 or random.random() < rate
+
+@app.after_request
+def add_request_id_header(response):
+    if 'request_id' in g:
+        response.headers['X-Request-ID'] = g.request_id
+    return response
+
+# ========== 请求指标（Prometheus /metrics）==========
+# 每个请求记录：总耗时、数据库耗时、SQL 条数、响应字节数，按 endpoint 分组
+metrics_registry = MetricsRegistry(Config.METRICS_DIR, dump_interval=Config.METRICS_DUMP_INTERVAL)
+REQUEST_DURATION = metrics_registry.histogram(
+    'wjwy_http_request_duration_seconds', '请求总耗时（秒）',
+    (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10), ('endpoint', 'method', 'status'))
+REQUEST_DB_DURATION = metrics_registry.histogram(
+    'wjwy_http_request_db_seconds', '单个请求内执行 SQL 的累计耗时（秒）',
+    (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5), ('endpoint',))
+REQUEST_DB_QUERIES = metrics_registry.histogram(
+    'wjwy_http_request_db_queries', '单个请求执行的 SQL 条数（偏大说明存在 N+1 查询）',
+    (0, 1, 2, 3, 5, 10, 20, 50, 100, 200), ('endpoint',))
+RESPONSE_BYTES = metrics_registry.histogram(
+    'wjwy_http_response_bytes', '响应体大小（字节，流式导出不计）',
+    (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304), ('endpoint',))
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['query_started'] = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop('query_started', None)
+    if started is not None and has_request_context() and 'request_started' in g:
+        g.db_time += time.perf_counter() - started
+        g.db_queries += 1
+
+
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    g.db_time = 0.0
+    g.db_queries = 0
+
+
+@app.after_request
+def record_request_metrics(response):
+    if 'request_started' not in g:
+        return response
+    endpoint = request.endpoint or 'unmatched'
+    REQUEST_DURATION.labels(endpoint, request.method, response.status_code).observe(
+        time.perf_counter() - g.request_started)
+    REQUEST_DB_DURATION.labels(endpoint).observe(g.db_time)
+    REQUEST_DB_QUERIES.labels(endpoint).observe(g.db_queries)
+    if not response.is_streamed:
+        RESPONSE_BYTES.labels(endpoint).observe(response.calculate_content_length() or 0)
+    metrics_registry.dump()
+    return response
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus 抓取接口，合并本机所有 worker 的指标；仅允许 METRICS_ALLOWED_IPS 访问"""
+    if request.remote_addr not in Config.METRICS_ALLOWED_IPS:
+        abort(403)
+    metrics_registry.dump(force=True)
+    return Response(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 # ========== 数据模型定义 (ORM) ==========
+# 用户权限快照：与 User 同名字段的只读副本，作为 g.current_user 使用
+UserSnapshot = namedtuple('UserSnapshot', [
+    'ID', 'USERNAME', '用户姓名', 'COMMUNITY', '小区编号', 'Role', 'Edit', 'Read', 'Report'
+])
+
 class User(db.Model):
     """用户表模型"""
     __tablename__ = 'users'
@@ -101,6 +202,20 @@ class User(db.Model):
     Read = db.Column(db.Boolean, default=True, comment='读取权限')
     Report = db.Column(db.Boolean, default=False, comment='报表权限')
     
+    def snapshot(self):
+        """生成权限快照（token_required 缓存使用）"""
+        return UserSnapshot(
+            ID=self.ID,
+            USERNAME=self.USERNAME,
+            用户姓名=self.用户姓名,
+            COMMUNITY=self.COMMUNITY,
+            小区编号=self.小区编号,
+            Role=self.Role,
+            Edit=bool(self.Edit),
+            Read=bool(self.Read),
+            Report=bool(self.Report)
+        )
+    
     def to_dict(self):
         """转换为字典格式"""
         return {
@@ -120,6 +235,10 @@ class User(db.Model):
 class Address(db.Model):
     """地址表模型"""
     __tablename__ = 'addresses'
+    __table_args__ = (
+        # 地址选择器按小区列楼栋、按楼栋列房间
+        db.Index('ix_addresses_community_building', '小区编号', '楼栋号'),
+    )
     
     ID = db.Column(db.Integer, primary_key=True, comment='地址唯一标识')
     小区编号 = db.Column(db.Integer, nullable=False, comment='关联users表中的小区编号')
@@ -142,6 +261,14 @@ class Address(db.Model):
 class Order(db.Model):
     """订单表模型"""
     __tablename__ = 'orders'
+    __table_args__ = (
+        # 今日记录、今日合计、订单查询：按小区 + 录入时间范围过滤并倒序
+        db.Index('ix_orders_community_time', '小区ID', '录入时间'),
+        # 历史缴费记录、按地址关联查询：按地址 + 录入时间倒序
+        db.Index('ix_orders_address_time', '地址ID', '录入时间'),
+        # 管理员不限小区的时间范围查询
+        db.Index('ix_orders_time', '录入时间'),
+    )
     
     订单ID = db.Column(db.Integer, primary_key=True, comment='订单唯一标识')
     账单号 = db.Column(db.String(50), unique=True, nullable=False, comment='系统生成的唯一账单号')
@@ -177,6 +304,9 @@ class Order(db.Model):
     # 关系（便于查询）
     地址 = db.relationship('Address', backref='orders', lazy='joined')
     操作员 = db.relationship('User', backref='orders', lazy='joined')
+    # 费用明细（order_items），删除订单时一并删除
+    明细 = db.relationship('OrderItem', backref='订单', lazy='select', cascade='all, delete-orphan',
+                         order_by='OrderItem.明细ID')
     
     def to_dict(self):
         """转换为字典格式（简洁版，用于列表）"""
@@ -210,6 +340,27 @@ class Order(db.Model):
             '红冲': self.红冲
         }
 
+class OrderItem(db.Model):
+    """
+    订单费用明细表：每个费用项一行，与 orders 的宽列（电费度数/电费金额 …）双写
+    宽列仍是准据，历史订单由 order_items.py backfill 回填；旧报表可读兼容视图 order_fee_columns
+    """
+    __tablename__ = 'order_items'
+    __table_args__ = (
+        # 从订单关联明细、按费用类型汇总
+        db.Index('ix_order_items_order_type', '订单ID', '费用类型'),
+    )
+    
+    明细ID = db.Column(db.Integer, primary_key=True, comment='明细唯一标识')
+    订单ID = db.Column(db.Integer, db.ForeignKey('orders.订单ID', ondelete='CASCADE'), nullable=False, comment='关联orders表的订单ID')
+    费用类型 = db.Column(db.String(20), nullable=False, comment='费用类型，与 FEE_MAPPING 的键一致（electricity 等）')
+    数量 = db.Column(db.Numeric(10, 2), comment='度数/吨数/月数，红冲订单与原订单相同')
+    单价 = db.Column(db.Numeric(12, 4), comment='开单时的单价')
+    金额 = db.Column(db.Numeric(10, 2), nullable=False, default=0.00, comment='金额，红冲与退费为负')
+    车牌号 = db.Column(db.String(30), nullable=True, comment='停车费：车牌号')
+    停车开始日期 = db.Column(db.Date, nullable=True, comment='停车费：开始日期')
+    停车结束日期 = db.Column(db.Date, nullable=True, comment='停车费：结束日期')
+
 class FeePrice(db.Model):
     """各小区收费单价配置表模型 - 列存储结构（已修改）"""
     __tablename__ = 'fee_prices'
@@ -242,9 +393,40 @@ class FeePrice(db.Model):
             'updated_at': self.updated_at.strftime('%Y-%m-%d %H:%M:%S') if self.updated_at else None
         }
 
+class FeePriceVersion(db.Model):
+    """
+    收费标准历史：每次单价变化追加一行，(小区, 费用类型) 的各版本按生效时间首尾相接
+    某一时刻的单价 = 生效时间 <= 该时刻的最后一个版本，由唯一索引做一次有序查找
+    """
+    __tablename__ = 'fee_price_versions'
+    __table_args__ = (
+        db.UniqueConstraint('community_id', 'fee_type', 'effective_from', name='ux_fee_price_versions_lookup'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True, comment='版本唯一标识')
+    community_id = db.Column(db.Integer, nullable=False, comment='小区编号，与fee_prices.id一致')
+    fee_type = db.Column(db.String(20), nullable=False, comment='费用类型，与 FEE_MAPPING 的键一致')
+    price = db.Column(db.Numeric(10, 2), nullable=True, comment='单价，NULL 表示收费标准已删除')
+    effective_from = db.Column(db.DateTime, nullable=False, comment='生效时间')
+    created_by = db.Column(db.String(50), comment='修改人账号')
+    created_at = db.Column(db.TIMESTAMP, server_default=db.func.current_timestamp())
+    
+    def to_dict(self):
+        return {
+            'feeType': self.fee_type,
+            'price': float(self.price) if self.price is not None else None,
+            'effectiveFrom': self.effective_from.strftime('%Y-%m-%d %H:%M:%S'),
+            'createdBy': self.created_by
+        }
+
 class OperationLog(db.Model):
     """操作日志表模型"""
     __tablename__ = 'operation_logs'
+    __table_args__ = (
+        # 操作日志按时间倒序分页
+        db.Index('ix_operation_logs_time', '操作时间'),
+        db.Index('ix_operation_logs_user_time', '用户账号', '操作时间'),
+    )
     
     ID = db.Column(db.Integer, primary_key=True, comment='日志唯一标识')
     用户账号 = db.Column(db.String(50), nullable=False, comment='操作用户的USERNAME')
@@ -255,7 +437,61 @@ class OperationLog(db.Model):
     操作详情 = db.Column(db.Text, comment='更详细的信息')
     小区编号 = db.Column(db.Integer, comment='操作用户所属的小区编号')
 
+class DailySummary(db.Model):
+    """日收款汇总表：按 (日期, 小区ID, 收款方式) 累计，随订单写入在同一事务内更新"""
+    __tablename__ = 'daily_summaries'
+    
+    日期 = db.Column(db.Date, primary_key=True, comment='订单录入日期')
+    小区ID = db.Column(db.Integer, primary_key=True, autoincrement=False, comment='与orders.小区ID一致')
+    收款方式 = db.Column(db.String(20), primary_key=True, default='', comment='收款方式，空值记为空字符串')
+    订单数 = db.Column(db.Integer, nullable=False, default=0, comment='订单笔数')
+    收款合计 = db.Column(db.Numeric(14, 2), nullable=False, default=0.00, comment='收款金额合计')
+
+class ReportRollup(db.Model):
+    """
+    报表汇总表：按 (日期, 小区ID, 费用类型, 收款方式, 操作员ID) 累计，随订单写入在同一事务内更新
+    费用类型为 FEE_MAPPING 的键（electricity 等）时统计该费用项；为 total 时统计整单（笔数、收款金额）
+    """
+    __tablename__ = 'report_rollups'
+    __table_args__ = (
+        # 非管理员只能查自己小区：按小区 + 日期范围过滤
+        db.Index('ix_report_rollups_community_day', '小区ID', '日期'),
+    )
+    
+    日期 = db.Column(db.Date, primary_key=True, comment='订单录入日期')
+    小区ID = db.Column(db.Integer, primary_key=True, autoincrement=False, comment='与orders.小区ID一致')
+    费用类型 = db.Column(db.String(20), primary_key=True, comment='费用类型，total 为整单合计')
+    收款方式 = db.Column(db.String(20), primary_key=True, default='', comment='收款方式，空值记为空字符串')
+    操作员ID = db.Column(db.Integer, primary_key=True, autoincrement=False, comment='与orders.操作员ID一致')
+    订单数 = db.Column(db.Integer, nullable=False, default=0, comment='包含该费用项的订单笔数')
+    数量合计 = db.Column(db.Numeric(14, 2), nullable=False, default=0.00, comment='度数/吨数/月数合计，红冲与退费为负')
+    金额合计 = db.Column(db.Numeric(14, 2), nullable=False, default=0.00, comment='金额合计')
+
+# ========== 操作日志异步写入 ==========
+def write_operation_logs(rows):
+    """后台线程调用：一次 executemany 插入一批操作日志"""
+    with app.app_context():
+        with db.engine.begin() as conn:
+            conn.execute(OperationLog.__table__.insert(), rows)
+
+operation_log_writer = OperationLogWriter(
+    write_operation_logs,
+    maxsize=Config.OPLOG_QUEUE_SIZE,
+    batch_size=Config.OPLOG_BATCH_SIZE,
+    flush_interval_ms=Config.OPLOG_FLUSH_INTERVAL_MS,
+    enqueue_timeout_ms=Config.OPLOG_ENQUEUE_TIMEOUT_MS
+)
+set_operation_log_writer(operation_log_writer)
+
 # ========== 身份验证装饰器 ==========
+# 已登录用户的权限快照缓存：用户信息修改后失效，60秒过期兜住直接改库的情况
+user_cache = VersionedCache(GenerationStamp('users'), maxsize=1024, ttl=60)
+
+def load_user_snapshot(user_id):
+    """从数据库读取用户权限快照，用户不存在时返回 None"""
+    user = db.session.get(User, user_id)
+    return user.snapshot() if user else None
+
 def token_required(f):
     """验证JWT令牌的装饰器 - 用于API接口保护"""
     from functools import wraps
@@ -277,9 +513,9 @@ def token_required(f):
             return jsonify({'status': 'error', 'message': '访问需要令牌'}), 401
         
         try:
-            # 解码令牌
+            # 解码令牌（不指定 audience：带 aud 声明的专用票据，如订单推送票据，在这里被拒绝）
             data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
-            current_user = User.query.get(data['user_id'])
+            current_user = user_cache.get(data['user_id'], lambda: load_user_snapshot(data['user_id']))
             
             if current_user is None:
                 return jsonify({'status': 'error', 'message': '用户不存在'}), 401
@@ -300,6 +536,21 @@ def token_required(f):
     
     return decorated
 
+def read_replica(f):
+    """
+    只读接口装饰器：本次请求的查询走从库（需放在 token_required 之后）
+    当前用户刚写入过数据时仍走主库，保证能查到自己刚录入的订单
+    """
+    from functools import wraps
+    
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        g.use_replica = (REPLICA_BIND in db.engines
+                         and not primary_pins.is_pinned(g.current_user.ID))
+        return f(*args, **kwargs)
+    
+    return decorated
+
 # ========== 辅助函数 ==========
 def get_default_prices():
     """返回默认价格字典"""
@@ -313,11 +564,796 @@ def get_default_prices():
         "management": 0.00
     }
 
+# 收费标准缓存：按小区编号缓存，管理端写操作后通过版本文件失效
+fee_price_stamp = GenerationStamp('fee_prices')
+fee_price_cache = VersionedCache(fee_price_stamp, maxsize=512)
+
+# 费用类型 -> FeePrice 单价字段
+FEE_PRICE_FIELDS = {
+    'electricity': 'electricity',
+    'coldWater': 'coldWater',
+    'hotWater': 'hotWater',
+    'network': 'network',
+    'parking': 'parking',
+    'rent': 'rent_fee',
+    'management': 'manage_fee'
+}
+
+class PriceTimeline:
+    """一个小区各费用类型的单价时间线，按生效时间二分查找某一时刻的单价"""
+    
+    def __init__(self, versions):
+        # versions 已按 (生效时间, id) 排序，同一时刻的多个版本以最后写入的为准
+        self._times = {}
+        self._prices = {}
+        for version in versions:
+            self._times.setdefault(version.fee_type, []).append(version.effective_from)
+            self._prices.setdefault(version.fee_type, []).append(version.price)
+    
+    def __bool__(self):
+        return bool(self._times)
+    
+    def price_at(self, fee_type, moment):
+        """返回 moment 时生效的单价（Decimal）；当时尚无版本或收费标准已删除时返回 None"""
+        times = self._times.get(fee_type)
+        if not times:
+            return None
+        index = bisect.bisect_right(times, moment) - 1
+        return self._prices[fee_type][index] if index >= 0 else None
+    
+    def prices_at(self, moment):
+        return {fee_type: self.price_at(fee_type, moment) for fee_type in self._times}
+
+# 单价时间线缓存：与收费标准缓存共用版本号，收费标准任一写操作后一并失效
+price_timeline_cache = VersionedCache(fee_price_stamp, maxsize=512)
+
+def price_timeline_query(community_id):
+    return (FeePriceVersion.query
+            .filter(FeePriceVersion.community_id == community_id)
+            .order_by(FeePriceVersion.effective_from, FeePriceVersion.id))
+
+def load_price_timeline(community_id):
+    return PriceTimeline(price_timeline_query(community_id).all())
+
+def get_price_timeline(community_id):
+    return price_timeline_cache.get(community_id, lambda: load_price_timeline(community_id))
+
+# 计价引擎缓存：按小区当前收费标准构建，与收费标准缓存共用版本号
+pricing_engine_cache = VersionedCache(fee_price_stamp, maxsize=512)
+
+def load_pricing_engine(community_id):
+    fee_price = FeePrice.query.filter_by(id=community_id).first()
+    if not fee_price:
+        return PricingEngine({})
+    return PricingEngine({fee_type: getattr(fee_price, field) for fee_type, field in FEE_PRICE_FIELDS.items()})
+
+def get_pricing_engine(community_id):
+    return pricing_engine_cache.get(community_id, lambda: load_pricing_engine(community_id))
+
+def sync_fee_price_versions(fee_prices, operator, effective_from=None):
+    """
+    收费标准写入后、提交前调用：与各小区最新版本比较，单价有变化的费用类型追加一条版本
+    fee_prices 为 FeePrice 对象列表；删除收费标准时传入 (小区编号, None) 元组记录停用
+    """
+    # 精确到秒（MySQL DATETIME）；同一秒内的多次修改以最后一次为准
+    effective_from = (effective_from or datetime.now()).replace(microsecond=0)
+    db.session.flush()
+    community_ids = [fee_price.id if isinstance(fee_price, FeePrice) else fee_price[0] for fee_price in fee_prices]
+    latest = {}
+    for offset in range(0, len(community_ids), FEE_PRICE_IMPORT_BATCH_SIZE):
+        batch = community_ids[offset:offset + FEE_PRICE_IMPORT_BATCH_SIZE]
+        for version in (FeePriceVersion.query
+                        .filter(FeePriceVersion.community_id.in_(batch))
+                        .order_by(FeePriceVersion.effective_from, FeePriceVersion.id)):
+            latest[(version.community_id, version.fee_type)] = version.price
+    
+    rows = []
+    for fee_price, community_id in zip(fee_prices, community_ids):
+        for fee_type, field in FEE_PRICE_FIELDS.items():
+            price = _to_cents_decimal(getattr(fee_price, field)) if isinstance(fee_price, FeePrice) else None
+            key = (community_id, fee_type)
+            if latest.get(key, None) == price and (key in latest or price is None):
+                continue
+            rows.append({
+                'community_id': community_id,
+                'fee_type': fee_type,
+                'price': price,
+                'effective_from': effective_from,
+                'created_by': operator.USERNAME if operator else None
+            })
+    
+    table = FeePriceVersion.__table__
+    for offset in range(0, len(rows), FEE_PRICE_IMPORT_BATCH_SIZE):
+        stmt = build_upsert(table, rows[offset:offset + FEE_PRICE_IMPORT_BATCH_SIZE],
+                            ['community_id', 'fee_type', 'effective_from'],
+                            lambda new: {'price': new.price, 'created_by': new.created_by})
+        db.session.execute(stmt)
+
+def load_fee_price_payload(community_num):
+    """读取小区收费标准，返回 (单价字典, 提示信息)；未配置时返回默认单价"""
+    fee_price = FeePrice.query.filter_by(id=community_num).first()
+    if not fee_price:
+        return get_default_prices(), f"未找到ID为 {community_num} 的收费标准"
+    return {
+        "electricity": float(fee_price.electricity),
+        "coldWater": float(fee_price.coldWater),
+        "hotWater": float(fee_price.hotWater),
+        "network": float(fee_price.network),
+        "parking": float(fee_price.parking),
+        "rent": float(fee_price.rent_fee),
+        "management": float(fee_price.manage_fee)
+    }, None
+
+# ========== 条件请求（ETag / 304）==========
+# 各资源的版本号：订单按地址ID分桶（历史缴费只随本地址的订单变化），地址整体一个版本号
+ORDER_STAMP_BUCKETS = 64
+order_stamps = [GenerationStamp(f'orders_{i}') for i in range(ORDER_STAMP_BUCKETS)]
+address_stamp = GenerationStamp('addresses')
+
+def order_stamp(address_id):
+    return order_stamps[int(address_id) % ORDER_STAMP_BUCKETS]
+
+# ========== 地址树缓存 ==========
+def building_sort_key(building):
+    """楼栋号自然排序：数字楼栋号（如"1号楼"、"12号楼"）在前按数值，其他按文字"""
+    num_match = re.match(r'^(\d+)(号楼)?$', building)
+    if num_match:
+        return (0, int(num_match.group(1)))
+    return (1, building.lower())
+
+def room_sort_key(room):
+    """房间号自然排序：纯数字或数字开头（如"101A"）按数值，其他按原样"""
+    if room.isdigit():
+        return (0, int(room))
+    num_match = re.match(r'^(\d+)', room)
+    if num_match:
+        return (0, int(num_match.group(1)))
+    return (1, room)
+
+class AddressTree:
+    """一个小区（管理员为全部小区）的 楼栋 -> 房间 树，楼栋和房间都已按自然顺序排好"""
+    
+    def __init__(self, addresses):
+        rooms = {}
+        for address in addresses:
+            rooms.setdefault(address.楼栋号, []).append(address.to_dict())
+        for room_list in rooms.values():
+            room_list.sort(key=lambda item: room_sort_key(item['room']))
+        self.buildings = sorted(rooms, key=building_sort_key)
+        self.rooms = rooms
+        self._positions = {
+            item['id']: (building, index)
+            for building, room_list in rooms.items()
+            for index, item in enumerate(room_list)
+        }
+    
+    def room(self, address_id):
+        """按地址ID取房间字典，不在本树中时返回 None"""
+        position = self._positions.get(address_id)
+        if position is None:
+            return None
+        building, index = position
+        return self.rooms[building][index]
+    
+    def update_residents(self, residents):
+        """原地更新住户姓名/手机号；residents 为 {地址ID: (姓名, 手机号)}"""
+        for address_id, (name, phone) in residents.items():
+            position = self._positions.get(address_id)
+            if position is None:
+                continue
+            building, index = position
+            # 替换为新字典，正在序列化旧列表的请求不受影响
+            item = dict(self.rooms[building][index], name=name or '', phone=phone or '')
+            self.rooms[building][index] = item
+        return True
+
+# 按用户可见范围（'all' 或小区编号）缓存地址树；地址版本号变化时重建，
+# 本进程内只改住户信息的写入直接原地更新（见 _bump_changed_stamps），300秒过期兜住直接改库
+address_tree_cache = VersionedCache(address_stamp, maxsize=256, ttl=300)
+
+def address_tree_query(scope):
+    """地址树的数据来源：scope 为 'all' 或小区编号"""
+    query = Address.query if scope == 'all' else Address.query.filter_by(小区编号=scope)
+    return query.order_by(Address.ID)
+
+def load_address_tree(scope):
+    return AddressTree(address_tree_query(scope).all())
+
+def get_address_tree(user):
+    scope = 'all' if user.Role == '系统管理员' else user.小区编号
+    return address_tree_cache.get(scope, lambda: load_address_tree(scope))
+
+ADDRESS_STRUCTURE_FIELDS = ('楼栋号', '房间号', '小区编号')
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _collect_changed_stamps(session, flush_context):
+    """记录本事务改动了哪些订单/地址，提交后再递增对应版本号"""
+    changed = session.info.setdefault('changed_stamps', set())
+    residents = session.info.setdefault('changed_residents', {})
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Order) and obj.地址ID is not None:
+            changed.add(order_stamp(obj.地址ID))
+        elif isinstance(obj, Address):
+            changed.add(address_stamp)
+            state = db.inspect(obj)
+            structural = (obj in session.new or obj in session.deleted or any(
+                state.attrs[field].history.has_changes() for field in ADDRESS_STRUCTURE_FIELDS))
+            if structural:
+                session.info['address_structure_changed'] = True
+            else:
+                residents[obj.ID] = (obj.姓名, obj.手机号)
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _bump_changed_stamps(session):
+    residents = session.info.pop('changed_residents', {})
+    structural = session.info.pop('address_structure_changed', False)
+    for stamp in session.info.pop('changed_stamps', ()):
+        previous = stamp.current()
+        replaced, generation = stamp.bump()
+        if stamp is address_stamp and not structural and replaced == previous:
+            # 只改了住户信息、且期间没有其他进程改过地址：本进程的地址树原地更新，不必整棵重建
+            address_tree_cache.carry_forward(
+                previous, generation, lambda scope, tree: tree.update_residents(residents))
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _discard_changed_stamps(session):
+    for key in ('changed_stamps', 'changed_residents', 'address_structure_changed'):
+        session.info.pop(key, None)
+
+def conditional_get(make_etag):
+    """
+    条件请求装饰器（放在 token_required 之后）
+    make_etag() 只读取版本号拼出 ETag（不查库），再附加查询参数摘要；
+    与 If-None-Match 匹配时直接返回304，跳过查询和序列化；返回 None 时按普通请求处理
+    ETag 在执行查询之前计算，期间有写入时下次请求的 ETag 必然不同，不会把新数据标成旧版本
+    不要与 read_replica 同用：版本号在主库提交后递增，从库可能尚未复制，会把旧数据标成新版本，
+    之后的请求一直命中304
+    """
+    from functools import wraps
+    
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            etag = make_etag()
+            if etag is None:
+                return f(*args, **kwargs)
+            
+            args_digest = hashlib.md5(
+                json.dumps(sorted(request.args.items(multi=True)), ensure_ascii=False).encode('utf-8')
+            ).hexdigest()[:8]
+            etag = f'{etag}-{args_digest}'
+            
+            if request.if_none_match.contains_weak(etag):
+                response = app.response_class(status=304)
+            else:
+                response = app.make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        
+        return decorated
+    
+    return decorator
+
+def _user_scope(user):
+    """ETag 中的用户可见范围：管理员看全部，其他角色只看本小区"""
+    return 'all' if user.Role == '系统管理员' else f'c{user.小区编号}'
+
+def addresses_etag():
+    return f'addr-{_user_scope(g.current_user)}-{address_stamp.current()}'
+
+def fee_prices_etag():
+    community_num = getattr(g.current_user, '小区编号', None)
+    if not community_num:
+        return None
+    return f'fp-{community_num}-{fee_price_cache.stamp.current()}'
+
+def admin_fee_prices_etag():
+    if g.current_user.Role != '系统管理员':
+        return None
+    return f'afp-{fee_price_cache.stamp.current()}'
+
+def payment_history_etag():
+    address_id = request.args.get('address_id', '')
+    if not address_id.isdigit():
+        return None
+    return (f'ph-{_user_scope(g.current_user)}-{address_id}-'
+            f'{order_stamp(address_id).current()}-{address_stamp.current()}')
+
+# ========== 批量写入 ==========
+def build_upsert(table, values, index_elements, build_set):
+    """
+    构建 "插入，冲突时更新" 语句：MySQL 使用 ON DUPLICATE KEY UPDATE，SQLite 使用 ON CONFLICT
+    values 可以是单行字典或多行列表；build_set(new) 返回更新字段字典，
+    new 代表待插入的行（MySQL 的 VALUES()，SQLite 的 excluded）
+    """
+    if db.session.get_bind().dialect.name == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table).values(values)
+        return stmt.on_duplicate_key_update(**build_set(stmt.inserted))
+    
+    from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(table).values(values)
+    return stmt.on_conflict_do_update(index_elements=index_elements, set_=build_set(stmt.excluded))
+
+# ========== 日收款汇总 ==========
+def _to_cents_decimal(amount):
+    """金额转换为两位小数的 Decimal"""
+    return Decimal(str(amount or 0)).quantize(Decimal('0.01'))
+
+DAILY_SUMMARY_KEY = ['日期', '小区ID', '收款方式']
+
+def has_daily_summary(day):
+    """某日是否已有汇总行；没有时该日从未汇总过（上线当天或更早的日期）"""
+    return db.session.query(DailySummary.日期).filter(DailySummary.日期 == day).first() is not None
+
+def record_daily_summary(entry_time, community_id, payment_method, amount, count=1):
+    """
+    在当前事务内累加日汇总（需在订单加入或移出会话之后、db.session.commit() 之前调用）
+    新增订单传正数，删除订单传负的金额和 count=-1
+    某日还没有汇总行时先按 orders 原始数据补齐当天各行，补齐的数据已包含本单；
+    其他事务同时补齐时以先写入的为准，本事务只累加本单
+    """
+    table = DailySummary.__table__
+    day = entry_time.date()
+    key = (community_id, payment_method or '')
+    amount = _to_cents_decimal(amount)
+    
+    if has_daily_summary(day):
+        initial = (count, amount) if count > 0 else None
+    else:
+        summary = compute_daily_summary(day)
+        others = [
+            {'日期': day, '小区ID': other[0], '收款方式': other[1], '订单数': value[0], '收款合计': value[1]}
+            for other, value in summary.items() if other != key
+        ]
+        if others:
+            db.session.execute(build_upsert(table, others, DAILY_SUMMARY_KEY, lambda new: {
+                '订单数': table.c.订单数
+            }))
+        initial = summary.get(key)
+    
+    if initial is None:
+        # 该日没有这一行：被删除的订单从未计入汇总，只扣减已存在的行
+        db.session.execute(table.update().where(
+            table.c.日期 == day, table.c.小区ID == key[0], table.c.收款方式 == key[1]
+        ).values(订单数=table.c.订单数 + count, 收款合计=table.c.收款合计 + amount))
+        return
+    
+    values = {'日期': day, '小区ID': key[0], '收款方式': key[1], '订单数': initial[0], '收款合计': initial[1]}
+    db.session.execute(build_upsert(table, values, DAILY_SUMMARY_KEY, lambda new: {
+        '订单数': table.c.订单数 + count,
+        '收款合计': table.c.收款合计 + amount
+    }))
+
+def daily_total_query(day, community_id=None):
+    """某日收款合计的查询；community_id 为 None 时合计所有小区"""
+    query = db.session.query(func.sum(DailySummary.收款合计)).filter(DailySummary.日期 == day)
+    if community_id is not None:
+        query = query.filter(DailySummary.小区ID == community_id)
+    return query
+
+def read_daily_total(day, community_id=None):
+    """读取某日收款合计；community_id 为 None 时合计所有小区；该日还没有汇总行时按 orders 实时合计"""
+    if has_daily_summary(day):
+        return float(daily_total_query(day, community_id).scalar() or 0)
+    
+    day_start = datetime.combine(day, datetime.min.time())
+    query = db.session.query(func.sum(Order.收款金额)).filter(
+        Order.录入时间 >= day_start, Order.录入时间 < day_start + timedelta(days=1))
+    if community_id is not None:
+        query = query.filter(Order.小区ID == community_id)
+    return float(query.scalar() or 0)
+
+def compute_daily_summary(day):
+    """从 orders 原始数据重新计算某日汇总，返回 {(小区ID, 收款方式): (订单数, 收款合计)}"""
+    day_start = datetime.combine(day, datetime.min.time())
+    rows = db.session.query(
+        Order.小区ID, Order.收款方式, func.count(Order.订单ID), func.sum(Order.收款金额)
+    ).filter(
+        Order.录入时间 >= day_start, Order.录入时间 < day_start + timedelta(days=1)
+    ).group_by(Order.小区ID, Order.收款方式).all()
+    
+    summary = {}
+    for community_id, payment_method, count, total in rows:
+        key = (community_id, payment_method or '')
+        old_count, old_total = summary.get(key, (0, Decimal('0.00')))
+        summary[key] = (old_count + count, old_total + _to_cents_decimal(total))
+    return summary
+
+def load_daily_summary(day):
+    """读取汇总表中某日的数据，格式同 compute_daily_summary"""
+    rows = DailySummary.query.filter(DailySummary.日期 == day).all()
+    return {(row.小区ID, row.收款方式): (row.订单数, _to_cents_decimal(row.收款合计)) for row in rows}
+
+# ========== 报表汇总 ==========
+ROLLUP_TOTAL = 'total'
+ROLLUP_KEY_COLUMNS = ['日期', '小区ID', '费用类型', '收款方式', '操作员ID']
+
+def _signed_quantity(quantity, amount):
+    """数量按金额方向取正负：红冲、退费订单的数量为正、金额为负，汇总时冲减原订单的数量"""
+    quantity = abs(_to_cents_decimal(quantity))
+    return -quantity if amount < 0 else quantity
+
+def order_rollup_rows(order, sign=1):
+    """一笔订单对报表汇总的增量：整单一行（total），每个金额非零的费用项各一行；删除订单传 sign=-1"""
+    key = {
+        '日期': order.录入时间.date(),
+        '小区ID': order.小区ID,
+        '收款方式': order.收款方式 or '',
+        '操作员ID': order.操作员ID
+    }
+    rows = [dict(key, 费用类型=ROLLUP_TOTAL, 订单数=sign, 数量合计=Decimal('0.00'),
+                 金额合计=sign * _to_cents_decimal(order.收款金额))]
+    for fee_type, (quantity_field, amount_field) in FEE_MAPPING.items():
+        amount = _to_cents_decimal(getattr(order, amount_field))
+        if not amount:
+            continue
+        rows.append(dict(key, 费用类型=fee_type, 订单数=sign,
+                         数量合计=sign * _signed_quantity(getattr(order, quantity_field), amount),
+                         金额合计=sign * amount))
+    return rows
+
+def record_report_rollup(order, sign=1):
+    """在当前事务内累加报表汇总（需在 db.session.commit() 之前、费用字段赋值之后调用）"""
+    table = ReportRollup.__table__
+    stmt = build_upsert(table, order_rollup_rows(order, sign), ROLLUP_KEY_COLUMNS, lambda new: {
+        '订单数': table.c.订单数 + new.订单数,
+        '数量合计': table.c.数量合计 + new.数量合计,
+        '金额合计': table.c.金额合计 + new.金额合计
+    })
+    db.session.execute(stmt)
+
+def compute_report_rollup(day):
+    """
+    从 orders 与 order_items 原始数据重新计算某日报表汇总（历史订单需先回填 order_items）
+    返回 {(小区ID, 费用类型, 收款方式, 操作员ID): (订单数, 数量合计, 金额合计)}
+    """
+    day_start = datetime.combine(day, datetime.min.time())
+    day_end = day_start + timedelta(days=1)
+    group_columns = (Order.小区ID, Order.收款方式, Order.操作员ID)
+    totals = db.session.query(
+        *group_columns, func.count(Order.订单ID), func.sum(Order.收款金额)
+    ).filter(
+        Order.录入时间 >= day_start, Order.录入时间 < day_end
+    ).group_by(*group_columns).all()
+    
+    summary = {}
+    def add(key, count, quantity, amount):
+        old = summary.get(key, (0, Decimal('0.00'), Decimal('0.00')))
+        summary[key] = (old[0] + count, old[1] + _to_cents_decimal(quantity), old[2] + _to_cents_decimal(amount))
+    
+    for community_id, payment_method, operator_id, count, total in totals:
+        add((community_id, ROLLUP_TOTAL, payment_method or '', operator_id), count, 0, total)
+    for community_id, payment_method, operator_id, fee_type, count, quantity, amount in sum_order_items(
+            day_start, day_end, *group_columns):
+        add((community_id, fee_type, payment_method or '', operator_id), count, quantity, amount)
+    return summary
+
+def load_report_rollup(day):
+    """读取报表汇总表中某日的数据，格式同 compute_report_rollup"""
+    rows = ReportRollup.query.filter(ReportRollup.日期 == day).all()
+    return {
+        (row.小区ID, row.费用类型, row.收款方式, row.操作员ID):
+            (row.订单数, _to_cents_decimal(row.数量合计), _to_cents_decimal(row.金额合计))
+        for row in rows
+    }
+
+# 费用类型 -> (数量字段, 金额字段)，创建订单与费用明细渲染共用
+FEE_MAPPING = {
+    'electricity': ('电费度数', '电费金额'),
+    'hotWater': ('热水吨数', '热水金额'),
+    'coldWater': ('冷水吨数', '冷水金额'),
+    'network': ('网费月数', '网费金额'),
+    'parking': ('停车费月数', '停车费金额'),
+    'rent': ('房租月数', '房租金额'),
+    'management': ('管理费月数', '管理费金额')
+}
+
+def build_order_items(order, unit_prices=None):
+    """
+    按订单的费用宽列生成 order_items 明细（双写：创建、红冲订单时调用，回填脚本也用它）
+    unit_prices 为 {费用类型: 单价}，未提供的按 金额/数量 推算
+    """
+    items = []
+    for fee_type, (quantity_field, amount_field) in FEE_MAPPING.items():
+        amount = _to_cents_decimal(getattr(order, amount_field))
+        if not amount:
+            continue
+        quantity = getattr(order, quantity_field)
+        unit_price = (unit_prices or {}).get(fee_type)
+        if unit_price is None and quantity:
+            unit_price = abs(amount) / _to_cents_decimal(quantity)
+        item = OrderItem(
+            费用类型=fee_type,
+            数量=quantity,
+            单价=Decimal(str(unit_price)).quantize(Decimal('0.0001')) if unit_price is not None else None,
+            金额=amount
+        )
+        if fee_type == 'parking':
+            item.车牌号 = order.车牌号
+            item.停车开始日期 = order.停车开始日期
+            item.停车结束日期 = order.停车结束日期
+        items.append(item)
+    return items
+
+def sum_order_items(start_time, end_time, *group_columns):
+    """
+    按费用类型汇总某时间段的订单明细：一次 JOIN + GROUP BY，不再逐个判断七组宽列
+    返回 [(*group_columns, 费用类型, 笔数, 数量合计, 金额合计)]，数量按金额方向取正负
+    """
+    quantity = func.abs(OrderItem.数量)
+    return db.session.query(
+        *group_columns, OrderItem.费用类型,
+        func.count(OrderItem.明细ID),
+        func.sum(db.case((OrderItem.金额 < 0, -quantity), else_=quantity)),
+        func.sum(OrderItem.金额)
+    ).join(Order, Order.订单ID == OrderItem.订单ID).filter(
+        Order.录入时间 >= start_time, Order.录入时间 < end_time
+    ).group_by(*group_columns, OrderItem.费用类型).all()
+
+# 费用明细显示顺序：(费用类型, 名称, 单位, 列表中的数量单位, 数量类型)
+FEE_LINE_SPECS = [
+    ('electricity', '电费', '度', '度', float),
+    ('coldWater', '冷水费', '吨', '吨', float),
+    ('hotWater', '热水费', '吨', '吨', float),
+    ('network', '网费', '月', '个月', int),
+    ('parking', '停车费', '月', '个月', int),
+    ('rent', '房租', '月', '个月', int),
+    ('management', '管理费', '月', '个月', int)
+]
+FEE_TYPE_NAMES = {fee_type: name for fee_type, name, *_ in FEE_LINE_SPECS}
+
+# 已格式化的费用明细缓存：订单的费用字段写入后不再修改，按 (订单ID, 账单号) 缓存
+FEE_LINE_CACHE_SIZE = 20000
+_fee_line_cache = OrderedDict()
+_fee_line_cache_lock = threading.Lock()
+
+def _extract_fee_items(order):
+    """读取订单中金额大于0的费用项，每个字段只读取和转换一次"""
+    items = []
+    for fee_type, name, unit, line_unit, quantity_type in FEE_LINE_SPECS:
+        quantity_field, amount_field = FEE_MAPPING[fee_type]
+        amount = getattr(order, amount_field)
+        if not amount or amount <= 0:
+            continue
+        quantity = getattr(order, quantity_field)
+        items.append((fee_type, name, unit, line_unit,
+                      quantity_type(quantity) if quantity else 0, float(amount)))
+    return items
+
+def _format_fee_lines(order, parking_separator):
+    """将单个订单的费用项格式化为多行文本"""
+    lines = []
+    for fee_type, name, _, line_unit, quantity, amount in _extract_fee_items(order):
+        line = f"{name} | {quantity}{line_unit} | ¥{amount:.2f}"
+        if fee_type == 'parking':
+            # 格式：停车费 | 1个月 | ¥130.00 | 2025/12/01-2025/12/31 | 皖CMV152
+            car_plate = order.车牌号 or ''
+            if order.停车开始日期 and order.停车结束日期:
+                date_range = (f"{order.停车开始日期.strftime('%Y/%m/%d')}-"
+                              f"{order.停车结束日期.strftime('%Y/%m/%d')}")
+                line += f" | {date_range}{parking_separator}{car_plate}"
+            else:
+                line += f" | | {car_plate}"
+        lines.append(line)
+    return '\n'.join(lines)
+
+def render_fee_lines(orders, parking_separator=' | ', use_cache=True):
+    """
+    批量渲染一页订单的费用明细（feeItems），返回与 orders 等长的字符串列表
+    已渲染过的订单直接从缓存读取；大批量导出时传 use_cache=False，避免冲掉缓存
+    """
+    if not use_cache:
+        return [_format_fee_lines(order, parking_separator) for order in orders]
+    
+    results = []
+    with _fee_line_cache_lock:
+        for order in orders:
+            key = (order.订单ID, order.账单号, parking_separator)
+            fee_lines = _fee_line_cache.get(key)
+            if fee_lines is None:
+                fee_lines = _format_fee_lines(order, parking_separator)
+                _fee_line_cache[key] = fee_lines
+                if len(_fee_line_cache) > FEE_LINE_CACHE_SIZE:
+                    _fee_line_cache.popitem(last=False)
+            else:
+                _fee_line_cache.move_to_end(key)
+            results.append(fee_lines)
+    return results
+
+def render_fee_details(order, unit_prices=None):
+    """
+    构建订单详情（重打小票）使用的结构化费用明细
+    unit_prices 为开单时刻生效的单价 {费用类型: 单价}；缺少时按 金额/数量 推算
+    """
+    unit_prices = unit_prices or {}
+    fee_details = []
+    for fee_type, name, unit, _, quantity, amount in _extract_fee_items(order):
+        price = unit_prices.get(fee_type)
+        if price is None:
+            price = amount / quantity if quantity and quantity > 0 else 0
+        detail = {
+            'name': name,
+            'quantity': quantity,
+            'unit': unit,
+            'price': float(price),
+            'amount': amount
+        }
+        if fee_type == 'parking':
+            detail['carPlate'] = order.车牌号 if order.车牌号 else ''
+            detail['startDate'] = order.停车开始日期.strftime('%Y-%m-%d') if order.停车开始日期 else ''
+            detail['endDate'] = order.停车结束日期.strftime('%Y-%m-%d') if order.停车结束日期 else ''
+        fee_details.append(detail)
+    return fee_details
+
+def serialize_recent_order(order, fee_items):
+    """今日收费记录（工作台列表）中一条订单的格式，/api/recent-orders 与订单推送共用"""
+    address = order.地址
+    return {
+        'orderId': order.订单ID,
+        'billNumber': order.账单号,
+        'addressId': order.地址ID,  # 添加地址ID字段
+        'entryTime': order.录入时间.strftime('%Y-%m-%d %H:%M:%S') if order.录入时间 else '',
+        'building': address.楼栋号 if address else '',
+        'room': address.房间号 if address else '',
+        'residentName': address.姓名 if address else '',
+        'residentPhone': address.手机号 if address else '',
+        'feeItems': fee_items,  # 使用换行符分隔
+        'totalAmount': float(order.收款金额) if order.收款金额 else 0,
+        'paymentMethod': order.收款方式,
+        'remark': order.备注,
+        'redReverse': order.红冲  # 添加红冲字段
+    }
+
+# ========== 订单变更推送 ==========
+# 工作台通过 SSE 接收本小区新建/红冲/删除的订单，只更新变化的行，不再整表刷新
+order_event_broker = OrderEventBroker(
+    os.path.join(Config.ORDER_EVENT_DIR, 'order_events.log'),
+    max_subscribers=Config.ORDER_STREAM_MAX_PER_WORKER
+)
+
+def order_stream_scope(user):
+    """推送范围与 /api/recent-orders 一致：管理员和小区编号为1的用户看所有小区"""
+    if user.Role == '系统管理员' or user.小区编号 == 1:
+        return 'all'
+    return user.小区编号
+
+def publish_order_event(event_type, community, **payload):
+    """数据库提交后发布订单事件；推送失败只记日志，不影响接口结果"""
+    try:
+        order_event_broker.publish(event_type, community, **payload)
+    except Exception as e:
+        app.logger.warning(f"订单事件推送失败: {event_type} {str(e)}")
+
+def publish_order_created(order):
+    fee_items = render_fee_lines([order], parking_separator='| ')[0]
+    publish_order_event('created', order.小区ID, order=serialize_recent_order(order, fee_items))
+
+# 游标分页支持的排序字段（与 /api/v1/orders/query 的 sort 参数一致）
+KEYSET_SORT_FIELDS = {
+    'entryTime': '录入时间',
+    'totalAmount': '收款金额',
+    'orderId': '订单ID'
+}
+
+def _parse_cursor_value(sort_column, value):
+    """将游标中的排序值还原为列类型，格式错误时抛出 ValueError"""
+    try:
+        if sort_column == 'entryTime':
+            return datetime.strptime(value, '%Y-%m-%d %H:%M:%S.%f')
+        if sort_column == 'totalAmount':
+            amount = Decimal(value)
+            if not amount.is_finite():
+                raise ValueError(value)
+            return amount
+        return int(value)
+    except (TypeError, ValueError, ArithmeticError):
+        raise ValueError('无效的分页游标')
+
+def keyset_paginate(query, sort_column, sort_order, cursor, per_page):
+    """
+    游标（seek）分页：按 (排序字段, 订单ID) 定位，避免 OFFSET 扫描
+    无论翻到第几页，每次只读取 per_page + 1 行
+    返回 (当前页订单列表, 下一页游标, 上一页游标)，游标格式错误时抛出 ValueError
+    """
+    if sort_column not in KEYSET_SORT_FIELDS:
+        sort_column = 'entryTime'
+    sort_order = 'asc' if sort_order == 'asc' else 'desc'
+    sort_field = getattr(Order, KEYSET_SORT_FIELDS[sort_column])
+    descending = sort_order == 'desc'
+    
+    direction = 'next'
+    if cursor:
+        payload = decode_cursor(cursor)
+        if payload.get('s') != sort_column or payload.get('o') != sort_order:
+            raise ValueError('分页游标与排序参数不匹配')
+        direction = 'prev' if payload.get('d') == 'prev' else 'next'
+        last_id = payload['id']
+        
+        # 向后翻页且降序，或向前翻页且升序时，取更小的键
+        seek_lower = descending == (direction == 'next')
+        if sort_column == 'orderId':
+            condition = Order.订单ID < last_id if seek_lower else Order.订单ID > last_id
+        else:
+            value = _parse_cursor_value(sort_column, payload.get('v'))
+            if seek_lower:
+                condition = or_(sort_field < value, and_(sort_field == value, Order.订单ID < last_id))
+            else:
+                condition = or_(sort_field > value, and_(sort_field == value, Order.订单ID > last_id))
+        query = query.filter(condition)
+    
+    # 向前翻页时反向扫描，取回后再翻转
+    scan_desc = descending if direction == 'next' else not descending
+    ordering = [sort_field.desc() if scan_desc else sort_field.asc()]
+    if sort_column != 'orderId':
+        ordering.append(Order.订单ID.desc() if scan_desc else Order.订单ID.asc())
+    
+    rows = query.order_by(None).order_by(*ordering).limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if direction == 'prev':
+        rows.reverse()
+    
+    def make_cursor(order, d):
+        return encode_cursor({
+            's': sort_column,
+            'o': sort_order,
+            'd': d,
+            'v': getattr(order, KEYSET_SORT_FIELDS[sort_column]),
+            'id': order.订单ID
+        })
+    
+    next_cursor = prev_cursor = None
+    if rows:
+        if has_more if direction == 'next' else cursor:
+            next_cursor = make_cursor(rows[-1], 'next')
+        if cursor if direction == 'next' else has_more:
+            prev_cursor = make_cursor(rows[0], 'prev')
+    
+    return rows, next_cursor, prev_cursor
+
+def wants_cursor_pagination():
+    """请求是否使用游标分页模式（mode=cursor 或携带 cursor 参数）"""
+    return request.args.get('mode') == 'cursor' or bool(request.args.get('cursor'))
+
 # ========== 静态文件路由 ==========
-@app.route('/static/<path:filename>')
+# 静态资源清单（python3 assets.py build 生成），模板中用 asset_url() 引用资源
+asset_manifest = AssetManifest(app.static_folder)
+STATIC_IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+@app.context_processor
+def inject_asset_url():
+    return {'asset_url': asset_manifest.url}
+
 def serve_static(filename):
-    """服务静态文件"""
-    return send_from_directory(app.static_folder, filename)
+    """服务静态文件；构建产物按 Accept-Encoding 直接发送预压缩版本并长期缓存"""
+    if not is_fingerprinted(filename):
+        return send_from_directory(app.static_folder, filename)
+    
+    path = safe_join(app.static_folder, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    
+    send_path, encoding = path, None
+    for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if request.accept_encodings[candidate] and os.path.isfile(path + suffix):
+            send_path, encoding = path + suffix, candidate
+            break
+    
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    response = send_file(send_path, mimetype=mimetype, conditional=True,
+                         max_age=STATIC_IMMUTABLE_MAX_AGE)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = f'public, max-age={STATIC_IMMUTABLE_MAX_AGE}, immutable'
+    return response
+
+# Flask 已为 static_url_path 注册了 'static' 端点并优先匹配，这里替换其视图函数
+app.view_functions['static'] = serve_static
 
 @app.route('/templates/<path:filename>')
 def serve_template(filename):
@@ -460,72 +1496,33 @@ def login():
 # 2. 获取地址
 @app.route('/api/addresses', methods=['GET'])
 @token_required
+@conditional_get(addresses_etag)
 def get_addresses():
-    """获取当前用户有权访问的地址列表（两步选择）"""
+    """获取当前用户有权访问的地址列表（两步选择），数据来自已排好序的地址树缓存"""
     try:
         current_user = g.current_user
         step = request.args.get('step', 'buildings')  # 默认为获取楼栋列表
         
-        # 构建查询：管理员看所有，操作员只看自己小区的
-        if current_user.Role == '系统管理员':
-            query = Address.query
-        else:
-            query = Address.query.filter_by(小区编号=current_user.小区编号)
+        # 地址树：管理员看所有，操作员只看自己小区的
+        tree = get_address_tree(current_user)
         
         if step == 'buildings':
-            # 第一步：获取楼栋列表（去重）
-            buildings = query.with_entities(Address.楼栋号).distinct().all()
-            building_list = [b[0] for b in buildings]
-            
-            # 对楼栋号进行自然排序
-            def natural_sort_key_building(s):
-                """楼栋号自然排序函数"""
-                # 优先匹配数字开头的楼栋号（如"1号楼"、"12号楼"）
-                num_match = re.match(r'^(\d+)(号楼)?$', s)
-                if num_match:
-                    return (0, int(num_match.group(1)))  # 数字楼栋号优先排序
-                
-                # 对于其他格式（纯文字），使用字符串排序
-                return (1, s.lower())
-            
-            building_list.sort(key=natural_sort_key_building)
-            
+            # 第一步：获取楼栋列表（已按自然顺序排序）
             return jsonify({
                 'status': 'success',
-                'data': building_list,
+                'data': tree.buildings,
                 'step': 'buildings'
             })
             
         elif step == 'rooms':
-            # 第二步：根据楼栋号获取房间列表
+            # 第二步：根据楼栋号获取房间列表（已按自然顺序排序）
             building = request.args.get('building', '')
             if not building:
                 return jsonify({'status': 'error', 'message': '请提供楼栋号'}), 400
             
-            addresses = query.filter_by(楼栋号=building).all()
-            result = [addr.to_dict() for addr in addresses]
-            
-            # 对房间号进行自然排序
-            def natural_sort_key_room(addr):
-                """房间号自然排序函数"""
-                room = addr.get('room', '')
-                # 优先处理纯数字房间号
-                if room.isdigit():
-                    return (0, int(room))
-                
-                # 对于混合格式（如"101A"），提取数字部分
-                num_match = re.match(r'^(\d+)', room)
-                if num_match:
-                    return (0, int(num_match.group(1)))
-                
-                # 其他情况按原样排序
-                return (1, room)
-            
-            result.sort(key=natural_sort_key_room)
-            
             return jsonify({
                 'status': 'success',
-                'data': result,
+                'data': tree.rooms.get(building, []),
                 'step': 'rooms'
             })
         else:
@@ -538,6 +1535,7 @@ def get_addresses():
 # 3. 新增：获取当前用户所属小区的收费标准
 @app.route('/api/fee_prices', methods=['GET'])
 @token_required
+@conditional_get(fee_prices_etag)
 def get_fee_prices():
     """
     根据当前登录用户的小区获取收费标准
@@ -556,34 +1554,106 @@ def get_fee_prices():
                 "data": get_default_prices()
             })
         
-        # 查询该小区的收费标准（通过id查询）
-        fee_price = FeePrice.query.filter_by(id=community_num).first()
+        # 查询该小区的收费标准（通过id查询，进程内缓存；ETag 见 fee_prices_etag）
+        prices, message = fee_price_cache.get(community_num, lambda: load_fee_price_payload(community_num))
         
-        if not fee_price:
-            return jsonify({
-                "status": "success",
-                "message": f"未找到ID为 {community_num} 的收费标准",
-                "data": get_default_prices()
-            })
+        payload = {"status": "success", "data": prices}
+        if message:
+            payload["message"] = message
         
-        # 直接返回所有费用类型的单价
-        return jsonify({
-            "status": "success",
-            "data": {
-                "electricity": float(fee_price.electricity),
-                "coldWater": float(fee_price.coldWater),
-                "hotWater": float(fee_price.hotWater),
-                "network": float(fee_price.network),
-                "parking": float(fee_price.parking),
-                "rent": float(fee_price.rent_fee),
-                "management": float(fee_price.manage_fee)
-            }
-        })
+        return jsonify(payload)
         
     except Exception as e:
         app.logger.error(f"获取单价时发生错误: {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+# 3.5. 批量报价（不生成订单）
+FEE_QUOTE_MAX_ROWS = 20000  # 单次请求最多计算的费用行数
+
+@app.route('/api/fee-quotes', methods=['POST'])
+@token_required
+def quote_fees():
+    """
+    按当前收费标准批量计算应收金额，两种请求方式：
+      {"building": "1号楼", "items": [{"type": "rent", "quantity": 1}]}   楼栋内每个房间相同的费用项
+      {"quotes": [{"addressId": 12, "items": [{"type": "electricity", "quantity": 35.5}]}]}   逐个地址指定
+    管理员按楼栋报价时可用 communityId 限定小区；同一小区的全部费用行由计价引擎一次批量计算
+    """
+    current_user = g.current_user
+    data = request.get_json(silent=True) or {}
+    
+    try:
+        tree = get_address_tree(current_user)
+        if 'building' in data:
+            rooms = tree.rooms.get(data['building'], [])
+            if data.get('communityId') is not None:
+                rooms = [room for room in rooms if room['community_num'] == data['communityId']]
+            targets = [(room, data.get('items') or []) for room in rooms]
+        elif 'quotes' in data:
+            targets = []
+            for quote in data['quotes']:
+                room = tree.room(quote.get('addressId'))
+                if room is None:
+                    return jsonify({'status': 'error', 'message': f'地址不存在或无权访问: {quote.get("addressId")}'}), 400
+                targets.append((room, quote.get('items') or []))
+        else:
+            return jsonify({'status': 'error', 'message': '请提供楼栋号或报价列表'}), 400
+        
+        results = []
+        pending = {}  # 小区编号 -> 待计算的费用行
+        for room, items in targets:
+            quote_items = []
+            for item in items:
+                fee_type = item.get('type')
+                if fee_type not in FEE_MAPPING:
+                    return jsonify({'status': 'error', 'message': f'无效的费用类型: {fee_type}'}), 400
+                try:
+                    quantity = Decimal(str(item.get('quantity', 0)))
+                except ArithmeticError:
+                    return jsonify({'status': 'error', 'message': f'{FEE_TYPE_NAMES[fee_type]}数量格式不正确'}), 400
+                if not quantity.is_finite() or quantity < 0:
+                    return jsonify({'status': 'error', 'message': f'{FEE_TYPE_NAMES[fee_type]}数量不能为负数'}), 400
+                quote_items.append({'type': fee_type, 'quantity': quantity})
+            results.append({
+                'addressId': room['id'],
+                'building': room['building'],
+                'room': room['room'],
+                'items': quote_items
+            })
+            pending.setdefault(room['community_num'], []).extend(quote_items)
+        
+        if sum(len(quote_items) for quote_items in pending.values()) > FEE_QUOTE_MAX_ROWS:
+            return jsonify({'status': 'error', 'message': f'单次最多计算 {FEE_QUOTE_MAX_ROWS} 个费用项'}), 400
+        
+        for community_id, quote_items in pending.items():
+            engine = get_pricing_engine(community_id)
+            amounts = engine.quote_batch([item['type'] for item in quote_items],
+                                         [item['quantity'] for item in quote_items])
+            for item, amount in zip(quote_items, amounts):
+                item['unitPrice'] = engine.price(item['type'])
+                item['amount'] = cents_to_decimal(amount) if amount is not None else None
+        
+        # 金额按分精确合计后再转换为浮点数输出；未配置单价的费用项金额为 null，不计入合计
+        grand_total = Decimal('0.00')
+        for result in results:
+            total = sum((item['amount'] for item in result['items'] if item['amount'] is not None), Decimal('0.00'))
+            grand_total += total
+            result['totalAmount'] = float(total)
+            for item in result['items']:
+                item['quantity'] = float(item['quantity'])
+                item['unitPrice'] = float(item['unitPrice']) if item['unitPrice'] is not None else None
+                item['amount'] = float(item['amount']) if item['amount'] is not None else None
+        
+        return jsonify({
+            'status': 'success',
+            'data': results,
+            'totalAmount': float(grand_total)
+        })
+    
+    except Exception as e:
+        app.logger.error(f"批量报价时发生错误: {str(e)}\n{traceback.format_exc()}")
+        return jsonify({'status': 'error', 'message': '批量报价失败'}), 500
+
 # 4. 创建订单
 @app.route('/api/orders', methods=['POST'])
 @token_required
@@ -596,6 +1666,10 @@ def create_order():
     
     data = request.get_json()
     
+    # 红冲操作：由服务端根据原订单生成冲销订单（单事务、幂等）
+    if 'originalOrderId' in data:
+        return red_reverse_response(data['originalOrderId'], data.get('remark'), data.get('reason'))
+    
     # 基础验证
     required_fields = ['addressId', 'paymentMethod', 'totalAmount', 'items']
     for field in required_fields:
@@ -608,20 +1682,9 @@ def create_order():
         if not address:
             return jsonify({'status': 'error', 'message': '地址不存在'}), 400
         
-        # 检查是否是红冲操作，如果是，则允许对原订单进行红冲
-        is_red_reverse = 'originalOrderId' in data
-        if is_red_reverse:
-            # 对于红冲操作，验证原订单是否存在
-            original_order_id = data['originalOrderId']
-            original_order = Order.query.get(original_order_id)
-            if not original_order:
-                return jsonify({'status': 'error', 'message': '原订单不存在'}), 400
-            # 红冲操作允许对原订单进行红冲，不检查地址权限
-            app.logger.info(f"红冲操作：允许对原订单ID {original_order_id} 进行红冲")
-        else:
-            # 非红冲操作，需要检查地址权限
-            if current_user.Role != '系统管理员' and address.小区编号 != current_user.小区编号:
-                return jsonify({'status': 'error', 'message': '无权操作此地址'}), 403
+        # 检查地址权限
+        if current_user.Role != '系统管理员' and address.小区编号 != current_user.小区编号:
+            return jsonify({'status': 'error', 'message': '无权操作此地址'}), 403
         
         # 2. 更新地址的住户信息（如果提供了）
         if 'residentName' in data or 'residentPhone' in data:
@@ -645,13 +1708,12 @@ def create_order():
                 address.手机号 = resident_phone
         
         # 3. 生成唯一账单号
-        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-        random_suffix = f"{random.randint(100, 999):03d}"
-        bill_number = f"WD{timestamp}{random_suffix}"
+        bill_number = generate_bill_number()
         
         # 4. 构建订单对象
         # 处理录入时间，如果前端提供了entryTime则使用，否则使用当前时间
-        entry_time = datetime.now()
+        now = datetime.now()
+        entry_time = now
         if 'entryTime' in data and data['entryTime']:
             try:
                 # 解析前端传递的时间字符串，格式为：YYYY-MM-DD HH:mm:ss
@@ -661,39 +1723,74 @@ def create_order():
             except ValueError as e:
                 # 如果解析失败，使用当前时间
                 app.logger.warning(f"解析entryTime失败: {e}，使用当前时间")
-                entry_time = datetime.now()
+                entry_time = now
         
         app.logger.info(f"最终使用的entryTime: {entry_time}")
         
+        # 单价校验：与服务器当前时间生效的收费标准一致（收费标准修改后工作台未刷新时拒绝，避免按旧单价收费；
+        # 不按前端的录入时间查，否则时钟偏差会误报、回填旧时间可以按旧单价收费）
+        # 录入时间仍按前端提交的时间记录，收银员可以补录之前的订单
+        # 还没有历史版本的小区按当前收费标准校验
+        timeline = get_price_timeline(current_user.小区编号)
+        engine = get_pricing_engine(current_user.小区编号)
+        
+        def unit_price_for(fee_type, client_price):
+            expected_price = timeline.price_at(fee_type, now) if timeline else engine.price(fee_type)
+            return expected_price if expected_price is not None else client_price
+        
+        # 数量、金额、单价均先解析为精确的分，格式错误（非数字、无穷大等）返回400
+        lines = {}
+        quantities = {}
+        months = {}
+        try:
+            for item in data['items']:
+                fee_type = item.get('type')
+                if fee_type not in FEE_MAPPING:
+                    continue
+                name = FEE_TYPE_NAMES[fee_type]
+                quantities[fee_type] = cents_to_decimal(parse_cents(item.get('quantity', 0), f'{name}数量'))
+                unit_price = unit_price_for(fee_type, item.get('unitPrice'))
+                if (item.get('unitPrice') and unit_price is not None
+                        and parse_cents(item['unitPrice'], f'{name}单价') != parse_cents(unit_price, f'{name}单价')):
+                    return jsonify({
+                        'status': 'error',
+                        'message': f'{name}单价 {item["unitPrice"]} 与当前收费标准 {unit_price} 不一致，请刷新页面后重新开单'
+                    }), 409
+                lines[fee_type] = (fee_type, quantities[fee_type], item.get('amount', 0), unit_price)
+            
+            # 房租和管理费以单独的字段为准（与下方写入订单的逻辑一致）
+            for fee_type, months_key, amount_key in (('rent', 'rentMonths', 'rentAmount'),
+                                                     ('management', 'managementMonths', 'managementAmount')):
+                if months_key in data:
+                    months[fee_type] = cents_to_decimal(parse_cents(data[months_key], f'{FEE_TYPE_NAMES[fee_type]}数量'))
+                if amount_key in data:
+                    unit_price = lines[fee_type][3] if fee_type in lines else unit_price_for(fee_type, None)
+                    lines[fee_type] = (fee_type, months.get(fee_type, 0), data[amount_key], unit_price)
+            
+            # 金额校验：各费用项金额与合计由计价引擎按整数分重新计算，不再信任前端的浮点计算
+            amounts, total_cents = engine.check_order(lines.values(), data['totalAmount'], FEE_TYPE_NAMES)
+        except PricingError as e:
+            return jsonify({'status': 'error', 'message': f'{e}，请刷新页面后重新开单'}), 400
+        total_amount = cents_to_decimal(total_cents)
+        
         new_order = Order(
             账单号=bill_number,
             地址ID=data['addressId'],
             操作员ID=current_user.ID,
             小区ID=current_user.小区编号,
             录入时间=entry_time,
-            收款金额=float(data['totalAmount']),
+            收款金额=total_amount,
             收款方式=data['paymentMethod'],
             备注=data.get('remark', '')
         )
         
         # 5. 处理动态费用项
-        fee_mapping = {
-            'electricity': ('电费度数', '电费金额'),
-            'hotWater': ('热水吨数', '热水金额'),
-            'coldWater': ('冷水吨数', '冷水金额'),
-            'network': ('网费月数', '网费金额'),
-            'parking': ('停车费月数', '停车费金额'),
-            'rent': ('房租月数', '房租金额'),
-            'management': ('管理费月数', '管理费金额')
-        }
-        
-        # 处理费用项目
         for item in data['items']:
             fee_type = item.get('type')
-            if fee_type in fee_mapping:
-                quantity_field, amount_field = fee_mapping[fee_type]
-                setattr(new_order, quantity_field, float(item.get('quantity', 0)))
-                setattr(new_order, amount_field, float(item.get('amount', 0)))
+            if fee_type in FEE_MAPPING:
+                quantity_field, amount_field = FEE_MAPPING[fee_type]
+                setattr(new_order, quantity_field, float(quantities[fee_type]))
+                setattr(new_order, amount_field, cents_to_decimal(amounts[fee_type]))
                 
                 # 如果是停车费，保存车牌号、开始日期、结束日期
                 if fee_type == 'parking':
@@ -714,55 +1811,33 @@ def create_order():
         
         # 处理房租和管理费数据（从单独的字段获取）
         if 'rentMonths' in data:
-            new_order.房租月数 = int(data.get('rentMonths', 0))
+            new_order.房租月数 = int(months['rent'])
         if 'rentAmount' in data:
-            new_order.房租金额 = float(data.get('rentAmount', 0))
+            new_order.房租金额 = cents_to_decimal(amounts['rent'])
         if 'managementMonths' in data:
-            new_order.管理费月数 = int(data.get('managementMonths', 0))
+            new_order.管理费月数 = int(months['management'])
         if 'managementAmount' in data:
-            new_order.管理费金额 = float(data.get('managementAmount', 0))
+            new_order.管理费金额 = cents_to_decimal(amounts['management'])
+        
+        # 费用明细双写到 order_items，单价取校验金额时使用的单价
+        new_order.明细 = build_order_items(new_order, {
+            fee_type: line[3] for fee_type, line in lines.items() if line[3]
+        })
         
-        # 6. 保存到数据库
+        # 6. 保存到数据库（日汇总、报表汇总在同一事务内累加）
         db.session.add(new_order)
+        record_daily_summary(entry_time, new_order.小区ID, new_order.收款方式, new_order.收款金额)
+        record_report_rollup(new_order)
         db.session.commit()
         
-        # 7. 检查是否是红冲操作，如果是，则更新原订单
-        if 'originalOrderId' in data:
-            try:
-                original_order_id = data['originalOrderId']
-                original_order = Order.query.get(original_order_id)
-                
-                if original_order:
-                    # 更新原订单的备注，添加【已被红冲】
-                    original_remark = original_order.备注 or ''
-                    if '【已被红冲】' not in original_remark:
-                        original_order.备注 = f"{original_remark}【已被红冲】"
-                    
-                    # 设置原订单的红冲字段为1
-                    original_order.红冲 = 1
-                    
-                    # 设置新创建的红冲订单的红冲字段为1
-                    new_order.红冲 = 1
-                    
-                    # 提交更改
-                    db.session.commit()
-                    
-                    app.logger.info(f"红冲操作完成：原订单ID {original_order_id}，新订单ID {new_order.订单ID}")
-                else:
-                    app.logger.warning(f"未找到原订单ID {original_order_id}")
-                    
-            except Exception as e:
-                app.logger.error(f"红冲操作更新原订单失败: {str(e)}")
-                db.session.rollback()
-                # 不影响红冲订单的创建，只记录错误
-        
-        # 8. 记录操作日志
+        # 7. 记录操作日志
         log_operation(
             user_account=current_user.USERNAME,
             operation_type='生成账单',
-            details=f'生成了账单号为 {bill_number} 的订单，金额 {data["totalAmount"]} 元',
+            details=f'生成了账单号为 {bill_number} 的订单，金额 {total_amount} 元',
             community_num=current_user.小区编号
         )
+        publish_order_created(new_order)
         
         return jsonify({
             'status': 'success',
@@ -770,7 +1845,7 @@ def create_order():
             'data': {
                 'orderId': new_order.订单ID,
                 'billNumber': bill_number,
-                'totalAmount': float(data['totalAmount'])
+                'totalAmount': float(total_amount)
             }
         })
     
@@ -783,9 +1858,243 @@ def create_order():
         app.logger.error(f"订单创建未知错误: {str(e)}\n{traceback.format_exc()}")
         return jsonify({'status': 'error', 'message': '订单创建失败'}), 500
 
+# 4.5. 红冲订单
+RED_REVERSE_MARK = '【已被红冲】'
+
+def red_reverse_bill_number(original_bill_number):
+    """冲销订单的账单号由原账单号派生，依靠账单号唯一约束保证同一订单只能红冲一次"""
+    return f"{original_bill_number}R"
+
+def perform_red_reverse(original_order_id, operator, remark=None, reason=None):
+    """
+    在一个事务内完成红冲：锁定原订单行（SELECT ... FOR UPDATE）、插入金额取反的冲销订单、
+    标记两条订单的红冲字段并累加日汇总与报表汇总，只提交一次
+    返回 (冲销订单, 是否本次新建)；原订单不存在抛出 LookupError，非管理员红冲其他小区的订单
+    抛出 PermissionError，无法红冲抛出 ValueError
+    重复提交时返回已存在的冲销订单，不会生成第二笔
+    """
+    original = (db.session.query(Order)
+                .options(db.lazyload('*'))
+                .filter(Order.订单ID == original_order_id)
+                .with_for_update()
+                .one_or_none())
+    if original is None:
+        raise LookupError('原订单不存在')
+    if operator.Role != '系统管理员' and original.小区ID != operator.小区编号:
+        db.session.rollback()
+        raise PermissionError('无权红冲其他小区的订单')
+    
+    bill_number = red_reverse_bill_number(original.账单号)
+    if original.红冲:
+        existing = Order.query.filter_by(账单号=bill_number).first()
+        db.session.rollback()
+        if existing is not None:
+            return existing, False
+        raise ValueError('该订单已红冲或本身是红冲订单，不能重复红冲')
+    
+    if not remark:
+        remark = f"【红冲】\n原订单号：{original.账单号}\n原因：{reason or ''}"
+    
+    reversal = Order(
+        账单号=bill_number,
+        地址ID=original.地址ID,
+        操作员ID=operator.ID,
+        小区ID=original.小区ID,
+        录入时间=datetime.now(),
+        收款金额=-(original.收款金额 or 0),
+        收款方式=original.收款方式,
+        车牌号=original.车牌号,
+        停车开始日期=original.停车开始日期,
+        停车结束日期=original.停车结束日期,
+        备注=remark,
+        红冲=1
+    )
+    for quantity_field, amount_field in FEE_MAPPING.values():
+        setattr(reversal, quantity_field, getattr(original, quantity_field))
+        amount = getattr(original, amount_field)
+        setattr(reversal, amount_field, -amount if amount is not None else None)
+    
+    reversal.明细 = build_order_items(reversal, {item.费用类型: item.单价 for item in original.明细})
+    
+    original_remark = original.备注 or ''
+    if RED_REVERSE_MARK not in original_remark:
+        original.备注 = f"{original_remark}{RED_REVERSE_MARK}"
+    original.红冲 = 1
+    
+    db.session.add(reversal)
+    record_daily_summary(reversal.录入时间, reversal.小区ID, reversal.收款方式, reversal.收款金额)
+    record_report_rollup(reversal)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # 并发的重复请求已先提交（无行锁的数据库上由账单号唯一约束兜底）
+        db.session.rollback()
+        existing = Order.query.filter_by(账单号=bill_number).first()
+        if existing is None:
+            raise
+        return existing, False
+    return reversal, True
+
+def red_reverse_response(original_order_id, remark=None, reason=None):
+    """执行红冲并返回与创建订单一致的响应格式"""
+    current_user = g.current_user
+    
+    try:
+        reversal, created = perform_red_reverse(original_order_id, current_user, remark, reason)
+    # 校验失败时会话中可能已有行锁和未提交的写入，立即回滚释放，不留到请求结束
+    except LookupError as e:
+        db.session.rollback()
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except PermissionError as e:
+        db.session.rollback()
+        return jsonify({'status': 'error', 'message': str(e)}), 403
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'status': 'error', 'message': str(e)}), 409
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        app.logger.error(f"红冲数据库错误: {str(e)}\n{traceback.format_exc()}")
+        return jsonify({'status': 'error', 'message': '数据库保存失败'}), 500
+    
+    if created:
+        app.logger.info(f"红冲操作完成：原订单ID {original_order_id}，新订单ID {reversal.订单ID}")
+        log_operation(
+            user_account=current_user.USERNAME,
+            operation_type='红冲订单',
+            details=f'红冲订单ID {original_order_id}，生成账单号为 {reversal.账单号} 的冲销订单，金额 {reversal.收款金额} 元',
+            community_num=current_user.小区编号
+        )
+        original = db.session.get(Order, original_order_id)
+        fee_lines = render_fee_lines([reversal, original], parking_separator='| ')
+        publish_order_event('redReversed', reversal.小区ID,
+                            order=serialize_recent_order(reversal, fee_lines[0]),
+                            original=serialize_recent_order(original, fee_lines[1]))
+    
+    return jsonify({
+        'status': 'success',
+        'message': '红冲成功' if created else '该订单已红冲，返回已有的冲销订单',
+        'data': {
+            'orderId': reversal.订单ID,
+            'billNumber': reversal.账单号,
+            'totalAmount': float(reversal.收款金额),
+            'alreadyReversed': not created
+        }
+    })
+
+@app.route('/api/orders/<int:order_id>/red-reverse', methods=['POST'])
+@token_required
+def red_reverse_order(order_id):
+    """红冲指定订单（幂等：重复提交返回同一笔冲销订单）"""
+    current_user = g.current_user
+    
+    if not current_user.Edit:
+        return jsonify({'status': 'error', 'message': '当前用户没有编辑权限'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    return red_reverse_response(order_id, data.get('remark'), data.get('reason'))
+
+# 4.6. 订单变更推送（SSE）
+ORDER_STREAM_AUDIENCE = 'order_stream'
+
+@app.route('/api/orders/stream-ticket', methods=['POST'])
+@token_required
+def create_order_stream_ticket():
+    """
+    签发建立订单推送连接用的短期票据（EventSource 无法携带 Authorization 头）
+    票据带 aud 声明，token_required 解码时不指定 audience 会拒绝，
+    访问日志中泄露的票据只能用于建立推送连接，不能当作登录令牌调用其他接口
+    """
+    current_user = g.current_user
+    ticket = jwt.encode({
+        'user_id': current_user.ID,
+        'aud': ORDER_STREAM_AUDIENCE,
+        'exp': int(time.time()) + Config.ORDER_STREAM_TICKET_SECONDS
+    }, app.config['SECRET_KEY'], algorithm='HS256')
+    return jsonify({'status': 'success', 'data': {'ticket': ticket}})
+
+def _sse_message(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.route('/api/orders/stream', methods=['GET'])
+def order_stream():
+    """
+    推送本小区（管理员为所有小区）新建、红冲、删除的订单，事件格式：
+    event: order   data: {"type": "created" | "redReversed" | "deleted", ...}
+    event: reset   客户端处理不过来丢了事件，需要整表重新加载
+    连接到期（ORDER_STREAM_LIFETIME）后服务端主动断开，由客户端换新票据重连
+    """
+    try:
+        data = jwt.decode(request.args.get('ticket', ''), app.config['SECRET_KEY'], algorithms=['HS256'],
+                          audience=ORDER_STREAM_AUDIENCE)
+    except jwt.InvalidTokenError:
+        return jsonify({'status': 'error', 'message': '无效票据'}), 401
+    
+    current_user = user_cache.get(data['user_id'], lambda: load_user_snapshot(data['user_id']))
+    if current_user is None:
+        return jsonify({'status': 'error', 'message': '用户不存在'}), 401
+    
+    subscription = order_event_broker.subscribe(order_stream_scope(current_user))
+    if subscription is None:
+        return jsonify({'status': 'error', 'message': '推送连接数已满'}), 503
+    # 长连接期间不占用数据库连接
+    db.session.remove()
+    
+    def generate():
+        try:
+            yield "retry: 5000\n\n"
+            deadline = time.monotonic() + Config.ORDER_STREAM_LIFETIME
+            while time.monotonic() < deadline:
+                event = subscription.get(timeout=Config.ORDER_STREAM_HEARTBEAT)
+                if subscription.overflowed:
+                    # 队列曾写满、事件已丢失：清空积压，让客户端整表重新加载
+                    subscription.overflowed = False
+                    while subscription.get(timeout=0) is not None:
+                        pass
+                    yield _sse_message('reset', {})
+                elif event is None:
+                    yield ": ping\n\n"
+                else:
+                    yield _sse_message('order', event)
+        finally:
+            order_event_broker.unsubscribe(subscription)
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # 关闭 nginx 缓冲，事件立即送达
+    })
+
 # 5. 查询订单列表
+def order_list_query(user, args):
+    """订单列表的筛选查询（billNumber/startDate/endDate/addressId），不含排序"""
+    bill_number = args.get('billNumber', '').strip()
+    start_date = args.get('startDate')
+    end_date = args.get('endDate')
+    address_id = args.get('addressId')
+    
+    # 构建基础查询
+    query = Order.query
+    
+    # 权限过滤：管理员看所有，操作员只看自己小区的订单
+    if user.Role != '系统管理员':
+        # 直接通过小区ID过滤
+        query = query.filter(Order.小区ID == user.小区编号)
+    
+    # 应用筛选条件
+    if bill_number:
+        query = query.filter(Order.账单号.like(f'%{bill_number}%'))
+    if address_id:
+        query = query.filter(Order.地址ID == address_id)
+    if start_date:
+        query = query.filter(Order.录入时间 >= start_date)
+    if end_date:
+        # 结束日期加一天，包含当天的所有记录
+        end_date_obj = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)
+        query = query.filter(Order.录入时间 < end_date_obj)
+    return query
+
 @app.route('/api/orders', methods=['GET'])
 @token_required
+@read_replica
 def get_orders():
     """查询订单列表（支持筛选）"""
     current_user = g.current_user
@@ -797,36 +2106,40 @@ def get_orders():
         # 获取筛选参数
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 20))
-        bill_number = request.args.get('billNumber', '').strip()
-        start_date = request.args.get('startDate')
-        end_date = request.args.get('endDate')
-        address_id = request.args.get('addressId')
         
-        # 构建基础查询
-        query = Order.query
+        # 构建筛选查询（与索引检查工具共用）
+        query = order_list_query(current_user, request.args)
         
-        # 权限过滤：管理员看所有，操作员只看自己小区的订单
-        if current_user.Role != '系统管理员':
-            # 直接通过小区ID过滤
-            query = query.filter(Order.小区ID == current_user.小区编号)
-        
-        # 应用筛选条件
-        if bill_number:
-            query = query.filter(Order.账单号.like(f'%{bill_number}%'))
-        if address_id:
-            query = query.filter(Order.地址ID == address_id)
-        if start_date:
-            query = query.filter(Order.录入时间 >= start_date)
-        if end_date:
-            # 结束日期加一天，包含当天的所有记录
-            from datetime import datetime as dt, timedelta
-            end_date_obj = dt.strptime(end_date, '%Y-%m-%d') if end_date else None
-            if end_date_obj:
-                end_date_obj = end_date_obj + timedelta(days=1)
-                query = query.filter(Order.录入时间 < end_date_obj)
+        # 游标分页模式：不执行 OFFSET 和 COUNT(*)，总数仅在 withTotal=true 时计算
+        if wants_cursor_pagination():
+            try:
+                orders, next_cursor, prev_cursor = keyset_paginate(
+                    query,
+                    request.args.get('sort', 'entryTime'),
+                    request.args.get('order', 'desc'),
+                    request.args.get('cursor'),
+                    per_page
+                )
+            except ValueError as e:
+                return jsonify({'status': 'error', 'message': str(e)}), 400
+            
+            cursor_pagination = {
+                'mode': 'cursor',
+                'per_page': per_page,
+                'next': next_cursor,
+                'prev': prev_cursor
+            }
+            if request.args.get('withTotal') == 'true':
+                cursor_pagination['total'] = query.order_by(None).count()
+            
+            return jsonify({
+                'status': 'success',
+                'data': [order.to_dict() for order in orders],
+                'pagination': cursor_pagination
+            })
         
         # 执行分页查询
-        pagination = query.order_by(Order.录入时间.desc()).paginate(
+        pagination = apply_order_sort(query, 'entryTime', 'desc').paginate(
             page=page,
             per_page=per_page,
             error_out=False
@@ -876,81 +2189,10 @@ def get_order(order_id):
         # 获取地址信息
         address = order.地址 if hasattr(order, '地址') and order.地址 else None
         
-        # 构建费用明细
-        fee_details = []
-        
-        # 电费
-        if order.电费金额 and float(order.电费金额) > 0:
-            fee_details.append({
-                'name': '电费',
-                'quantity': float(order.电费度数) if order.电费度数 else 0,
-                'unit': '度',
-                'price': float(order.电费金额) / float(order.电费度数) if order.电费度数 and float(order.电费度数) > 0 else 0,
-                'amount': float(order.电费金额)
-            })
-        
-        # 冷水费
-        if order.冷水金额 and float(order.冷水金额) > 0:
-            fee_details.append({
-                'name': '冷水费',
-                'quantity': float(order.冷水吨数) if order.冷水吨数 else 0,
-                'unit': '吨',
-                'price': float(order.冷水金额) / float(order.冷水吨数) if order.冷水吨数 and float(order.冷水吨数) > 0 else 0,
-                'amount': float(order.冷水金额)
-            })
-        
-        # 热水费
-        if order.热水金额 and float(order.热水金额) > 0:
-            fee_details.append({
-                'name': '热水费',
-                'quantity': float(order.热水吨数) if order.热水吨数 else 0,
-                'unit': '吨',
-                'price': float(order.热水金额) / float(order.热水吨数) if order.热水吨数 and float(order.热水吨数) > 0 else 0,
-                'amount': float(order.热水金额)
-            })
-        
-        # 网费
-        if order.网费金额 and float(order.网费金额) > 0:
-            fee_details.append({
-                'name': '网费',
-                'quantity': int(order.网费月数) if order.网费月数 else 0,
-                'unit': '月',
-                'price': float(order.网费金额) / int(order.网费月数) if order.网费月数 and int(order.网费月数) > 0 else 0,
-                'amount': float(order.网费金额)
-            })
-        
-        # 停车费
-        if order.停车费金额 and float(order.停车费金额) > 0:
-            fee_details.append({
-                'name': '停车费',
-                'quantity': int(order.停车费月数) if order.停车费月数 else 0,
-                'unit': '月',
-                'price': float(order.停车费金额) / int(order.停车费月数) if order.停车费月数 and int(order.停车费月数) > 0 else 0,
-                'amount': float(order.停车费金额),
-                'carPlate': order.车牌号 if order.车牌号 else '',
-                'startDate': order.停车开始日期.strftime('%Y-%m-%d') if order.停车开始日期 else '',
-                'endDate': order.停车结束日期.strftime('%Y-%m-%d') if order.停车结束日期 else ''
-            })
-        
-        # 房租
-        if order.房租金额 and float(order.房租金额) > 0:
-            fee_details.append({
-                'name': '房租',
-                'quantity': int(order.房租月数) if order.房租月数 else 0,
-                'unit': '月',
-                'price': float(order.房租金额) / int(order.房租月数) if order.房租月数 and int(order.房租月数) > 0 else 0,
-                'amount': float(order.房租金额)
-            })
-        
-        # 管理费
-        if order.管理费金额 and float(order.管理费金额) > 0:
-            fee_details.append({
-                'name': '管理费',
-                'quantity': int(order.管理费月数) if order.管理费月数 else 0,
-                'unit': '月',
-                'price': float(order.管理费金额) / int(order.管理费月数) if order.管理费月数 and int(order.管理费月数) > 0 else 0,
-                'amount': float(order.管理费金额)
-            })
+        # 构建费用明细：单价优先取开单时写入 order_items 的单价，没有明细的历史订单取开单时刻生效的收费标准
+        unit_prices = get_price_timeline(order.小区ID).prices_at(order.录入时间)
+        unit_prices.update({item.费用类型: item.单价 for item in order.明细 if item.单价 is not None})
+        fee_details = render_fee_details(order, unit_prices)
         
         # 构建返回数据 - 注意：这里使用 录入时间 而不是 录入_time
         order_data = {
@@ -1009,9 +2251,12 @@ def delete_order(order_id):
         # 记录订单信息用于日志
         bill_number = order.账单号
         amount = order.收款金额
+        community_id = order.小区ID
         
-        # 删除订单
+        # 删除订单，同一事务内扣减日汇总与报表汇总（日汇总在删除之后记录，补齐当天数据时已不含本单）
+        record_report_rollup(order, sign=-1)
         db.session.delete(order)
+        record_daily_summary(order.录入时间, order.小区ID, order.收款方式, -(order.收款金额 or 0), count=-1)
         db.session.commit()
         
         # 记录操作日志
@@ -1021,6 +2266,7 @@ def delete_order(order_id):
             details=f'删除了账单号为 {bill_number} 的订单，金额 {amount} 元',
             community_num=current_user.小区编号
         )
+        publish_order_event('deleted', community_id, orderId=order_id)
         
         return jsonify({
             'status': 'success',
@@ -1042,8 +2288,28 @@ def delete_order(order_id):
 
         
 # 7. 操作日志查询（仅管理员）
+def operation_log_query(args):
+    """操作日志的筛选查询（username/operationType/startDate/endDate），按操作时间倒序"""
+    username = args.get('username', '').strip()
+    operation_type = args.get('operationType', '').strip()
+    start_date = args.get('startDate')
+    end_date = args.get('endDate')
+    
+    query = OperationLog.query
+    
+    if username:
+        query = query.filter(OperationLog.用户账号.like(f'%{username}%'))
+    if operation_type:
+        query = query.filter(OperationLog.操作类型.like(f'%{operation_type}%'))
+    if start_date:
+        query = query.filter(OperationLog.操作时间 >= start_date)
+    if end_date:
+        query = query.filter(OperationLog.操作时间 <= end_date)
+    return query.order_by(OperationLog.操作时间.desc())
+
 @app.route('/api/operation-logs', methods=['GET'])
 @token_required
+@read_replica
 def get_operation_logs():
     """查询操作日志（管理员权限）"""
     current_user = g.current_user
@@ -1056,25 +2322,9 @@ def get_operation_logs():
         # 获取筛选参数
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 50))
-        username = request.args.get('username', '').strip()
-        operation_type = request.args.get('operationType', '').strip()
-        start_date = request.args.get('startDate')
-        end_date = request.args.get('endDate')
-        
-        # 构建查询
-        query = OperationLog.query
-        
-        if username:
-            query = query.filter(OperationLog.用户账号.like(f'%{username}%'))
-        if operation_type:
-            query = query.filter(OperationLog.操作类型.like(f'%{operation_type}%'))
-        if start_date:
-            query = query.filter(OperationLog.操作时间 >= start_date)
-        if end_date:
-            query = query.filter(OperationLog.操作时间 <= end_date)
         
         # 执行分页查询
-        pagination = query.order_by(OperationLog.操作时间.desc()).paginate(
+        pagination = operation_log_query(request.args).paginate(
             page=page,
             per_page=per_page,
             error_out=False
@@ -1133,6 +2383,7 @@ def update_user_name(user_id):
         
         user.用户姓名 = real_name
         db.session.commit()
+        user_cache.discard(user.ID)
         
         # 记录操作日志
         log_operation(
@@ -1153,6 +2404,69 @@ def update_user_name(user_id):
         app.logger.error(f"更新用户姓名失败: {str(e)}")
         return jsonify({'status': 'error', 'message': '更新失败'}), 500
 
+# 8.5. 缓存命中统计（仅管理员）
+@app.route('/api/admin/cache-stats', methods=['GET'])
+@token_required
+def get_cache_stats():
+    """查看本 worker 进程内各缓存的命中情况（管理员权限）"""
+    current_user = g.current_user
+    
+    if current_user.Role != '系统管理员':
+        return jsonify({'status': 'error', 'message': '需要管理员权限'}), 403
+    
+    return jsonify({
+        'status': 'success',
+        'data': {
+            'pid': os.getpid(),
+            'users': user_cache.stats(),
+            'feePrices': fee_price_cache.stats(),
+            'addressTrees': address_tree_cache.stats(),
+            'pricingEngines': pricing_engine_cache.stats()
+        }
+    })
+
+@app.route('/api/admin/operation-log-stats', methods=['GET'])
+@token_required
+def get_operation_log_stats():
+    """查看本 worker 进程操作日志写入队列的积压、写入、丢弃情况（管理员权限）"""
+    current_user = g.current_user
+    
+    if current_user.Role != '系统管理员':
+        return jsonify({'status': 'error', 'message': '需要管理员权限'}), 403
+    
+    return jsonify({'status': 'success', 'data': operation_log_writer.stats()})
+
+@app.route('/api/admin/order-stream-stats', methods=['GET'])
+@token_required
+def get_order_stream_stats():
+    """查看本 worker 进程的订单推送连接数、发布与转发的事件数（管理员权限）"""
+    current_user = g.current_user
+    
+    if current_user.Role != '系统管理员':
+        return jsonify({'status': 'error', 'message': '需要管理员权限'}), 403
+    
+    return jsonify({'status': 'success', 'data': order_event_broker.stats()})
+
+@app.route('/api/admin/pool-stats', methods=['GET'])
+@token_required
+def get_pool_stats():
+    """查看本 worker 进程的数据库连接池状态：占用数、溢出数、取连接等待时间分布（管理员权限）"""
+    current_user = g.current_user
+    
+    if current_user.Role != '系统管理员':
+        return jsonify({'status': 'error', 'message': '需要管理员权限'}), 403
+    
+    return jsonify({
+        'status': 'success',
+        'data': {
+            'pid': os.getpid(),
+            'engines': {
+                (bind or 'default'): pool_stats(engine)
+                for bind, engine in db.engines.items()
+            }
+        }
+    })
+
 # 9. 更新地址的住户信息
 @app.route('/api/addresses/<int:address_id>', methods=['PUT'])
 @token_required
@@ -1229,6 +2543,7 @@ def fee_prices_admin_page():
 # 2. 获取所有收费标准（管理员）
 @app.route('/api/admin/fee_prices', methods=['GET'])
 @token_required
+@conditional_get(admin_fee_prices_etag)
 def get_all_fee_prices():
     """获取所有小区的收费标准（管理员权限）"""
     current_user = g.current_user
@@ -1309,7 +2624,9 @@ def create_fee_price():
         )
         
         db.session.add(new_fee_price)
+        sync_fee_price_versions([new_fee_price], current_user)
         db.session.commit()
+        fee_price_cache.invalidate()
         
         # 记录操作日志
         log_operation(
@@ -1363,7 +2680,10 @@ def update_fee_price(id):
         if 'management' in data:
             fee_price.manage_fee = data['management']
         
+        # 单价有变化的费用类型追加历史版本，原单价保留用于历史订单查询
+        sync_fee_price_versions([fee_price], current_user)
         db.session.commit()
+        fee_price_cache.invalidate()
         
         # 记录操作日志
         log_operation(
@@ -1384,6 +2704,40 @@ def update_fee_price(id):
         app.logger.error(f"更新收费标准异常: {str(e)}\n{traceback.format_exc()}")
         return jsonify({'status': 'error', 'message': '更新收费标准失败'}), 500
 
+# 4.5. 收费标准历史
+@app.route('/api/admin/fee_prices/<int:id>/history', methods=['GET'])
+@token_required
+def get_fee_price_history(id):
+    """
+    查看小区收费标准的历史版本（管理员权限）
+    传 at=YYYY-MM-DD HH:MM:SS 时返回该时刻生效的单价，用于核对历史订单
+    """
+    current_user = g.current_user
+    
+    if current_user.Role != '系统管理员':
+        return jsonify({'status': 'error', 'message': '需要管理员权限'}), 403
+    
+    at = request.args.get('at')
+    if at:
+        try:
+            moment = datetime.strptime(at, '%Y-%m-%d %H:%M:%S') if ' ' in at else datetime.strptime(at, '%Y-%m-%d')
+        except ValueError:
+            return jsonify({'status': 'error', 'message': '时间格式应为 YYYY-MM-DD HH:MM:SS'}), 400
+        prices = get_price_timeline(id).prices_at(moment)
+        return jsonify({
+            'status': 'success',
+            'data': {
+                'at': moment.strftime('%Y-%m-%d %H:%M:%S'),
+                'prices': {fee_type: float(price) if price is not None else None for fee_type, price in prices.items()}
+            }
+        })
+    
+    versions = (FeePriceVersion.query
+                .filter(FeePriceVersion.community_id == id)
+                .order_by(FeePriceVersion.effective_from.desc(), FeePriceVersion.id.desc())
+                .all())
+    return jsonify({'status': 'success', 'data': [version.to_dict() for version in versions]})
+
 # 5. 删除收费标准
 @app.route('/api/admin/fee_prices/<int:id>', methods=['DELETE'])
 @token_required
@@ -1404,7 +2758,9 @@ def delete_fee_price(id):
         
         community_name = fee_price.community
         db.session.delete(fee_price)
+        sync_fee_price_versions([(id, None)], current_user)
         db.session.commit()
+        fee_price_cache.invalidate()
         
         # 记录操作日志
         log_operation(
@@ -1545,6 +2901,62 @@ def download_fee_prices_template():
         return jsonify({'status': 'error', 'message': '下载模板失败'}), 500
 
 # 8. 导入收费标准
+# 导入文件列名 -> FeePrice 字段
+FEE_PRICE_IMPORT_COLUMNS = {
+    '电费单价(元/度)': 'electricity',
+    '冷水费单价(元/吨)': 'coldWater',
+    '热水费单价(元/吨)': 'hotWater',
+    '网费单价(元/月)': 'network',
+    '停车费单价(元/月)': 'parking',
+    '房租单价(元/月)': 'rent_fee',
+    '管理费单价(元/月)': 'manage_fee'
+}
+FEE_PRICE_IMPORT_BATCH_SIZE = 500
+FEE_PRICE_LIMIT = 10 ** 8  # 单价字段为 Numeric(10,2)，须小于该值
+
+def validate_fee_price_sheet(df):
+    """
+    按列整体校验导入表（不逐行查询数据库）
+    返回 (有效行列表, 错误信息列表)；单价为空按0处理，非数字、负数或超出范围视为错误，
+    同一小区在表中重复出现时以第一个校验通过的行为准
+    """
+    import pandas as pd
+    
+    communities = df['小区名称'].fillna('').astype(str).str.strip()
+    valid = communities != ''
+    messages = pd.Series('', index=df.index)
+    
+    prices = {}
+    for column, field in FEE_PRICE_IMPORT_COLUMNS.items():
+        raw = df[column]
+        numeric = pd.to_numeric(raw, errors='coerce')
+        not_number = raw.notna() & (raw.astype(str).str.strip() != '') & numeric.isna()
+        negative = numeric < 0
+        rounded = numeric.round(2)
+        too_large = rounded >= FEE_PRICE_LIMIT  # 包括 inf
+        messages[not_number] += f'{column}不是有效数字；'
+        messages[negative] += f'{column}不能为负数；'
+        messages[too_large] += f'{column}超出范围（须小于{FEE_PRICE_LIMIT}）；'
+        prices[field] = rounded.fillna(0)
+    
+    # 重复只在校验通过的行之间判断，第一行本身有错时由后面的有效行导入
+    passed = valid & (messages == '')
+    duplicated = passed & communities.where(passed).duplicated(keep='first')
+    messages[duplicated] += '小区名称在表中重复；'
+    
+    has_error = valid & (messages != '')
+    errors = [f"第{index + 1}行: {messages[index].rstrip('；')}" for index in df.index[has_error]]
+    
+    # 小区名称为空的行直接跳过（与模板中的空行兼容）
+    keep = valid & ~has_error
+    rows = []
+    for index in df.index[keep]:
+        row = {'community': communities[index]}
+        for field, values in prices.items():
+            row[field] = float(values[index])
+        rows.append(row)
+    return rows, errors
+
 @app.route('/api/admin/fee_prices/import', methods=['POST'])
 @token_required
 def import_fee_prices():
@@ -1578,58 +2990,60 @@ def import_fee_prices():
             df = pd.read_excel(file)
         
         # 验证列名
-        required_columns = ['小区名称', '电费单价(元/度)', '冷水费单价(元/吨)', 
-                          '热水费单价(元/吨)', '网费单价(元/月)', '停车费单价(元/月)',
-                          '房租单价(元/月)', '管理费单价(元/月)']
+        required_columns = ['小区名称'] + list(FEE_PRICE_IMPORT_COLUMNS)
         
         for col in required_columns:
             if col not in df.columns:
                 return jsonify({'status': 'error', 'message': f'缺少必要列: {col}'}), 400
         
-        # 处理数据
-        success_count = 0
-        error_count = 0
-        errors = []
+        # 整表校验，得到有效行和逐行错误
+        rows, errors = validate_fee_price_sheet(df)
+        dry_run = (request.args.get('dryRun') or request.form.get('dryRun')) == 'true'
         
-        for index, row in df.iterrows():
-            try:
-                community = str(row['小区名称']).strip()
-                if not community:
-                    continue
-                
-                # 检查是否已存在
-                existing = FeePrice.query.filter_by(community=community).first()
-                
-                if existing:
-                    # 更新现有记录
-                    existing.electricity = float(row['电费单价(元/度)'] or 0)
-                    existing.coldWater = float(row['冷水费单价(元/吨)'] or 0)
-                    existing.hotWater = float(row['热水费单价(元/吨)'] or 0)
-                    existing.network = float(row['网费单价(元/月)'] or 0)
-                    existing.parking = float(row['停车费单价(元/月)'] or 0)
-                    existing.rent_fee = float(row['房租单价(元/月)'] or 0)
-                    existing.manage_fee = float(row['管理费单价(元/月)'] or 0)
-                    success_count += 1
-                else:
-                    # 创建新记录
-                    new_fee_price = FeePrice(
-                        community=community,
-                        electricity=float(row['电费单价(元/度)'] or 0),
-                        coldWater=float(row['冷水费单价(元/吨)'] or 0),
-                        hotWater=float(row['热水费单价(元/吨)'] or 0),
-                        network=float(row['网费单价(元/月)'] or 0),
-                        parking=float(row['停车费单价(元/月)'] or 0),
-                        rent_fee=float(row['房租单价(元/月)'] or 0),
-                        manage_fee=float(row['管理费单价(元/月)'] or 0)
-                    )
-                    db.session.add(new_fee_price)
-                    success_count += 1
-                    
-            except Exception as e:
-                error_count += 1
-                errors.append(f"第{index + 1}行: {str(e)}")
+        # 一次查询区分新增与更新（用于返回统计）
+        existing = set()
+        names = [row['community'] for row in rows]
+        for offset in range(0, len(names), FEE_PRICE_IMPORT_BATCH_SIZE):
+            batch = names[offset:offset + FEE_PRICE_IMPORT_BATCH_SIZE]
+            existing.update(c for (c,) in db.session.query(FeePrice.community).filter(FeePrice.community.in_(batch)))
+        
+        success_count = len(rows)
+        error_count = len(errors)
+        updated_count = sum(1 for name in names if name in existing)
+        created_count = success_count - updated_count
+        
+        if dry_run:
+            return jsonify({
+                'status': 'success',
+                'message': f'校验完成（未写入），可导入{success_count}条，错误{error_count}条',
+                'dry_run': True,
+                'success_count': success_count,
+                'created_count': created_count,
+                'updated_count': updated_count,
+                'error_count': error_count,
+                'errors': errors
+            })
+        
+        # 分批 upsert：小区名称唯一，已存在则更新单价
+        table = FeePrice.__table__
+        price_fields = list(FEE_PRICE_IMPORT_COLUMNS.values())
+        for offset in range(0, len(rows), FEE_PRICE_IMPORT_BATCH_SIZE):
+            batch = rows[offset:offset + FEE_PRICE_IMPORT_BATCH_SIZE]
+            stmt = build_upsert(table, batch, ['community'], lambda new: dict(
+                {field: new[field] for field in price_fields},
+                updated_at=func.current_timestamp()
+            ))
+            db.session.execute(stmt)
+        
+        # 按小区名称取回写入后的收费标准，记录单价变化
+        imported = []
+        for offset in range(0, len(names), FEE_PRICE_IMPORT_BATCH_SIZE):
+            batch = names[offset:offset + FEE_PRICE_IMPORT_BATCH_SIZE]
+            imported.extend(FeePrice.query.filter(FeePrice.community.in_(batch)).populate_existing())
+        sync_fee_price_versions(imported, current_user)
         
         db.session.commit()
+        fee_price_cache.invalidate()
         
         # 记录操作日志
         log_operation(
@@ -1643,11 +3057,13 @@ def import_fee_prices():
             'status': 'success',
             'message': f'导入完成，成功{success_count}条，失败{error_count}条',
             'success_count': success_count,
+            'created_count': created_count,
+            'updated_count': updated_count,
             'error_count': error_count
         }
         
         if errors:
-            result['errors'] = errors[:10]  # 只返回前10个错误
+            result['errors'] = errors
         
         return jsonify(result)
     
@@ -1662,6 +3078,22 @@ def import_fee_prices():
 
 # 在现有的API路由部分添加以下代码
 
+def recent_orders_community(user):
+    """今日收费记录的小区范围：管理员和小区编号为1的用户看所有小区（None），其他用户只看本小区"""
+    if user.Role == '系统管理员' or user.小区编号 == 1:
+        return None
+    return user.小区编号
+
+def recent_orders_query(user, day):
+    """某日收费记录，按录入时间倒序"""
+    day_start = datetime(day.year, day.month, day.day, 0, 0, 0)
+    day_end = datetime(day.year, day.month, day.day, 23, 59, 59)
+    query = Order.query.filter(Order.录入时间 >= day_start, Order.录入时间 <= day_end)
+    community_id = recent_orders_community(user)
+    if community_id is not None:
+        query = query.filter(Order.小区ID == community_id)
+    return query.order_by(Order.录入时间.desc())
+
 @app.route('/api/recent-orders', methods=['GET'])
 @token_required
 def get_recent_orders():
@@ -1677,124 +3109,27 @@ def get_recent_orders():
         now = datetime.now()
         today = now.date()
         
-        # 使用本地时区创建日期范围
-        today_start = datetime(today.year, today.month, today.day, 0, 0, 0)
-        today_end = datetime(today.year, today.month, today.day, 23, 59, 59)
-        
-        app.logger.info(f"查询日期范围: {today_start} 到 {today_end}")
-        
-        # 构建基础查询 - 查询今日的订单
-        query = Order.query.filter(Order.录入时间 >= today_start, Order.录入时间 <= today_end)
-        
-        # 权限过滤：管理员看所有，操作员只看自己小区的订单
-        if current_user.Role != '系统管理员':
-            # 如果当前登录用户的小区编号=1，则只筛选录入时间=今日日期
-            if current_user.小区编号 == 1:
-                app.logger.info(f"小区编号为1的用户，不限制小区筛选")
-            else:
-                # 否则筛选小区ID=当前登录用户的小区编号
-                query = query.filter(Order.小区ID == current_user.小区编号)
-                app.logger.info(f"非管理员用户，限制查询小区ID: {current_user.小区编号}")
+        # 权限过滤：管理员和小区编号为1的用户看所有小区，其他用户只看自己小区的订单
+        summary_community = recent_orders_community(current_user)
+        if summary_community is None:
+            app.logger.info(f"不限制小区筛选")
         else:
-            app.logger.info(f"管理员用户，查看所有小区订单")
+            app.logger.info(f"非管理员用户，限制查询小区ID: {summary_community}")
         
         # 获取今日所有记录，按录入时间倒序
-        orders = query.order_by(Order.录入时间.desc()).all()
+        orders = recent_orders_query(current_user, today).all()
         app.logger.info(f"查询到 {len(orders)} 条今日订单记录")
         
         result = []
         
-        # 计算今日合计
-        today_total = 0
+        # 今日合计从日汇总表读取，与列表使用相同的小区范围
+        today_total = read_daily_total(today, summary_community)
         
-        for order in orders:
-            address = order.地址
-            
-            # 构建费用项目字符串
-            fee_items = []
-            
-            # 电费
-            if order.电费金额 and float(order.电费金额) > 0:
-                degree = float(order.电费度数) if order.电费度数 else 0
-                amount = float(order.电费金额) if order.电费金额 else 0
-                fee_items.append(f"电费 | {degree}度 | ¥{amount:.2f}")
-            
-            # 冷水费
-            if order.冷水金额 and float(order.冷水金额) > 0:
-                ton = float(order.冷水吨数) if order.冷水吨数 else 0
-                amount = float(order.冷水金额) if order.冷水金额 else 0
-                fee_items.append(f"冷水费 | {ton}吨 | ¥{amount:.2f}")
-            
-            # 热水费
-            if order.热水金额 and float(order.热水金额) > 0:
-                ton = float(order.热水吨数) if order.热水吨数 else 0
-                amount = float(order.热水金额) if order.热水金额 else 0
-                fee_items.append(f"热水费 | {ton}吨 | ¥{amount:.2f}")
-            
-            # 网费
-            if order.网费金额 and float(order.网费金额) > 0:
-                month = order.网费月数 if order.网费月数 else 0
-                amount = float(order.网费金额) if order.网费金额 else 0
-                fee_items.append(f"网费 | {month}个月 | ¥{amount:.2f}")
-            
-            # 停车费
-            if order.停车费金额 and float(order.停车费金额) > 0:
-                month = order.停车费月数 if order.停车费月数 else 0
-                amount = float(order.停车费金额) if order.停车费金额 else 0
-                car_plate = order.车牌号 if order.车牌号 else ""
-                
-                # 格式化日期范围
-                start_date = ""
-                end_date = ""
-                if order.停车开始日期:
-                    start_date = order.停车开始日期.strftime('%Y/%m/%d')
-                if order.停车结束日期:
-                    end_date = order.停车结束日期.strftime('%Y/%m/%d')
-                date_range = f"{start_date}-{end_date}" if start_date and end_date else ""
-                
-                # 按照用户要求的格式：停车费 | 1个月 | ¥130.00 | 2025/12/1-2025/12/31| 皖CMV152
-                if car_plate and date_range:
-                    fee_items.append(f"停车费 | {month}个月 | ¥{amount:.2f} | {date_range}| {car_plate}")
-                elif car_plate:
-                    fee_items.append(f"停车费 | {month}个月 | ¥{amount:.2f} | | {car_plate}")
-                elif date_range:
-                    fee_items.append(f"停车费 | {month}个月 | ¥{amount:.2f} | {date_range}| ")
-                else:
-                    fee_items.append(f"停车费 | {month}个月 | ¥{amount:.2f} | | ")
-            
-            # 房租
-            if order.房租金额 and float(order.房租金额) > 0:
-                months = int(order.房租月数) if order.房租月数 else 0
-                amount = float(order.房租金额) if order.房租金额 else 0
-                fee_items.append(f"房租 | {months}个月 | ¥{amount:.2f}")
-            
-            # 管理费
-            if order.管理费金额 and float(order.管理费金额) > 0:
-                months = int(order.管理费月数) if order.管理费月数 else 0
-                amount = float(order.管理费金额) if order.管理费金额 else 0
-                fee_items.append(f"管理费 | {months}个月 | ¥{amount:.2f}")
-            
-            # 计算今日合计 - 所有订单都是今日订单
-            today_total += float(order.收款金额) if order.收款金额 else 0
-            
-            # 创建订单详情对象
-            order_detail = {
-                'orderId': order.订单ID,
-                'billNumber': order.账单号,
-                'addressId': order.地址ID,  # 添加地址ID字段
-                'entryTime': order.录入时间.strftime('%Y-%m-%d %H:%M:%S') if order.录入时间 else '',
-                'building': address.楼栋号 if address else '',
-                'room': address.房间号 if address else '',
-                'residentName': address.姓名 if address else '',
-                'residentPhone': address.手机号 if address else '',
-                'feeItems': '\n'.join(fee_items),  # 使用换行符分隔
-                'totalAmount': float(order.收款金额) if order.收款金额 else 0,
-                'paymentMethod': order.收款方式,
-                'remark': order.备注,
-                'redReverse': order.红冲  # 添加红冲字段
-            }
-            
-            result.append(order_detail)
+        # 停车费行保持工作台小票格式："日期范围| 车牌号"
+        fee_lines = render_fee_lines(orders, parking_separator='| ')
+        
+        for order, fee_items in zip(orders, fee_lines):
+            result.append(serialize_recent_order(order, fee_items))
         
         app.logger.info(f"返回今日收费记录: {len(result)} 条, 今日合计: {today_total}")
         return jsonify({
@@ -1815,8 +3150,16 @@ def get_recent_orders():
 
 
 # ========== 添加：获取用户历史缴费记录API ==========
+def payment_history_query(user, address_id, limit):
+    """某地址最近 limit 条缴费记录，操作员只能看自己小区的地址"""
+    query = Order.query.filter(Order.地址ID == address_id)
+    if user.Role != '系统管理员':
+        query = query.join(Address).filter(Address.小区编号 == user.小区编号)
+    return query.order_by(Order.录入时间.desc()).limit(limit)
+
 @app.route('/api/user-payment-history', methods=['GET'])
 @token_required
+@conditional_get(payment_history_etag)
 def get_user_payment_history():
     """获取指定用户的历史缴费记录"""
     current_user = g.current_user
@@ -1829,84 +3172,16 @@ def get_user_payment_history():
         if not address_id:
             return jsonify({'status': 'error', 'message': '地址ID不能为空'}), 400
         
-        # 构建查询：根据地址ID查询订单
-        query = Order.query.filter(Order.地址ID == address_id)
-        
-        # 权限过滤：管理员看所有，操作员只看自己小区的订单
-        if current_user.Role != '系统管理员':
-            query = query.join(Address).filter(Address.小区编号 == current_user.小区编号)
-        
-        # 获取最近N条记录，按录入时间倒序
-        orders = query.order_by(Order.录入时间.desc()).limit(limit).all()
+        # 获取最近N条记录，按录入时间倒序（权限过滤：操作员只看自己小区的订单）
+        orders = payment_history_query(current_user, address_id, limit).all()
         
         result = []
         
-        for order in orders:
+        fee_lines = render_fee_lines(orders)
+        
+        for order, fee_items in zip(orders, fee_lines):
             address = order.地址
             
-            # 构建费用项目字符串
-            fee_items = []
-            
-            # 电费
-            if order.电费金额 and float(order.电费金额) > 0:
-                degree = float(order.电费度数) if order.电费度数 else 0
-                amount = float(order.电费金额) if order.电费金额 else 0
-                fee_items.append(f"电费 | {degree}度 | ¥{amount:.2f}")
-            
-            # 冷水费
-            if order.冷水金额 and float(order.冷水金额) > 0:
-                ton = float(order.冷水吨数) if order.冷水吨数 else 0
-                amount = float(order.冷水金额) if order.冷水金额 else 0
-                fee_items.append(f"冷水费 | {ton}吨 | ¥{amount:.2f}")
-            
-            # 热水费
-            if order.热水金额 and float(order.热水金额) > 0:
-                ton = float(order.热水吨数) if order.热水吨数 else 0
-                amount = float(order.热水金额) if order.热水金额 else 0
-                fee_items.append(f"热水费 | {ton}吨 | ¥{amount:.2f}")
-            
-            # 网费
-            if order.网费金额 and float(order.网费金额) > 0:
-                month = order.网费月数 if order.网费月数 else 0
-                amount = float(order.网费金额) if order.网费金额 else 0
-                fee_items.append(f"网费 | {month}个月 | ¥{amount:.2f}")
-            
-            # 停车费
-            if order.停车费金额 and float(order.停车费金额) > 0:
-                month = order.停车费月数 if order.停车费月数 else 0
-                amount = float(order.停车费金额) if order.停车费金额 else 0
-                car_plate = order.车牌号 if order.车牌号 else ""
-                
-                # 格式化日期范围
-                start_date = ""
-                end_date = ""
-                if order.停车开始日期:
-                    start_date = order.停车开始日期.strftime('%Y/%m/%d')
-                if order.停车结束日期:
-                    end_date = order.停车结束日期.strftime('%Y/%m/%d')
-                date_range = f"{start_date}-{end_date}" if start_date and end_date else ""
-                
-                if car_plate and date_range:
-                    fee_items.append(f"停车费 | {month}个月 | ¥{amount:.2f} | {date_range} | {car_plate}")
-                elif car_plate:
-                    fee_items.append(f"停车费 | {month}个月 | ¥{amount:.2f} | | {car_plate}")
-                elif date_range:
-                    fee_items.append(f"停车费 | {month}个月 | ¥{amount:.2f} | {date_range} | ")
-                else:
-                    fee_items.append(f"停车费 | {month}个月 | ¥{amount:.2f} | | ")
-            
-            # 房租
-            if order.房租金额 and float(order.房租金额) > 0:
-                months = int(order.房租月数) if order.房租月数 else 0
-                amount = float(order.房租金额) if order.房租金额 else 0
-                fee_items.append(f"房租 | {months}个月 | ¥{amount:.2f}")
-            
-            # 管理费
-            if order.管理费金额 and float(order.管理费金额) > 0:
-                months = int(order.管理费月数) if order.管理费月数 else 0
-                amount = float(order.管理费金额) if order.管理费金额 else 0
-                fee_items.append(f"管理费 | {months}个月 | ¥{amount:.2f}")
-            
             # 创建订单详情对象
             order_detail = {
                 'orderId': order.订单ID,
@@ -1914,7 +3189,7 @@ def get_user_payment_history():
                 'entryTime': order.录入时间.strftime('%Y-%m-%d %H:%M:%S') if order.录入时间 else '',
                 'building': address.楼栋号 if address else '',
                 'room': address.房间号 if address else '',
-                'feeItems': '\n'.join(fee_items),  # 使用换行符分隔多个费用项目
+                'feeItems': fee_items,  # 使用换行符分隔多个费用项目
                 'paymentMethod': order.收款方式 if order.收款方式 else '',
                 'totalAmount': float(order.收款金额) if order.收款金额 else 0,
                 'remark': order.备注 if order.备注 else '',
@@ -1946,22 +3221,17 @@ def get_today_total():
     try:
         # 获取今天日期
         today = datetime.now().date()
-        today_start = datetime.combine(today, datetime.min.time())
-        today_end = datetime.combine(today, datetime.max.time())
-        
-        # 计算今日总金额
-        query = Order.query.filter(Order.录入时间 >= today_start, Order.录入时间 <= today_end)
         
-        # 权限过滤
+        # 从日汇总表读取今日总金额（权限过滤：管理员看所有小区）
         if current_user.Role != '系统管理员':
-            query = query.join(Address).filter(Address.小区编号 == current_user.小区编号)
-        
-        total = query.with_entities(func.sum(Order.收款金额)).scalar()
+            total = read_daily_total(today, current_user.小区编号)
+        else:
+            total = read_daily_total(today)
         
         return jsonify({
             'status': 'success',
             'data': {
-                'todayTotal': float(total or 0)
+                'todayTotal': total
             }
         })
     
@@ -1971,8 +3241,64 @@ def get_today_total():
 
 
 # ========== 订单查询API ==========
+def build_order_filter_query(current_user, args):
+    """
+    根据订单查询页的筛选参数构建查询（startTime/endTime/buildingId/roomId）
+    时间格式错误时抛出 ValueError
+    """
+    start_time = args.get('startTime')  # 开始时间（YYYY-MM-DD HH:mm）
+    end_time = args.get('endTime')      # 结束时间（YYYY-MM-DD HH:mm）
+    building_id = args.get('buildingId')  # 楼栋ID
+    room_id = args.get('roomId')          # 房间ID
+    
+    # 构建基础查询
+    query = Order.query.join(Address)
+    
+    # 权限过滤：管理员看所有，操作员只看自己小区的订单
+    if current_user.Role != '系统管理员':
+        query = query.filter(Address.小区编号 == current_user.小区编号)
+    
+    # 时间范围筛选
+    if start_time:
+        try:
+            start_dt = datetime.strptime(start_time, '%Y-%m-%d %H:%M')
+        except ValueError:
+            raise ValueError('开始时间格式错误，请使用 YYYY-MM-DD HH:mm 格式')
+        query = query.filter(Order.录入时间 >= start_dt)
+    
+    if end_time:
+        try:
+            end_dt = datetime.strptime(end_time, '%Y-%m-%d %H:%M')
+        except ValueError:
+            raise ValueError('结束时间格式错误，请使用 YYYY-MM-DD HH:mm 格式')
+        query = query.filter(Order.录入时间 <= end_dt)
+    
+    # 楼栋筛选
+    if building_id:
+        query = query.filter(Address.楼栋号 == building_id)
+    
+    # 房间筛选
+    if room_id:
+        query = query.filter(Address.ID == room_id)
+    
+    return query
+
+def apply_order_sort(query, sort_column, sort_order):
+    """按订单查询页的 sort/order 参数排序"""
+    if sort_column == 'orderId':
+        order_field = Order.订单ID
+    elif sort_column == 'totalAmount':
+        order_field = Order.收款金额
+    else:
+        order_field = Order.录入时间  # 默认按录入时间排序
+    
+    if sort_order == 'asc':
+        return query.order_by(order_field.asc())
+    return query.order_by(order_field.desc())
+
 @app.route('/api/v1/orders/query', methods=['GET'])
 @token_required
+@read_replica
 def query_orders():
     """订单查询页面专用API - 支持高级筛选和排序"""
     current_user = g.current_user
@@ -1993,125 +3319,48 @@ def query_orders():
         
         app.logger.info(f"订单查询参数: page={page}, per_page={per_page}, startTime={start_time}, endTime={end_time}, buildingId={building_id}, roomId={room_id}, sort={sort_column}, order={sort_order}")
         
-        # 构建基础查询
-        query = Order.query.join(Address)
-        
-        # 权限过滤：管理员看所有，操作员只看自己小区的订单
-        if current_user.Role != '系统管理员':
-            query = query.filter(Address.小区编号 == current_user.小区编号)
-        
-        # 时间范围筛选
-        if start_time:
-            try:
-                start_dt = datetime.strptime(start_time, '%Y-%m-%d %H:%M')
-                query = query.filter(Order.录入时间 >= start_dt)
-            except ValueError:
-                return jsonify({'status': 'error', 'message': '开始时间格式错误，请使用 YYYY-MM-DD HH:mm 格式'}), 400
+        # 构建筛选查询（与订单导出共用）
+        try:
+            query = build_order_filter_query(current_user, request.args)
+        except ValueError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 400
         
-        if end_time:
+        # 游标分页模式：按 (排序字段, 订单ID) 定位，深页与首页开销相同
+        cursor_pagination = None
+        if wants_cursor_pagination():
             try:
-                end_dt = datetime.strptime(end_time, '%Y-%m-%d %H:%M')
-                query = query.filter(Order.录入时间 <= end_dt)
-            except ValueError:
-                return jsonify({'status': 'error', 'message': '结束时间格式错误，请使用 YYYY-MM-DD HH:mm 格式'}), 400
-        
-        # 楼栋筛选
-        if building_id:
-            query = query.filter(Address.楼栋号 == building_id)
-        
-        # 房间筛选
-        if room_id:
-            query = query.filter(Address.ID == room_id)
+                page_orders, next_cursor, prev_cursor = keyset_paginate(
+                    query, sort_column, sort_order, request.args.get('cursor'), per_page
+                )
+            except ValueError as e:
+                return jsonify({'status': 'error', 'message': str(e)}), 400
+            
+            cursor_pagination = {
+                'mode': 'cursor',
+                'per_page': per_page,
+                'next': next_cursor,
+                'prev': prev_cursor
+            }
+            if request.args.get('withTotal') == 'true':
+                cursor_pagination['total'] = query.order_by(None).count()
         
         # 排序处理
-        if sort_column == 'orderId':
-            order_field = Order.订单ID
-        elif sort_column == 'totalAmount':
-            order_field = Order.收款金额
-        elif sort_column == 'entryTime':
-            order_field = Order.录入时间
-        else:
-            order_field = Order.录入时间  # 默认按录入时间排序
-        
-        if sort_order == 'asc':
-            query = query.order_by(order_field.asc())
-        else:
-            query = query.order_by(order_field.desc())
+        query = apply_order_sort(query, sort_column, sort_order)
         
         # 执行分页查询
-        pagination = query.paginate(
-            page=page,
-            per_page=per_page,
-            error_out=False
-        )
+        if cursor_pagination is None:
+            pagination = query.paginate(
+                page=page,
+                per_page=per_page,
+                error_out=False
+            )
+            page_orders = pagination.items
         
         # 构建返回数据
         orders_data = []
-        for order in pagination.items:
-            # 构建费用项目字符串
-            fee_items = []
-            
-            # 电费
-            if order.电费金额 and float(order.电费金额) > 0:
-                degree = float(order.电费度数) if order.电费度数 else 0
-                amount = float(order.电费金额) if order.电费金额 else 0
-                fee_items.append(f"电费 | {degree}度 | ¥{amount:.2f}")
-            
-            # 冷水费
-            if order.冷水金额 and float(order.冷水金额) > 0:
-                ton = float(order.冷水吨数) if order.冷水吨数 else 0
-                amount = float(order.冷水金额) if order.冷水金额 else 0
-                fee_items.append(f"冷水费 | {ton}吨 | ¥{amount:.2f}")
-            
-            # 热水费
-            if order.热水金额 and float(order.热水金额) > 0:
-                ton = float(order.热水吨数) if order.热水吨数 else 0
-                amount = float(order.热水金额) if order.热水金额 else 0
-                fee_items.append(f"热水费 | {ton}吨 | ¥{amount:.2f}")
-            
-            # 网费
-            if order.网费金额 and float(order.网费金额) > 0:
-                months = int(order.网费月数) if order.网费月数 else 0
-                amount = float(order.网费金额) if order.网费金额 else 0
-                fee_items.append(f"网费 | {months}个月 | ¥{amount:.2f}")
-            
-            # 停车费
-            if order.停车费金额 and float(order.停车费金额) > 0:
-                months = int(order.停车费月数) if order.停车费月数 else 0
-                amount = float(order.停车费金额) if order.停车费金额 else 0
-                
-                # 添加日期范围和车牌信息
-                date_range = ""
-                car_plate = ""
-                
-                if order.停车开始日期 and order.停车结束日期:
-                    start_date = order.停车开始日期.strftime('%Y/%m/%d')
-                    end_date = order.停车结束_date.strftime('%Y/%m/%d')
-                    date_range = f"{start_date}-{end_date}"
-                
-                if order.车牌号:
-                    car_plate = order.车牌号
-                
-                if car_plate and date_range:
-                    fee_items.append(f"停车费 | {months}个月 | ¥{amount:.2f} | {date_range} | {car_plate}")
-                elif car_plate:
-                    fee_items.append(f"停车费 | {months}个月 | ¥{amount:.2f} | | {car_plate}")
-                elif date_range:
-                    fee_items.append(f"停车费 | {months}个月 | ¥{amount:.2f} | {date_range} | ")
-                else:
-                    fee_items.append(f"停车费 | {months}个月 | ¥{amount:.2f} | | ")
-            
-            # 房租
-            if order.房租金额 and float(order.房租金额) > 0:
-                months = int(order.房租月数) if order.房租月数 else 0
-                amount = float(order.房租金额) if order.房租金额 else 0
-                fee_items.append(f"房租 | {months}个月 | ¥{amount:.2f}")
-            
-            # 管理费
-            if order.管理费金额 and float(order.管理费金额) > 0:
-                months = int(order.管理费月数) if order.管理费月数 else 0
-                amount = float(order.管理费金额) if order.管理费金额 else 0
-                fee_items.append(f"管理费 | {months}个月 | ¥{amount:.2f}")
+        fee_lines = render_fee_lines(page_orders)
+        for index, order in enumerate(page_orders):
+            fee_items = fee_lines[index]
             
             # 构建订单对象
             order_data = {
@@ -2122,7 +3371,7 @@ def query_orders():
                 'room': order.地址.房间号 if order.地址 else '',
                 'residentName': order.地址.姓名 if order.地址 else '',
                 'residentPhone': order.地址.手机号 if order.地址 else '',
-                'feeItems': '\n'.join(fee_items),  # 使用换行符分隔
+                'feeItems': fee_items,  # 使用换行符分隔
                 'totalAmount': float(order.收款金额) if order.收款金额 else 0,
                 'paymentMethod': order.收款方式 or '',
                 'remark': order.备注 or '',
@@ -2131,6 +3380,13 @@ def query_orders():
             
             orders_data.append(order_data)
         
+        if cursor_pagination is not None:
+            return jsonify({
+                'status': 'success',
+                'data': orders_data,
+                'pagination': cursor_pagination
+            })
+        
         return jsonify({
             'status': 'success',
             'data': orders_data,
@@ -2168,6 +3424,284 @@ def query_orders():
 
 
 
+
+# ========== 订单导出API ==========
+# 导出时每批从数据库读取的行数（服务器端游标）
+EXPORT_CHUNK_SIZE = 1000
+
+EXPORT_HEADERS = ['账单号', '录入时间', '楼栋号', '房间号', '住户姓名', '手机号',
+                  '费用明细', '收款金额', '收款方式', '备注', '红冲']
+
+def iter_export_rows(query):
+    """使用服务器端游标分批读取订单，逐行产出导出数据，内存占用与总行数无关"""
+    chunk = []
+    for order in query.yield_per(EXPORT_CHUNK_SIZE):
+        chunk.append(order)
+        if len(chunk) >= EXPORT_CHUNK_SIZE:
+            yield from _export_chunk_rows(chunk)
+            chunk = []
+    if chunk:
+        yield from _export_chunk_rows(chunk)
+
+def _export_chunk_rows(orders):
+    fee_lines = render_fee_lines(orders, use_cache=False)
+    for order, fee_items in zip(orders, fee_lines):
+        address = order.地址
+        yield [
+            order.账单号,
+            order.录入时间.strftime('%Y-%m-%d %H:%M:%S') if order.录入时间 else '',
+            address.楼栋号 if address else '',
+            address.房间号 if address else '',
+            (address.姓名 or '') if address else '',
+            (address.手机号 or '') if address else '',
+            fee_items.replace('\n', '；'),
+            float(order.收款金额) if order.收款金额 else 0,
+            order.收款方式 or '',
+            order.备注 or '',
+            '是' if order.红冲 else '否'
+        ]
+
+def stream_orders_csv(query):
+    """逐批生成CSV内容（带BOM，Excel可直接打开中文）"""
+    import csv
+    import io
+    
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    yield '\ufeff'.encode('utf-8')
+    writer.writerow(EXPORT_HEADERS)
+    
+    for index, row in enumerate(iter_export_rows(query), start=1):
+        writer.writerow(row)
+        if index % EXPORT_CHUNK_SIZE == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue().encode('utf-8')
+
+def stream_orders_xlsx(query):
+    """
+    使用 openpyxl 只写模式逐行写入（行数据先落到临时文件，不在内存中保留），
+    xlsx 是zip格式，需在全部写完后再分块输出
+    """
+    import tempfile
+    from openpyxl import Workbook
+    
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet('订单')
+    worksheet.append(EXPORT_HEADERS)
+    for row in iter_export_rows(query):
+        worksheet.append(row)
+    
+    with tempfile.TemporaryFile() as output:
+        workbook.save(output)
+        output.seek(0)
+        while True:
+            data = output.read(64 * 1024)
+            if not data:
+                break
+            yield data
+
+@app.route('/api/v1/orders/export', methods=['GET'])
+@token_required
+@read_replica
+def export_orders():
+    """按订单查询页的筛选条件流式导出订单（format=csv 或 xlsx）"""
+    current_user = g.current_user
+    
+    if not current_user.Read:
+        return jsonify({'status': 'error', 'message': '当前用户没有读取权限'}), 403
+    
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in ('csv', 'xlsx'):
+        return jsonify({'status': 'error', 'message': '导出格式仅支持 csv 或 xlsx'}), 400
+    
+    try:
+        query = build_order_filter_query(current_user, request.args)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    
+    query = apply_order_sort(query, request.args.get('sort', 'entryTime'), request.args.get('order', 'desc'))
+    
+    log_operation(
+        user_account=current_user.USERNAME,
+        operation_type='导出订单',
+        details=f'导出订单（{export_format}），筛选条件: {dict(request.args)}',
+        community_num=current_user.小区编号
+    )
+    
+    filename = f'订单导出_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{export_format}'
+    if export_format == 'csv':
+        body = stream_orders_csv(query)
+        mimetype = 'text/csv'
+    else:
+        body = stream_orders_xlsx(query)
+        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(filename)}"
+    return response
+
+# ========== 报表API ==========
+# 下钻维度：接口参数名 -> report_rollups 列名
+REPORT_DIMENSIONS = {
+    'community': '小区ID',
+    'feeType': '费用类型',
+    'paymentMethod': '收款方式',
+    'operator': '操作员ID'
+}
+REPORT_GRANULARITIES = ('day', 'month', 'quarter', 'year')
+
+def report_period(year, month, day, granularity):
+    """把日期归入统计周期：2025-12-01 / 2025-12 / 2025-Q4 / 2025"""
+    if granularity == 'day':
+        return day.strftime('%Y-%m-%d')
+    if granularity == 'month':
+        return f'{year}-{month:02d}'
+    if granularity == 'quarter':
+        return f'{year}-Q{(month - 1) // 3 + 1}'
+    return str(year)
+
+def report_rollup_query(start_date, end_date, granularity, group_by, filters):
+    """
+    report_rollups 的分组查询，每行为 (周期列..., 维度列..., 订单数, 数量合计, 金额合计)
+    按日统计时周期列为日期，否则为年、月两列
+    未按费用类型下钻且未筛选费用类型时读取整单行（total），笔数与金额与订单一致
+    """
+    fee_type = filters.get('feeType')
+    if fee_type is None and 'feeType' not in group_by:
+        fee_type = ROLLUP_TOTAL
+    
+    dimension_columns = [getattr(ReportRollup, REPORT_DIMENSIONS[name]) for name in group_by]
+    if granularity == 'day':
+        period_columns = [ReportRollup.日期]
+    else:
+        # 月/季/年在数据库中先按年月合并，季度和年度再在内存中合并（最多12倍）
+        period_columns = [func.extract('year', ReportRollup.日期), func.extract('month', ReportRollup.日期)]
+    
+    query = db.session.query(
+        *period_columns, *dimension_columns,
+        func.sum(ReportRollup.订单数), func.sum(ReportRollup.数量合计), func.sum(ReportRollup.金额合计)
+    ).filter(ReportRollup.日期 >= start_date, ReportRollup.日期 <= end_date)
+    if fee_type is not None:
+        query = query.filter(ReportRollup.费用类型 == fee_type)
+    else:
+        query = query.filter(ReportRollup.费用类型 != ROLLUP_TOTAL)
+    for name, value in filters.items():
+        if name != 'feeType':
+            query = query.filter(getattr(ReportRollup, REPORT_DIMENSIONS[name]) == value)
+    return query.group_by(*period_columns, *dimension_columns)
+
+def query_report_rollup(start_date, end_date, granularity, group_by, filters):
+    """按周期和下钻维度汇总 report_rollups，返回 [(周期, {维度: 值}, 订单数, 数量合计, 金额合计), ...]"""
+    rows = report_rollup_query(start_date, end_date, granularity, group_by, filters).all()
+    
+    merged = {}
+    offset = 1 if granularity == 'day' else 2
+    for row in rows:
+        if granularity == 'day':
+            period = report_period(None, None, row[0], 'day')
+        else:
+            period = report_period(int(row[0]), int(row[1]), None, granularity)
+        dimensions = tuple(row[offset:offset + len(group_by)])
+        count, quantity, amount = row[offset + len(group_by):]
+        old = merged.get((period, dimensions), (0, Decimal('0.00'), Decimal('0.00')))
+        merged[(period, dimensions)] = (old[0] + int(count or 0),
+                                        old[1] + _to_cents_decimal(quantity),
+                                        old[2] + _to_cents_decimal(amount))
+    
+    return [
+        (period, dict(zip(group_by, dimensions)), count, quantity, amount)
+        for (period, dimensions), (count, quantity, amount)
+        in sorted(merged.items(), key=lambda item: (item[0][0], [str(v) for v in item[0][1]]))
+        if count or amount
+    ]
+
+@app.route('/api/reports/summary', methods=['GET'])
+@token_required
+@read_replica
+def get_report_summary():
+    """
+    收费报表：按 日/月/季/年 汇总，可按 小区、费用类型、收款方式、操作员 下钻（需要报表权限）
+    参数：granularity、startDate、endDate（YYYY-MM-DD，默认今年1月1日至今天）、
+    groupBy（逗号分隔的维度）、community / feeType / paymentMethod / operator（筛选）
+    """
+    current_user = g.current_user
+    
+    if not current_user.Report and current_user.Role != '系统管理员':
+        return jsonify({'status': 'error', 'message': '当前用户没有报表权限'}), 403
+    
+    granularity = request.args.get('granularity', 'month')
+    if granularity not in REPORT_GRANULARITIES:
+        return jsonify({'status': 'error', 'message': '统计周期仅支持 day、month、quarter、year'}), 400
+    
+    group_by = [name for name in request.args.get('groupBy', '').split(',') if name]
+    invalid = [name for name in group_by if name not in REPORT_DIMENSIONS]
+    if invalid or len(set(group_by)) != len(group_by):
+        return jsonify({'status': 'error', 'message': f'无效的下钻维度: {",".join(invalid) or "重复"}'}), 400
+    
+    try:
+        today = datetime.now().date()
+        start_date = (datetime.strptime(request.args['startDate'], '%Y-%m-%d').date()
+                      if request.args.get('startDate') else today.replace(month=1, day=1))
+        end_date = (datetime.strptime(request.args['endDate'], '%Y-%m-%d').date()
+                    if request.args.get('endDate') else today)
+        filters = {}
+        for name in ('community', 'operator'):
+            if request.args.get(name):
+                filters[name] = int(request.args[name])
+    except ValueError:
+        return jsonify({'status': 'error', 'message': '日期格式应为 YYYY-MM-DD，小区和操作员应为数字'}), 400
+    for name in ('feeType', 'paymentMethod'):
+        if name in request.args:
+            filters[name] = request.args[name]
+    if filters.get('feeType') not in (None, ROLLUP_TOTAL) and filters['feeType'] not in FEE_MAPPING:
+        return jsonify({'status': 'error', 'message': '无效的费用类型'}), 400
+    
+    # 权限过滤：管理员看所有小区，其他用户只看自己小区
+    if current_user.Role != '系统管理员':
+        filters['community'] = current_user.小区编号
+    
+    try:
+        rows = query_report_rollup(start_date, end_date, granularity, group_by, filters)
+        
+        operator_names = {}
+        if 'operator' in group_by:
+            operator_ids = {dimensions['operator'] for _, dimensions, _, _, _ in rows}
+            operator_names = {
+                user.ID: user.用户姓名 or user.USERNAME
+                for user in User.query.filter(User.ID.in_(operator_ids)).all()
+            } if operator_ids else {}
+        
+        result = []
+        total_count, total_amount = 0, Decimal('0.00')
+        for period, dimensions, count, quantity, amount in rows:
+            item = {'period': period, **dimensions}
+            if 'operator' in dimensions:
+                item['operatorName'] = operator_names.get(dimensions['operator'], '')
+            item['orders'] = count
+            if 'feeType' in dimensions or filters.get('feeType') not in (None, ROLLUP_TOTAL):
+                item['quantity'] = float(quantity)
+            item['amount'] = float(amount)
+            result.append(item)
+            total_count += count
+            total_amount += amount
+        
+        return jsonify({
+            'status': 'success',
+            'data': {
+                'granularity': granularity,
+                'startDate': start_date.strftime('%Y-%m-%d'),
+                'endDate': end_date.strftime('%Y-%m-%d'),
+                'groupBy': group_by,
+                'rows': result,
+                'total': {'orders': total_count, 'amount': float(total_amount)}
+            }
+        })
+    
+    except Exception as e:
+        app.logger.error(f"报表查询异常: {str(e)}\n{traceback.format_exc()}")
+        return jsonify({'status': 'error', 'message': '报表查询失败'}), 500
 
 # ========== 错误处理 ==========
 @app.errorhandler(404)
@@ -0,0 +1,165 @@
+"""
+公寓物业收费系统 - 结构化日志
+
+请求线程只把日志记录放进队列（QueueHandler），由后台 QueueListener 线程格式化为
+JSON 并写文件，接口不再因写日志做同步文件 I/O。每条日志附带请求ID、用户、小区、接口名。
+
+多个 gunicorn worker 写同一个日志文件：轮转时先加文件锁，
+若文件已被其他 worker 轮转过则只重新打开，不会互相覆盖备份。
+"""
+
+import os
+import copy
+import json
+import time
+import queue
+import atexit
+import fcntl
+import logging
+import threading
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+
+from flask import g, request, has_request_context
+
+
+class MultiProcessTimedRotatingFileHandler(TimedRotatingFileHandler):
+    """按时间轮转的文件处理器，多进程同时写同一文件时只有一个进程执行轮转"""
+
+    def doRollover(self):
+        with open(f'{self.baseFilename}.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                if self._rotated_by_other_process():
+                    # 其他 worker 已完成轮转：关闭旧文件，改写新文件
+                    if self.stream:
+                        self.stream.close()
+                        self.stream = None
+                    self.stream = self._open()
+                    self.rolloverAt = self.computeRollover(int(time.time()))
+                else:
+                    super().doRollover()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _rotated_by_other_process(self):
+        if self.stream is None:
+            return False
+        try:
+            on_disk = os.stat(self.baseFilename)
+        except FileNotFoundError:
+            return False
+        current = os.fstat(self.stream.fileno())
+        return (on_disk.st_dev, on_disk.st_ino) != (current.st_dev, current.st_ino)
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出一行 JSON"""
+
+    def format(self, record):
+        payload = {
+            'time': datetime.fromtimestamp(record.created).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3],
+            'level': record.levelname,
+            'message': record.getMessage(),
+            'requestId': getattr(record, 'request_id', None),
+            'user': getattr(record, 'user', None),
+            'community': getattr(record, 'community', None),
+            'endpoint': getattr(record, 'endpoint', None),
+            'pid': record.process,
+            'location': f'{record.module}:{record.lineno}'
+        }
+        if record.exc_text:
+            payload['exception'] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    在请求线程中给日志记录补充请求上下文，并按接口采样 INFO 及以下级别的日志
+    采样结果由 before_request 按请求决定（g.log_sampled），同一请求的日志要么全留要么全丢
+    """
+
+    def filter(self, record):
+        if not has_request_context():
+            return True
+        if record.levelno <= logging.INFO and not g.get('log_sampled', True):
+            return False
+        record.request_id = g.get('request_id')
+        current_user = g.get('current_user')
+        if current_user is not None:
+            record.user = current_user.USERNAME
+            record.community = current_user.小区编号
+        record.endpoint = request.endpoint
+        return True
+
+
+class ProcessLocalQueueHandler(QueueHandler):
+    """
+    每个进程各自启动 QueueListener 的 QueueHandler
+    gunicorn 预加载时在 master 中创建，fork 后子进程没有监听线程，首次写日志时按进程重新启动
+    队列写满时丢弃日志并计数，不阻塞请求线程
+    """
+
+    def __init__(self, handlers, maxsize=10000):
+        super().__init__(None)
+        self.handlers = handlers
+        self.maxsize = maxsize
+        self.dropped = 0
+        self.listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        atexit.register(self.stop)
+
+    def _ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self.queue = queue.Queue(maxsize=self.maxsize)
+            self.listener = QueueListener(self.queue, *self.handlers, respect_handler_level=True)
+            self.listener.start()
+            self._pid = os.getpid()
+
+    def prepare(self, record):
+        # 消息与异常堆栈在请求线程中展开为文本，避免把参数对象和 traceback 带到其他线程
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        self._ensure_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def stop(self):
+        """写完队列中剩余的日志（进程退出时自动调用）"""
+        if self._pid == os.getpid() and self.listener is not None:
+            self.listener.stop()
+            self._pid = None
+
+
+def setup_queue_logging(logger, log_file, level=logging.INFO, backup_count=7, maxsize=10000):
+    """给 logger 挂上 队列 -> JSON 文件 的日志链路，返回 QueueHandler"""
+    file_handler = MultiProcessTimedRotatingFileHandler(
+        log_file,
+        when='midnight',
+        interval=1,
+        backupCount=backup_count,
+        encoding='utf-8'
+    )
+    file_handler.setFormatter(JsonFormatter())
+    file_handler.setLevel(level)
+
+    queue_handler = ProcessLocalQueueHandler([file_handler], maxsize=maxsize)
+    queue_handler.addFilter(RequestContextFilter())
+    queue_handler.setLevel(level)
+    logger.addHandler(queue_handler)
+    logger.setLevel(level)
+    return queue_handler
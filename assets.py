@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+静态资源构建：为 static/lib、static/app 生成带内容哈希的文件名，并预压缩 gzip / brotli 版本
+
+用法:
+    python3 assets.py build          # 生成 static/dist 与 manifest.json
+    python3 assets.py build --clean  # 同时删除不在当前清单中的旧文件
+
+构建产物:
+    static/dist/lib/vue.global.3f9c2a1b7e.js      内容哈希文件名
+    static/dist/lib/vue.global.3f9c2a1b7e.js.gz   gzip 预压缩
+    static/dist/lib/vue.global.3f9c2a1b7e.js.br   brotli 预压缩（需安装 Brotli）
+    static/dist/manifest.json                     原路径 -> 哈希路径
+
+模板中用 {{ asset_url('lib/vue.global.js') }} 引用资源：有清单时输出哈希路径，
+没有构建过时输出原路径，开发环境无需构建。哈希路径的内容永不变化，
+serve_static 对其返回 Cache-Control: immutable，并按 Accept-Encoding 直接发送预压缩文件。
+部署新版本时先构建再重载服务，旧哈希文件保留给仍在使用旧页面的浏览器。
+"""
+
+import os
+import re
+import sys
+import gzip
+import json
+import hashlib
+import argparse
+import threading
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+SOURCE_DIRS = ['lib', 'app']
+DIST_DIR_NAME = 'dist'
+MANIFEST_NAME = 'manifest.json'
+
+# 需要预压缩的文本类资源；woff2、图片等本身已压缩
+COMPRESSIBLE_EXTENSIONS = {'.js', '.css', '.svg', '.json', '.map', '.ttf', '.eot', '.txt', '.html'}
+HASH_LENGTH = 10
+
+CSS_URL_PATTERN = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+
+# ========== 运行时：清单读取 ==========
+class AssetManifest:
+    """读取 static/dist/manifest.json，文件更新后自动重新加载（只做一次 os.stat）"""
+
+    def __init__(self, static_dir=STATIC_DIR):
+        self.path = os.path.join(static_dir, DIST_DIR_NAME, MANIFEST_NAME)
+        self._signature = None
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def entries(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return {}
+        signature = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if signature != self._signature:
+            with self._lock:
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        entries = json.load(f)
+                except (OSError, ValueError):
+                    return self._entries
+                self._signature, self._entries = signature, entries
+        return self._entries
+
+    def url(self, logical_path):
+        """返回资源 URL：已构建时为 /static/dist/... 哈希路径，否则为原路径"""
+        logical_path = logical_path.lstrip('/')
+        return '/static/' + self.entries().get(logical_path, logical_path)
+
+
+def is_fingerprinted(filename):
+    """是否为构建产物（内容不可变，可长期缓存）"""
+    return filename.startswith(DIST_DIR_NAME + '/') and not filename.endswith(MANIFEST_NAME)
+
+
+# ========== 构建 ==========
+def _fingerprint(logical_path, content):
+    digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+    root, ext = os.path.splitext(logical_path)
+    return f'{DIST_DIR_NAME}/{root}.{digest}{ext}'
+
+
+def _iter_sources(static_dir):
+    for source in SOURCE_DIRS:
+        base = os.path.join(static_dir, source)
+        for dirpath, dirnames, filenames in os.walk(base):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+            for filename in sorted(filenames):
+                if filename.startswith('.'):
+                    continue
+                path = os.path.join(dirpath, filename)
+                yield os.path.relpath(path, static_dir).replace(os.sep, '/'), path
+
+
+def _rewrite_css_urls(logical_path, content, manifest):
+    """把 CSS 中引用的其他资源改成哈希路径（字体等需先于 CSS 构建）"""
+    css_dir = os.path.dirname(logical_path)
+    text = content.decode('utf-8')
+
+    def replace(match):
+        quote, url = match.group(1), match.group(2).strip()
+        if url.startswith(('data:', '#', 'http:', 'https:', '//')):
+            return match.group(0)
+        path, sep, suffix = url.partition('?')
+        if not sep:
+            path, sep, suffix = url.partition('#')
+        if path.startswith('/static/'):
+            target = path[len('/static/'):]
+        else:
+            target = os.path.normpath(os.path.join(css_dir, path)).replace(os.sep, '/')
+        if target not in manifest:
+            return match.group(0)
+        return f'url({quote}/static/{manifest[target]}{sep}{suffix}{quote})'
+
+    return CSS_URL_PATTERN.sub(replace, text).encode('utf-8')
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.exists(path):
+        return False  # 哈希相同即内容相同，无需重写
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+    return True
+
+
+def _compress_variants(path, content, brotli):
+    """写入 .gz / .br 预压缩文件，仅在确实变小时保留"""
+    written = []
+    gz = gzip.compress(content, compresslevel=9, mtime=0)
+    if len(gz) < len(content):
+        _write(path + '.gz', gz)
+        written.append(('gzip', len(gz)))
+    if brotli is not None:
+        br = brotli.compress(content, quality=11)
+        if len(br) < len(content):
+            _write(path + '.br', br)
+            written.append(('br', len(br)))
+    return written
+
+
+def build(static_dir=STATIC_DIR, clean=False):
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+        print("⚠️ 未安装 Brotli（pip install Brotli），仅生成 gzip 预压缩文件")
+
+    sources = list(_iter_sources(static_dir))
+    # CSS 最后处理，以便替换其中引用的字体、图片路径
+    sources.sort(key=lambda item: item[0].endswith('.css'))
+
+    manifest = {}
+    for logical_path, path in sources:
+        with open(path, 'rb') as f:
+            content = f.read()
+        if logical_path.endswith('.css'):
+            content = _rewrite_css_urls(logical_path, content, manifest)
+
+        fingerprinted = _fingerprint(logical_path, content)
+        manifest[logical_path] = fingerprinted
+        output = os.path.join(static_dir, fingerprinted)
+        _write(output, content)
+
+        variants = []
+        if os.path.splitext(logical_path)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+            variants = _compress_variants(output, content, brotli)
+        sizes = ', '.join(f'{name} {size / 1024:.0f}KB' for name, size in variants)
+        print(f"✅ {logical_path} -> {fingerprinted} ({len(content) / 1024:.0f}KB{', ' + sizes if sizes else ''})")
+
+    dist_dir = os.path.join(static_dir, DIST_DIR_NAME)
+    os.makedirs(dist_dir, exist_ok=True)
+    manifest_path = os.path.join(dist_dir, MANIFEST_NAME)
+    with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    print(f"清单已写入 {os.path.relpath(manifest_path, static_dir)}，共 {len(manifest)} 个文件")
+
+    if clean:
+        keep = {os.path.join(static_dir, p) for p in manifest.values()}
+        keep |= {p + suffix for p in keep for suffix in ('.gz', '.br')}
+        keep.add(manifest_path)
+        for dirpath, _, filenames in os.walk(dist_dir):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                if path not in keep:
+                    os.remove(path)
+                    print(f"🗑️ 删除旧文件 {os.path.relpath(path, static_dir)}")
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='静态资源构建（内容哈希 + 预压缩）')
+    sub = parser.add_subparsers(dest='command', required=True)
+    build_parser = sub.add_parser('build', help='生成 static/dist')
+    build_parser.add_argument('--clean', action='store_true', help='删除不在当前清单中的旧文件')
+    args = parser.parse_args(argv)
+
+    build(clean=args.clean)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
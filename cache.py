@@ -0,0 +1,151 @@
+"""
+公寓物业收费系统 - 进程内缓存模块
+
+多个 gunicorn worker 各自持有缓存，写操作通过本地版本文件（GenerationStamp）
+通知其他 worker 失效：读取时只做一次 os.stat，版本变化才重新读文件。
+"""
+
+import os
+import time
+import fcntl
+import threading
+from collections import OrderedDict
+
+from config import Config
+
+
+class GenerationStamp:
+    """跨进程的版本号，保存在 CACHE_STAMP_DIR 下的 <name>.gen 文件中"""
+
+    def __init__(self, name, directory=None):
+        self.name = name
+        self.path = os.path.join(directory or Config.CACHE_STAMP_DIR, f'{name}.gen')
+        self._signature = None
+        self._value = 0
+        # 可重入锁：持锁期间再次调用 current() 不会死锁
+        self._lock = threading.RLock()
+
+    def current(self):
+        """返回当前版本号（文件不存在时为0）"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return 0
+        signature = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if signature != self._signature:
+            with self._lock:
+                try:
+                    with open(self.path, 'r', encoding='ascii') as f:
+                        value = int(f.read().strip() or 0)
+                except (OSError, ValueError):
+                    return self._value
+                self._signature, self._value = signature, value
+        return self._value
+
+    def bump(self):
+        """
+        递增版本号，在数据库提交之后调用；返回 (被替换的版本号, 新版本号)
+        读取和写入在文件锁内完成，被替换的版本号就是递增前最后生效的版本，
+        调用方据此判断期间是否有其他进程递增过（见 VersionedCache.carry_forward）
+        新版本取纳秒时间戳，且总是大于被替换的版本
+        """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(f'{self.path}.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                try:
+                    with open(self.path, 'r', encoding='ascii') as f:
+                        previous = int(f.read().strip() or 0)
+                except (OSError, ValueError):
+                    previous = 0
+                value = max(time.time_ns(), previous + 1)
+                tmp_path = f'{self.path}.{os.getpid()}.{threading.get_ident()}.tmp'
+                with open(tmp_path, 'w', encoding='ascii') as f:
+                    f.write(str(value))
+                os.replace(tmp_path, self.path)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+        with self._lock:
+            self._signature = None
+        return previous, value
+
+
+class VersionedCache:
+    """
+    按版本号失效的 LRU 缓存
+    每个条目记录写入时的版本号，版本号变化后旧条目自动失效；
+    设置 ttl（秒）时条目到期也会失效，用于兜住绕过接口直接改库的情况
+    """
+
+    def __init__(self, stamp, maxsize=1024, ttl=None):
+        self.stamp = stamp
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, loader):
+        """读取缓存，未命中或版本过期时调用 loader() 加载；loader 返回 None 时不缓存"""
+        generation = self.stamp.current()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == generation and (entry[1] is None or entry[1] > now):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+
+        value = loader()
+        if value is None:
+            return None
+        expires_at = now + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (generation, expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def carry_forward(self, old_generation, new_generation, apply):
+        """
+        本进程把版本号从 old_generation 递增到 new_generation、且清楚具体改动时调用
+        （old_generation 须是 bump() 返回的被替换版本，期间有其他进程递增过时不要调用）：
+        对仍停留在 old_generation 的条目执行 apply(key, value) 原地更新后沿用到新版本，
+        apply 返回 False 的条目删除；其他进程的条目照常按新版本整体重新加载
+        """
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if entry[0] != old_generation:
+                    continue
+                if apply(key, entry[2]):
+                    self._entries[key] = (new_generation, entry[1], entry[2])
+                else:
+                    del self._entries[key]
+
+    def discard(self, key):
+        """删除单个条目并通知其他进程（其他进程无法按键失效，会整体重新加载）"""
+        with self._lock:
+            self._entries.pop(key, None)
+        return self.stamp.bump()[1]
+
+    def invalidate(self):
+        """清空本进程缓存并通知其他进程"""
+        with self._lock:
+            self._entries.clear()
+        return self.stamp.bump()[1]
+
+    def stats(self):
+        """返回命中统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hitRate': round(self.hits / total, 4) if total else 0.0,
+                'generation': self.stamp.current()
+            }
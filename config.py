@@ -1,4 +1,7 @@
 import os
+import tempfile
+
+APP_DIR = os.path.abspath(os.path.dirname(__file__))
 
 class Config:
     # === 数据库配置 (指向远程数据库服务器) ===
@@ -10,8 +13,85 @@ class Config:
     SQLALCHEMY_DATABASE_URI = f'mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # === 只读从库（可选）===
+    # 设置 DB_REPLICA_HOST（或直接设置 SQLALCHEMY_REPLICA_URI）后，查询/导出类接口读从库
+    DB_REPLICA_HOST = os.environ.get('DB_REPLICA_HOST', '')
+    SQLALCHEMY_REPLICA_URI = os.environ.get('SQLALCHEMY_REPLICA_URI') or (
+        f'mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_REPLICA_HOST}:{DB_PORT}/{DB_NAME}' if DB_REPLICA_HOST else '')
+    SQLALCHEMY_BINDS = {'replica': SQLALCHEMY_REPLICA_URI} if SQLALCHEMY_REPLICA_URI else {}
+    # 用户写入后多少秒内仍读主库（读己之写），应大于从库的复制延迟
+    READ_YOUR_WRITES_SECONDS = int(os.environ.get('READ_YOUR_WRITES_SECONDS', '5'))
+
     # === 应用秘钥 ===
     SECRET_KEY = 'your-super-secret-jwt-key-change-this-in-production'
 
     # === 账单号前缀 ===
     BILL_PREFIX = 'WD'
+    # 账单号节点号（0-99），多台应用主机时每台配置不同的值；单台主机未设置时为 0
+    BILL_NODE_ID = int(os.environ['BILL_NODE_ID']) if os.environ.get('BILL_NODE_ID') else None
+    # 应用主机台数：大于1时必须设置 BILL_NODE_ID，否则拒绝启动（各主机节点号相同会生成重复账单号）
+    APP_HOST_COUNT = int(os.environ.get('APP_HOST_COUNT', '1'))
+
+    # === 缓存配置 ===
+    # 多个 worker 通过该目录下的版本文件同步缓存失效（同一主机内）
+    CACHE_STAMP_DIR = os.environ.get('CACHE_STAMP_DIR', os.path.join(tempfile.gettempdir(), 'wjwy_cache'))
+
+    # === 请求指标（/metrics）===
+    # 各 worker 每隔 METRICS_DUMP_INTERVAL 秒把指标快照写入该目录，/metrics 合并输出
+    METRICS_DIR = os.environ.get('METRICS_DIR', os.path.join(CACHE_STAMP_DIR, 'metrics'))
+    METRICS_DUMP_INTERVAL = int(os.environ.get('METRICS_DUMP_INTERVAL', '5'))
+    # 允许抓取 /metrics 的来源地址，逗号分隔
+    METRICS_ALLOWED_IPS = [ip.strip() for ip in os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',') if ip.strip()]
+
+    # === 应用日志 ===
+    LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', '10000'))  # 日志队列容量，写满后丢弃
+    # 按接口采样 INFO 日志的比例（endpoint 名 -> 0~1），未列出的接口全部记录；WARNING 及以上始终记录
+    LOG_SAMPLE_RATES = {
+        'get_recent_orders': float(os.environ.get('LOG_SAMPLE_RECENT_ORDERS', '0.1')),
+        'query_orders': float(os.environ.get('LOG_SAMPLE_QUERY_ORDERS', '0.2')),
+        'get_today_total': float(os.environ.get('LOG_SAMPLE_TODAY_TOTAL', '0.1')),
+    }
+
+    # === 操作日志异步写入 ===
+    OPLOG_QUEUE_SIZE = int(os.environ.get('OPLOG_QUEUE_SIZE', '10000'))              # 队列容量，写满后丢弃并计数
+    OPLOG_BATCH_SIZE = int(os.environ.get('OPLOG_BATCH_SIZE', '200'))                # 攒够多少条立即写入
+    OPLOG_FLUSH_INTERVAL_MS = int(os.environ.get('OPLOG_FLUSH_INTERVAL_MS', '500'))  # 最长多久写入一次（毫秒）
+    OPLOG_ENQUEUE_TIMEOUT_MS = int(os.environ.get('OPLOG_ENQUEUE_TIMEOUT_MS', '0'))  # 队列满时请求线程最多等待（毫秒），0 为直接丢弃
+
+    # === WSGI 服务配置（gunicorn.conf.py 读取，均可用同名环境变量覆盖）===
+    GUNICORN_BIND = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+    GUNICORN_WORKERS = int(os.environ.get('GUNICORN_WORKERS', str((os.cpu_count() or 1) * 2 + 1)))
+    GUNICORN_WORKER_CLASS = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')  # gthread 或 gevent
+    GUNICORN_THREADS = int(os.environ.get('GUNICORN_THREADS', '4'))            # gthread 每个 worker 的线程数
+    GUNICORN_TIMEOUT = int(os.environ.get('GUNICORN_TIMEOUT', '120'))          # worker 无响应多久后重启（秒）
+    GUNICORN_GRACEFUL_TIMEOUT = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', '30'))  # 重载时等待请求结束（秒）
+    GUNICORN_MAX_REQUESTS = int(os.environ.get('GUNICORN_MAX_REQUESTS', '5000'))  # 处理多少请求后平滑替换 worker
+    GUNICORN_PRELOAD = os.environ.get('GUNICORN_PRELOAD', 'true') == 'true'
+    # master 进程号文件，manage.sh / start_app.sh / monitor.sh 与 systemd 共用（logs 目录在 systemd 下可写）
+    GUNICORN_PID_FILE = os.environ.get('GUNICORN_PID_FILE', os.path.join(APP_DIR, 'logs', 'gunicorn.pid'))
+
+    # === 订单变更推送（SSE）===
+    # gthread 模式下每个 SSE 连接占用一个 worker 线程，单个 worker 的连接数需小于线程数，
+    # 超出时返回 503，工作台退回到每次操作后整表刷新；收银台较多时改用 gevent 或调大线程数
+    ORDER_STREAM_MAX_PER_WORKER = int(os.environ.get('ORDER_STREAM_MAX_PER_WORKER', str(max(GUNICORN_THREADS // 2, 1))))
+    ORDER_STREAM_HEARTBEAT = int(os.environ.get('ORDER_STREAM_HEARTBEAT', '15'))     # 心跳间隔（秒），及时发现断开的连接
+    ORDER_STREAM_LIFETIME = int(os.environ.get('ORDER_STREAM_LIFETIME', '900'))      # 单个连接最长保持（秒），到期由客户端重连
+    ORDER_STREAM_TICKET_SECONDS = 60  # 建立连接用的短期票据有效期（秒），避免把登录令牌放进 URL
+    # 跨 worker 转发用的事件文件目录：事件含住户姓名、手机号，目录 0700、文件 0600，不放在 /tmp
+    ORDER_EVENT_DIR = os.environ.get('ORDER_EVENT_DIR', os.path.join(APP_DIR, 'logs', 'order_events'))
+
+    # === 数据库连接池（每个 worker 进程一个连接池，均可用同名环境变量覆盖）===
+    # 单个 worker 最多占用 DB_POOL_SIZE + DB_MAX_OVERFLOW 个连接，
+    # 全部 worker 合计不要超过 MySQL 的 max_connections
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', str(GUNICORN_THREADS)))       # 常驻连接数，与线程数匹配
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', str(GUNICORN_THREADS)))  # 高峰时允许临时多开的连接数
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', '10'))     # 连接用尽时最多等待多久（秒）
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', '1800'))   # 连接使用超过该时长后重建，需小于 MySQL wait_timeout
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true') == 'true'  # 取连接前先 ping，过夜断开的连接自动重连
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': DB_POOL_PRE_PING
+    }
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+日收款汇总表（daily_summaries）重建与校验工具
+
+用法:
+    python3 daily_summary.py verify                      # 校验今天
+    python3 daily_summary.py verify --date 2025-12-01 --days 31
+    python3 daily_summary.py rebuild --date 2025-12-01   # 按 orders 原始数据重建某日
+
+上线时无需回填：还没有汇总行的日期读取时按 orders 实时合计，
+该日第一次写入订单（新增、红冲、删除）时自动按原始数据补齐当天的汇总行。
+rebuild 用于修复不一致，建议在非营业时间执行，
+重建期间新写入的订单可能与重建结果重复或遗漏，重建后再执行一次 verify。
+"""
+
+import sys
+import argparse
+from datetime import datetime, timedelta
+
+from app import app, db, DailySummary, compute_daily_summary, load_daily_summary
+
+
+def iter_days(start, days):
+    for offset in range(days):
+        yield start + timedelta(days=offset)
+
+
+def rebuild(day):
+    """删除某日汇总并按原始订单重新写入"""
+    summary = compute_daily_summary(day)
+    DailySummary.query.filter(DailySummary.日期 == day).delete(synchronize_session=False)
+    for (community_id, payment_method), (count, total) in summary.items():
+        db.session.add(DailySummary(
+            日期=day,
+            小区ID=community_id,
+            收款方式=payment_method,
+            订单数=count,
+            收款合计=total
+        ))
+    db.session.commit()
+    print(f"✅ {day} 已重建 {len(summary)} 条汇总")
+
+
+def verify(day):
+    """比较汇总表与原始订单，返回不一致的条数"""
+    expected = compute_daily_summary(day)
+    actual = load_daily_summary(day)
+    mismatches = 0
+    for key in sorted(set(expected) | set(actual), key=str):
+        want = expected.get(key, (0, 0))
+        got = actual.get(key, (0, 0))
+        if want[0] != got[0] or want[1] != got[1]:
+            mismatches += 1
+            community_id, payment_method = key
+            print(f"❌ {day} 小区ID={community_id} 收款方式={payment_method or '(空)'}: "
+                  f"订单 {want[0]} 笔/{want[1]} 元，汇总 {got[0]} 笔/{got[1]} 元")
+    if not mismatches:
+        print(f"✅ {day} 汇总一致")
+    return mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='日收款汇总重建与校验')
+    parser.add_argument('command', choices=['rebuild', 'verify'])
+    parser.add_argument('--date', help='起始日期 YYYY-MM-DD（默认今天）')
+    parser.add_argument('--days', type=int, default=1, help='连续处理的天数（默认1）')
+    args = parser.parse_args(argv)
+
+    start = datetime.strptime(args.date, '%Y-%m-%d').date() if args.date else datetime.now().date()
+
+    with app.app_context():
+        DailySummary.__table__.create(db.engine, checkfirst=True)
+        if args.command == 'rebuild':
+            for day in iter_days(start, args.days):
+                rebuild(day)
+            return 0
+
+        mismatched_days = sum(1 for day in iter_days(start, args.days) if verify(day))
+        return 1 if mismatched_days else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
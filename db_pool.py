@@ -0,0 +1,84 @@
+"""
+公寓物业收费系统 - 数据库连接池监控
+
+MonitoredQueuePool 在 SQLAlchemy 默认的 QueuePool 基础上记录：
+取连接等待时间直方图、等待超时次数、新建物理连接次数。
+占用数/溢出数直接读取连接池当前状态，post_fork 重建连接池后依然准确。
+"""
+
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+from metrics import Histogram
+
+# 取连接等待时间分桶（毫秒）
+POOL_WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class PoolMetrics:
+    """单个连接池的累计指标"""
+
+    def __init__(self):
+        self.wait_ms = Histogram(POOL_WAIT_BUCKETS_MS)
+        self.timeouts = 0
+        self.connects = 0
+
+
+class MonitoredQueuePool(QueuePool):
+    """带等待时间统计的 QueuePool，通过 SQLALCHEMY_ENGINE_OPTIONS['poolclass'] 启用"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        finally:
+            self.metrics.wait_ms.observe((time.perf_counter() - started) * 1000)
+
+    def _create_connection(self):
+        self.metrics.connects += 1
+        return super()._create_connection()
+
+    def recreate(self):
+        # engine.dispose() 会重建连接池，累计指标沿用到新连接池
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def pool_stats(engine):
+    """返回引擎连接池的当前状态与累计指标"""
+    pool = engine.pool
+    stats = {
+        'url': engine.url.render_as_string(hide_password=True),
+        'poolClass': type(pool).__name__,
+        'status': pool.status()
+    }
+    if isinstance(pool, QueuePool):
+        stats.update({
+            'size': pool.size(),
+            'maxOverflow': pool._max_overflow,
+            'timeout': pool.timeout(),
+            'recycle': pool._recycle,
+            'prePing': pool._pre_ping,
+            'checkedOut': pool.checkedout(),
+            'checkedIn': pool.checkedin(),
+            # overflow() 为负数表示池内尚未建满的连接数，这里只报告实际溢出的连接
+            'overflow': max(pool.overflow(), 0)
+        })
+    metrics = getattr(pool, 'metrics', None)
+    if metrics is not None:
+        stats.update({
+            'connects': metrics.connects,
+            'timeouts': metrics.timeouts,
+            'waitMs': metrics.wait_ms.to_dict()
+        })
+    return stats
@@ -0,0 +1,92 @@
+"""
+公寓物业收费系统 - 数据库读写分离
+
+配置了 SQLALCHEMY_BINDS['replica'] 时，标记为只读的接口（见 app.py 的 read_replica
+装饰器）把查询发往从库，其余接口及所有写操作仍走主库。
+
+读己之写：用户提交写操作后，在 READ_YOUR_WRITES_SECONDS 秒内该用户的只读接口仍走主库，
+避免从库复制延迟导致刚录入的订单查不到。固定时间记录在 CACHE_STAMP_DIR 下的版本文件中，
+同一主机的多个 worker 共享。
+"""
+
+import os
+import time
+import threading
+
+from flask import g, has_app_context, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+from cache import GenerationStamp
+from config import Config
+
+REPLICA_BIND = 'replica'
+
+
+class PrimaryPins:
+    """记录每个用户最近一次写操作的时间，用于读己之写"""
+
+    def __init__(self, seconds, directory=None):
+        self.seconds = seconds
+        self.directory = directory or os.path.join(Config.CACHE_STAMP_DIR, 'primary_pins')
+        self._stamps = {}
+        self._lock = threading.Lock()
+
+    def _stamp(self, user_id):
+        with self._lock:
+            stamp = self._stamps.get(user_id)
+            if stamp is None:
+                stamp = self._stamps[user_id] = GenerationStamp(f'user_{user_id}', self.directory)
+            return stamp
+
+    def pin(self, user_id):
+        """用户刚写入数据，之后 seconds 秒内读主库"""
+        if self.seconds > 0:
+            self._stamp(user_id).bump()
+
+    def is_pinned(self, user_id):
+        if self.seconds <= 0:
+            return False
+        last_write_ns = self._stamp(user_id).current()
+        return time.time_ns() - last_write_ns < self.seconds * 1_000_000_000
+
+
+primary_pins = PrimaryPins(Config.READ_YOUR_WRITES_SECONDS)
+
+
+class RoutingSession(Session):
+    """
+    按请求选择主库或从库的 Session
+    仅当本次请求标记了 g.use_replica、且本 Session 尚未写入时才使用从库
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._use_replica():
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _use_replica(self):
+        if self._flushing or self.info.get('has_writes'):
+            return False
+        if not has_app_context() or not g.get('use_replica'):
+            return False
+        return REPLICA_BIND in self._db.engines
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_writes(session, flush_context):
+    session.info['has_writes'] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _pin_writer_to_primary(session):
+    if not session.info.pop('has_writes', False):
+        return
+    current_user = g.get('current_user') if has_request_context() else None
+    if current_user is not None:
+        primary_pins.pin(current_user.ID)
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _clear_writes(session):
+    session.info.pop('has_writes', None)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+收费标准历史（fee_price_versions）初始化与校验工具
+
+用法:
+    python3 fee_price_history.py seed      # 为还没有历史版本的小区，按当前收费标准写入首个版本
+    python3 fee_price_history.py verify    # 校验各小区当前生效的版本与 fee_prices 一致
+
+首个版本的生效时间取 fee_prices.updated_at（最后一次修改时间），更早的历史无从得知，
+这些时间之前的订单查不到历史单价，订单详情按 金额/数量 推算单价。
+"""
+
+import sys
+import argparse
+from datetime import datetime
+
+from app import (app, db, FeePrice, FeePriceVersion, FEE_PRICE_FIELDS, fee_price_cache,
+                 sync_fee_price_versions, load_price_timeline, _to_cents_decimal)
+
+
+def seed():
+    seeded = set(c for (c,) in db.session.query(FeePriceVersion.community_id).distinct())
+    count = 0
+    for fee_price in FeePrice.query.order_by(FeePrice.id).all():
+        if fee_price.id in seeded:
+            continue
+        effective_from = fee_price.updated_at or fee_price.created_at or datetime.now()
+        sync_fee_price_versions([fee_price], None, effective_from=effective_from)
+        count += 1
+        print(f"✅ {fee_price.community}（小区编号 {fee_price.id}）生效时间 {effective_from}")
+    db.session.commit()
+    fee_price_cache.invalidate()
+    print(f"共初始化 {count} 个小区")
+
+
+def verify():
+    """返回当前单价与历史版本不一致的小区数"""
+    now = datetime.now()
+    mismatches = 0
+    for fee_price in FeePrice.query.order_by(FeePrice.id).all():
+        prices = load_price_timeline(fee_price.id).prices_at(now)
+        for fee_type, field in FEE_PRICE_FIELDS.items():
+            current = _to_cents_decimal(getattr(fee_price, field))
+            if prices.get(fee_type) != current:
+                mismatches += 1
+                print(f"❌ {fee_price.community}（小区编号 {fee_price.id}）{fee_type}: "
+                      f"收费标准 {current}，历史版本 {prices.get(fee_type)}")
+                break
+    if not mismatches:
+        print("✅ 历史版本与当前收费标准一致")
+    return mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='收费标准历史初始化与校验')
+    parser.add_argument('command', choices=['seed', 'verify'])
+    args = parser.parse_args(argv)
+
+    with app.app_context():
+        FeePriceVersion.__table__.create(db.engine, checkfirst=True)
+        if args.command == 'seed':
+            seed()
+            return 0
+        return 1 if verify() else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
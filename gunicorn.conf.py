@@ -0,0 +1,65 @@
+"""
+公寓物业收费系统 - gunicorn 配置
+
+启动:   gunicorn -c gunicorn.conf.py wsgi:app
+平滑重载: kill -HUP <master pid>     （重新读取配置并逐个替换 worker，不中断请求）
+代码升级: kill -USR2 <master pid>    （启动新 master 加载新代码，确认正常后向旧 master 发送 QUIT）
+参数均来自 config.Config，可通过环境变量覆盖。
+"""
+
+import os
+import glob
+
+from config import Config
+from metrics import archive_worker_snapshot
+
+bind = Config.GUNICORN_BIND
+workers = Config.GUNICORN_WORKERS
+worker_class = Config.GUNICORN_WORKER_CLASS
+threads = Config.GUNICORN_THREADS
+timeout = Config.GUNICORN_TIMEOUT
+graceful_timeout = Config.GUNICORN_GRACEFUL_TIMEOUT
+keepalive = 5
+max_requests = Config.GUNICORN_MAX_REQUESTS
+max_requests_jitter = max(1, Config.GUNICORN_MAX_REQUESTS // 10)
+
+# 预加载应用：master 导入一次，worker fork 后共享只读内存，启动更快
+preload_app = Config.GUNICORN_PRELOAD
+
+pidfile = Config.GUNICORN_PID_FILE
+proc_name = 'wjwy_system'
+
+_log_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs')
+os.makedirs(_log_dir, exist_ok=True)
+accesslog = os.path.join(_log_dir, 'access.log')
+errorlog = os.path.join(_log_dir, 'gunicorn.log')
+loglevel = 'info'
+
+
+def on_starting(server):
+    """启动时清除上次运行遗留的 worker 指标快照与归档，/metrics 的计数从零开始"""
+    for path in glob.glob(os.path.join(Config.METRICS_DIR, '*.json')):
+        os.remove(path)
+
+
+def post_fork(server, worker):
+    """fork 之后丢弃从 master 继承的数据库连接，每个 worker 建立自己的连接池"""
+    from app import app, db
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    server.log.info(f"worker {worker.pid} 已重置数据库连接池")
+
+
+def worker_exit(server, worker):
+    """worker 退出前写完队列中剩余的操作日志，并写入最后一次指标快照（随后由 child_exit 归档）"""
+    from app import operation_log_writer, metrics_registry
+
+    operation_log_writer.stop()
+    metrics_registry.dump(force=True)
+
+
+def child_exit(server, worker):
+    """worker 退出后（master 中）把它的指标快照并入归档，/metrics 的计数不会因 worker 替换而减少"""
+    archive_worker_snapshot(Config.METRICS_DIR, worker.pid)
@@ -1,35 +1,93 @@
 #!/bin/bash
+# 公寓物业收费系统 - 服务管理脚本（gunicorn 多 worker 部署）
+APP_DIR=/var/www/web_app
+# 与 config.py 的 GUNICORN_PID_FILE 一致
+PID_FILE=${GUNICORN_PID_FILE:-$APP_DIR/logs/gunicorn.pid}
+
+master_pid() {
+    [ -f "$PID_FILE" ] && cat "$PID_FILE"
+}
+
+is_running() {
+    PID=$(master_pid)
+    [ -n "$PID" ] && kill -0 "$PID" 2>/dev/null
+}
+
 case "$1" in
     start)
+        if is_running; then
+            echo "✓ 系统已在运行，PID: $(master_pid)"
+            exit 0
+        fi
         echo "启动物业收费系统..."
-        cd /var/www/web_app
+        cd $APP_DIR
         source venv/bin/activate
-        nohup python3 app.py > app.log 2>&1 &
-        echo "✓ 已启动，PID: $!"
+        gunicorn -c gunicorn.conf.py --daemon wsgi:app
+        sleep 2
+        if is_running; then
+            echo "✓ 已启动，master PID: $(master_pid)"
+        else
+            echo "✗ 启动失败，请查看日志: tail -50 $APP_DIR/logs/gunicorn.log"
+        fi
         ;;
     stop)
         echo "停止物业收费系统..."
-        pkill -f "python3 app.py"
-        echo "✓ 已停止"
+        if is_running; then
+            # TERM：等待进行中的请求处理完（graceful_timeout）后退出
+            kill -TERM "$(master_pid)"
+            echo "✓ 已停止"
+        else
+            echo "系统未运行"
+        fi
+        ;;
+    reload)
+        # HUP：重新读取配置，逐个启动新 worker 并平滑关闭旧 worker，不中断服务
+        if is_running; then
+            kill -HUP "$(master_pid)"
+            echo "✓ 已发送平滑重载信号"
+        else
+            echo "✗ 系统未运行"
+        fi
+        ;;
+    upgrade)
+        # 代码更新（preload 模式下 HUP 不会重新导入代码）：
+        # USR2 启动加载新代码的新 master，新 master 就绪后让旧 master 平滑退出
+        if ! is_running; then
+            echo "✗ 系统未运行"
+            exit 1
+        fi
+        cd $APP_DIR
+        source venv/bin/activate
+        python3 assets.py build > /dev/null
+        OLD_PID=$(master_pid)
+        kill -USR2 "$OLD_PID"
+        sleep 5
+        if [ -f "$PID_FILE" ] && [ "$(master_pid)" != "$OLD_PID" ] && kill -0 "$(master_pid)" 2>/dev/null; then
+            kill -WINCH "$OLD_PID"
+            kill -QUIT "$OLD_PID"
+            echo "✓ 已升级，新 master PID: $(master_pid)"
+        else
+            echo "✗ 新版本启动失败，旧版本继续运行，请查看日志: tail -50 $APP_DIR/logs/gunicorn.log"
+        fi
         ;;
     restart)
         $0 stop
-        sleep 2
+        sleep 3
         $0 start
         ;;
     status)
-        if ps aux | grep -q "python3 app.py" | grep -v grep; then
-            echo "✓ 系统正在运行"
-            ps aux | grep "python3 app.py" | grep -v grep
+        if is_running; then
+            echo "✓ 系统正在运行，master PID: $(master_pid)"
+            ps -o pid,ppid,etime,rss,cmd --ppid "$(master_pid)" -p "$(master_pid)"
         else
             echo "✗ 系统已停止"
         fi
         ;;
     log)
-        tail -50 /var/www/web_app/app.log
+        tail -50 $APP_DIR/logs/app.log
         ;;
     *)
-        echo "用法: $0 {start|stop|restart|status|log}"
+        echo "用法: $0 {start|stop|reload|upgrade|restart|status|log}"
         echo ""
         echo "当前状态:"
         $0 status
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+订单热点查询索引管理工具
+
+用法:
+    python3 manage_indexes.py migrate           # 在线添加模型中声明但数据库缺失的索引，加宽比模型短的列
+    python3 manage_indexes.py migrate --dry-run # 仅打印将要执行的语句
+    python3 manage_indexes.py check             # 检查列宽并 EXPLAIN 检查热点查询，不通过时返回非0
+"""
+
+import sys
+import argparse
+from datetime import datetime, timedelta
+
+from sqlalchemy import inspect
+from sqlalchemy.schema import CreateColumn, CreateIndex
+
+from app import (
+    app, db, UserSnapshot, Order,
+    address_tree_query, daily_total_query, operation_log_query, order_list_query,
+    payment_history_query, price_timeline_query, recent_orders_query, report_rollup_query,
+    build_order_filter_query, apply_order_sort
+)
+
+
+def indexed_models():
+    """需要维护索引的模型：所有已注册的模型，按表名排序"""
+    return sorted((mapper.class_ for mapper in db.Model.registry.mappers),
+                  key=lambda model: model.__table__.name)
+
+
+# ========== 热点查询登记表 ==========
+# 每一项调用接口本身使用的查询构建函数，EXPLAIN 检查时使用代表性参数；
+# 以普通操作员（非1号小区）的身份构建，管理员看全部小区的查询本来就要扫全表
+EXPLAIN_USER = UserSnapshot(ID=0, USERNAME='explain', 用户姓名='', COMMUNITY='', 小区编号=2,
+                            Role='操作员', Edit=False, Read=True, Report=True)
+
+
+def _recent_orders_query():
+    return recent_orders_query(EXPLAIN_USER, datetime.now().date())
+
+
+def _today_total_query():
+    return daily_total_query(datetime.now().date(), EXPLAIN_USER.小区编号)
+
+
+def _payment_history_query():
+    return payment_history_query(EXPLAIN_USER, 1, 10)
+
+
+def _query_orders_query():
+    start = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d %H:%M')
+    query = build_order_filter_query(EXPLAIN_USER, {'startTime': start})
+    return apply_order_sort(query, 'entryTime', 'desc').limit(10)
+
+
+def _get_orders_query():
+    start = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
+    return apply_order_sort(order_list_query(EXPLAIN_USER, {'startDate': start}), 'entryTime', 'desc').limit(20)
+
+
+def _address_tree_query():
+    return address_tree_query(EXPLAIN_USER.小区编号)
+
+
+def _operation_logs_query():
+    return operation_log_query({}).limit(50)
+
+
+def _price_timeline_query():
+    return price_timeline_query(EXPLAIN_USER.小区编号)
+
+
+def _report_summary_query():
+    today = datetime.now().date()
+    return report_rollup_query(today.replace(month=1, day=1), today, 'month', [],
+                               {'community': EXPLAIN_USER.小区编号})
+
+
+HOT_QUERIES = {
+    'get_recent_orders': _recent_orders_query,
+    'get_today_total': _today_total_query,
+    'get_user_payment_history': _payment_history_query,
+    'query_orders': _query_orders_query,
+    'get_orders': _get_orders_query,
+    'get_addresses': _address_tree_query,
+    'get_operation_logs': _operation_logs_query,
+    'get_price_timeline': _price_timeline_query,
+    'get_report_summary': _report_summary_query,
+}
+
+
+# ========== 在线迁移 ==========
+def missing_indexes(engine):
+    """返回模型中声明、但数据库中尚不存在的索引列表"""
+    inspector = inspect(engine)
+    missing = []
+    for model in indexed_models():
+        table = model.__table__
+        if not inspector.has_table(table.name):
+            continue
+        existing = {ix['name'] for ix in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda ix: ix.name):
+            if index.name not in existing:
+                missing.append(index)
+    return missing
+
+
+# 长度随版本变长的列：账单号由19位变为29位，红冲订单再加1位
+WIDENED_COLUMNS = [Order.__table__.c.账单号]
+
+
+def narrow_columns(engine):
+    """返回数据库中长度小于模型声明的列 [(列, 数据库中的长度)]；SQLite 不限制长度，不检查"""
+    if engine.dialect.name == 'sqlite':
+        return []
+    inspector = inspect(engine)
+    narrow = []
+    for column in WIDENED_COLUMNS:
+        if not inspector.has_table(column.table.name):
+            continue
+        existing = {col['name']: col['type'] for col in inspector.get_columns(column.table.name)}
+        length = getattr(existing.get(column.name), 'length', None)
+        if length is not None and length < column.type.length:
+            narrow.append((column, length))
+    return narrow
+
+
+def build_widen_ddl(engine, column):
+    """加宽列的语句（MySQL 的 MODIFY 原样保留索引，注释随列定义重新写入）"""
+    preparer = engine.dialect.identifier_preparer
+    definition = CreateColumn(column).compile(dialect=engine.dialect)
+    return f"ALTER TABLE {preparer.quote(column.table.name)} MODIFY COLUMN {definition}"
+
+
+def build_ddl(engine, index):
+    """生成建索引语句；MySQL 使用 InnoDB 在线DDL，建索引期间不锁表"""
+    if engine.dialect.name == 'mysql':
+        preparer = engine.dialect.identifier_preparer
+        columns = ', '.join(preparer.quote(col.name) for col in index.columns)
+        return (f"ALTER TABLE {preparer.quote(index.table.name)} "
+                f"ADD INDEX {preparer.quote(index.name)} ({columns}), "
+                f"ALGORITHM=INPLACE, LOCK=NONE")
+    return str(CreateIndex(index).compile(dialect=engine.dialect))
+
+
+def migrate(dry_run=False):
+    engine = db.engine
+    for column, length in narrow_columns(engine):
+        ddl = build_widen_ddl(engine, column)
+        print(f"{'[预览] ' if dry_run else ''}{ddl}")
+        if dry_run:
+            continue
+        with engine.begin() as conn:
+            conn.exec_driver_sql(ddl)
+        print(f"✅ 已将 {column.table.name}.{column.name} 由 {length} 加宽到 {column.type.length}")
+
+    indexes = missing_indexes(engine)
+    if not indexes:
+        print("✅ 所有索引均已存在，无需迁移")
+        return 0
+
+    for index in indexes:
+        ddl = build_ddl(engine, index)
+        print(f"{'[预览] ' if dry_run else ''}{ddl}")
+        if dry_run:
+            continue
+        with engine.begin() as conn:
+            conn.exec_driver_sql(ddl)
+        print(f"✅ 已创建索引 {index.table.name}.{index.name}")
+    return 0
+
+
+# ========== EXPLAIN 检查 ==========
+def explain(conn, query):
+    """执行 EXPLAIN 并返回 (计划行列表, 全表扫描的表名列表)"""
+    compiled = query.statement.compile(dialect=conn.dialect)
+    params = compiled.params
+    if compiled.positional:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+
+    if conn.dialect.name == 'sqlite':
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).fetchall()
+        # 形如 "SCAN orders"（无 USING INDEX）表示全表扫描
+        full_scans = [row[3].split()[1] for row in rows
+                      if row[3].startswith('SCAN ') and 'USING' not in row[3]]
+        return [row[3] for row in rows], full_scans
+
+    result = conn.exec_driver_sql(f"EXPLAIN {compiled}", params)
+    keys = list(result.keys())
+    rows = [dict(zip(keys, row)) for row in result.fetchall()]
+    # MySQL 中 type=ALL 表示全表扫描
+    full_scans = [row['table'] for row in rows if row.get('type') == 'ALL']
+    return rows, full_scans
+
+
+def check():
+    failed = []
+    for column, length in narrow_columns(db.engine):
+        failed.append(f'{column.table.name}.{column.name}')
+        print(f"❌ {column.table.name}.{column.name}: 数据库中长度 {length}，小于模型声明的 {column.type.length}，请执行 migrate")
+    with db.engine.connect() as conn:
+        for name, build in HOT_QUERIES.items():
+            plan, full_scans = explain(conn, build())
+            if full_scans:
+                failed.append(name)
+                print(f"❌ {name}: 全表扫描 {', '.join(full_scans)}")
+                for row in plan:
+                    print(f"    {row}")
+            else:
+                print(f"✅ {name}")
+
+    if failed:
+        print(f"共 {len(failed)} 项检查未通过: {', '.join(failed)}")
+        return 1
+    print("所有热点查询均命中索引")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='订单热点查询索引管理')
+    sub = parser.add_subparsers(dest='command', required=True)
+    migrate_parser = sub.add_parser('migrate', help='在线添加缺失的索引')
+    migrate_parser.add_argument('--dry-run', action='store_true', help='仅打印语句，不执行')
+    sub.add_parser('check', help='检查列宽，并 EXPLAIN 检查热点查询是否全表扫描')
+    args = parser.parse_args(argv)
+
+    with app.app_context():
+        if args.command == 'migrate':
+            return migrate(dry_run=args.dry_run)
+        return check()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
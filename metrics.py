@@ -0,0 +1,235 @@
+"""
+公寓物业收费系统 - 进程内指标模块
+
+直方图按固定分桶计数，线程安全，各 worker 进程独立统计。
+MetricsRegistry 定期把本进程的快照写入 METRICS_DIR/<进程号>-<启动时间>.json，
+/metrics 接口合并所有 worker 的快照后输出 Prometheus 文本格式，
+因此无论请求落到哪个 worker，得到的都是全部 worker 的合计。
+worker 退出后由 gunicorn master 调用 archive_worker_snapshot() 把它的快照并入
+archive.json 并删除，快照文件数不随 worker 替换次数增长。
+"""
+
+import os
+import glob
+import json
+import time
+import fcntl
+import atexit
+import threading
+
+ARCHIVE_NAME = 'archive.json'  # 已退出 worker 的合计
+
+
+class Histogram:
+    """固定分桶直方图，buckets 为升序的上界列表（单位由调用方决定）"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # 最后一格为 +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self):
+        """返回 (各分桶计数(非累计，含 +Inf), 总和, 总数)"""
+        with self._lock:
+            return list(self._counts), self._sum, self._count
+
+    def to_dict(self):
+        """转成接口返回用的字典，分桶用列表保持顺序（jsonify 会对字典键排序）"""
+        counts, total, count = self.snapshot()
+        bounds = list(self.buckets) + ['+Inf']
+        return {
+            'buckets': [{'le': bound, 'count': n} for bound, n in zip(bounds, counts)],
+            'sum': round(total, 3),
+            'count': count,
+            'avg': round(total / count, 3) if count else 0.0
+        }
+
+
+class HistogramFamily:
+    """一组同名、按标签区分的直方图，对应 Prometheus 的一个 histogram 指标"""
+
+    def __init__(self, name, documentation, buckets, labelnames):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        values = tuple(str(v) for v in values)
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, Histogram(self.buckets))
+        return child
+
+    def snapshot(self):
+        """返回 [[标签值列表, 分桶计数, 总和, 总数], ...]，可直接写入 JSON"""
+        with self._lock:
+            children = list(self._children.items())
+        return [[list(values), *child.snapshot()] for values, child in children]
+
+
+def _escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_bound(bound):
+    return '+Inf' if bound == '+Inf' else f'{bound:g}'
+
+
+def _merge_snapshot(merged, snapshot, names=None):
+    """把一个快照累加到 merged（{指标名: {标签值元组: [分桶计数, 总和, 总数]}}）；names 限定合并的指标"""
+    for name, children in snapshot.items():
+        if names is not None and name not in names:
+            continue
+        target = merged.setdefault(name, {})
+        for values, counts, total, count in children:
+            key = tuple(values)
+            current = target.get(key)
+            if current is None:
+                target[key] = [list(counts), total, count]
+            else:
+                current[0] = [a + b for a, b in zip(current[0], counts)]
+                current[1] += total
+                current[2] += count
+
+
+def archive_worker_snapshot(directory, pid):
+    """
+    worker 退出后（gunicorn child_exit，在 master 中调用）把它的快照并入归档文件并删除
+    此时该进程已被回收，<pid>-*.json 都属于已退出的 worker；新旧 master 并存（USR2 升级）时用文件锁串行
+    """
+    paths = glob.glob(os.path.join(directory, f'{pid}-*.json'))
+    if not paths:
+        return
+    archive_path = os.path.join(directory, ARCHIVE_NAME)
+    with open(os.path.join(directory, f'{ARCHIVE_NAME}.lock'), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            merged = {}
+            for path in [archive_path] + paths:
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        _merge_snapshot(merged, json.load(f))
+                except (OSError, ValueError):
+                    continue
+            archive = {name: [[list(values), *child] for values, child in children.items()]
+                       for name, children in merged.items()}
+            tmp_path = f'{archive_path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(archive, f, ensure_ascii=False)
+            os.replace(tmp_path, archive_path)
+            for path in paths:
+                os.remove(path)
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class MetricsRegistry:
+    """指标注册表，负责多进程快照的落盘、合并与 Prometheus 格式输出"""
+
+    def __init__(self, directory, dump_interval=5):
+        self.directory = directory
+        self.dump_interval = dump_interval
+        self._families = {}
+        self._last_dump = 0.0
+        self._lock = threading.Lock()
+        self._pid = None
+        self._worker_id = None
+        self._id_lock = threading.Lock()
+        atexit.register(self.dump, force=True)
+
+    def histogram(self, name, documentation, buckets, labelnames=()):
+        family = HistogramFamily(name, documentation, buckets, labelnames)
+        self._families[name] = family
+        return family
+
+    def _snapshot(self):
+        return {name: family.snapshot() for name, family in self._families.items()}
+
+    def _own_path(self):
+        # 快照按 进程号-启动时间 命名：进程号被复用时不会覆盖已退出 worker 的计数；
+        # gunicorn 预加载时注册表在 master 中创建，fork 后按进程重新生成
+        pid = os.getpid()
+        if self._pid != pid:
+            with self._id_lock:
+                if self._pid != pid:
+                    self._worker_id = f'{pid}-{time.time_ns()}'
+                    self._pid = pid
+        return os.path.join(self.directory, f'{self._worker_id}.json')
+
+    def dump(self, force=False):
+        """把本进程快照写入文件；非强制时每 dump_interval 秒最多写一次"""
+        now = time.monotonic()
+        if not force and now - self._last_dump < self.dump_interval:
+            return
+        with self._lock:
+            self._last_dump = now
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                path = self._own_path()
+                tmp_path = f'{path}.{threading.get_ident()}.tmp'
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self._snapshot(), f, ensure_ascii=False)
+                os.replace(tmp_path, path)
+            except OSError:
+                pass
+
+    def collect(self):
+        """合并本进程实时数据、其他 worker 的快照与已退出 worker 的归档"""
+        merged = {name: {} for name in self._families}
+        snapshots = [self._snapshot()]
+        own_path = self._own_path()
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            names = []
+        for filename in names:
+            path = os.path.join(self.directory, filename)
+            if not filename.endswith('.json') or path == own_path:
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+
+        for snapshot in snapshots:
+            _merge_snapshot(merged, snapshot, self._families)
+        return merged
+
+    def render(self):
+        """输出 Prometheus 文本格式（text/plain; version=0.0.4）"""
+        lines = []
+        for name, children in self.collect().items():
+            family = self._families[name]
+            lines.append(f'# HELP {name} {family.documentation}')
+            lines.append(f'# TYPE {name} histogram')
+            bounds = list(family.buckets) + ['+Inf']
+            for values, (counts, total, count) in sorted(children.items()):
+                labels = [f'{label}="{_escape_label(value)}"'
+                          for label, value in zip(family.labelnames, values)]
+                cumulative = 0
+                for bound, n in zip(bounds, counts):
+                    cumulative += n
+                    bucket_labels = ','.join(labels + [f'le="{_format_bound(bound)}"'])
+                    lines.append(f'{name}_bucket{{{bucket_labels}}} {cumulative}')
+                label_text = '{' + ','.join(labels) + '}' if labels else ''
+                lines.append(f'{name}_sum{label_text} {total:.6f}')
+                lines.append(f'{name}_count{label_text} {count}')
+        return '\n'.join(lines) + '\n'
@@ -1,7 +1,11 @@
 #!/bin/bash
-if ! ps aux | grep -q "python3 app.py" | grep -v grep; then
+# 进程不存在时重新启动（可加入 crontab 定时执行）
+APP_DIR=/var/www/web_app
+# 与 config.py 的 GUNICORN_PID_FILE 一致（systemd 部署也使用该文件，不会重复启动 master）
+PID_FILE=${GUNICORN_PID_FILE:-$APP_DIR/logs/gunicorn.pid}
+cd $APP_DIR
+if ! { [ -f "$PID_FILE" ] && kill -0 "$(cat "$PID_FILE")" 2>/dev/null; }; then
     echo "重启物业收费系统..."
-    cd /var/www/web_app
     source venv/bin/activate
-    nohup python3 app.py > app.log 2>&1 &
+    gunicorn -c gunicorn.conf.py --daemon wsgi:app
 fi
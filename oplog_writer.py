@@ -0,0 +1,117 @@
+"""
+公寓物业收费系统 - 操作日志异步批量写入
+
+请求线程只把日志放进有界队列（不访问数据库），后台线程每 flush_interval_ms 毫秒
+或攒够 batch_size 条时批量插入 operation_logs。数据库变慢导致队列写满时，
+最多等待 enqueue_timeout_ms 毫秒，仍然放不进去则丢弃并计数，不拖慢收费接口。
+"""
+
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class OperationLogWriter:
+    """后台批量写入器，write_rows(rows) 负责把一批字典插入数据库"""
+
+    def __init__(self, write_rows, maxsize=10000, batch_size=200, flush_interval_ms=500,
+                 enqueue_timeout_ms=0):
+        self.write_rows = write_rows
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.enqueue_timeout = enqueue_timeout_ms / 1000
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        atexit.register(self.stop)
+
+    def _ensure_started(self):
+        # gunicorn 预加载时在 master 中创建，fork 后子进程没有后台线程，需要按进程重新启动
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.maxsize)
+            self._thread = threading.Thread(target=self._run, name='operation-log-writer', daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def submit(self, row):
+        """放入一条日志，队列已满时返回 False（已计入 dropped）"""
+        self._ensure_started()
+        try:
+            if self.enqueue_timeout > 0:
+                self._queue.put(row, timeout=self.enqueue_timeout)
+            else:
+                self._queue.put_nowait(row)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _run(self):
+        pending = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            timeout = max(deadline - time.monotonic(), 0)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                self._flush(pending)
+                return
+            if item is not None:
+                pending.append(item)
+
+            if len(pending) >= self.batch_size or time.monotonic() >= deadline:
+                self._flush(pending)
+                pending = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _flush(self, rows):
+        if not rows:
+            return
+        try:
+            self.write_rows(rows)
+            self.written += len(rows)
+            self.batches += 1
+        except Exception:
+            self.failed += len(rows)
+            logger.exception(f"[日志记录失败] {len(rows)} 条操作日志写入失败")
+
+    def stop(self, timeout=5):
+        """写完队列中剩余的日志后停止后台线程（进程退出时自动调用）"""
+        if self._pid != os.getpid() or not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+    def stats(self):
+        return {
+            'pid': os.getpid(),
+            'queued': self._queue.qsize() if self._pid == os.getpid() else 0,
+            'maxsize': self.maxsize,
+            'written': self.written,
+            'batches': self.batches,
+            'dropped': self.dropped,
+            'failed': self.failed
+        }
@@ -0,0 +1,194 @@
+"""
+公寓物业收费系统 - 订单变更推送（Server-Sent Events）
+
+新建、红冲、删除订单提交成功后调用 publish()，事件先直接分发给本进程的订阅者，
+再追加一行 JSON 到 ORDER_EVENT_DIR 下的事件文件（含住户姓名、手机号，目录 0700、文件 0600）。有订阅者的 worker 各自启动一个
+后台线程跟读该文件，把其他 worker 发布的事件分发给自己的订阅者，
+因此收银台的 SSE 连接落在哪个 worker 上都能收到全部事件（同一主机内）。
+
+每个订阅者一个有界队列：客户端读得太慢导致队列写满时不再阻塞发布方，
+只标记 overflowed，由 SSE 接口通知客户端整表重新加载。
+"""
+
+import os
+import json
+import time
+import queue
+import fcntl
+import threading
+
+DIR_MODE = 0o700
+FILE_MODE = 0o600
+
+
+def _open_private(path, flags):
+    """打开（必要时创建）仅属主可读写的文件；之前以其他权限创建的文件同时收紧权限"""
+    fd = os.open(path, flags | os.O_CREAT, FILE_MODE)
+    os.fchmod(fd, FILE_MODE)
+    return fd
+
+
+class Subscription:
+    """一个 SSE 连接的订阅，scope 为 'all' 或小区编号"""
+
+    def __init__(self, scope, maxsize):
+        self.scope = scope
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def matches(self, community):
+        return self.scope == 'all' or self.scope == community
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout):
+        """等待下一条事件，超时返回 None"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class OrderEventBroker:
+    """进程内订阅/发布，加上基于事件文件的跨 worker 转发"""
+
+    def __init__(self, spool_path, max_subscribers=2, queue_size=100, poll_interval=0.5,
+                 max_spool_bytes=1024 * 1024):
+        self.spool_path = spool_path
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self.poll_interval = poll_interval
+        self.max_spool_bytes = max_spool_bytes
+        self.published = 0
+        self.relayed = 0
+        self.rejected = 0
+        self._subscribers = set()
+        self._seq = 0
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    # ---------- 订阅 ----------
+    def subscribe(self, scope):
+        """新增订阅；本进程连接数已达上限时返回 None"""
+        self._ensure_started()
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                self.rejected += 1
+                return None
+            subscription = Subscription(scope, self.queue_size)
+            self._subscribers.add(subscription)
+            return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def _dispatch(self, event):
+        with self._lock:
+            subscribers = [s for s in self._subscribers if s.matches(event['community'])]
+        for subscription in subscribers:
+            subscription.put(event)
+
+    # ---------- 发布 ----------
+    def publish(self, event_type, community, **payload):
+        """发布一条订单事件（数据库提交之后调用）"""
+        with self._lock:
+            self._seq += 1
+            event_id = f'{os.getpid()}-{self._seq}'
+        event = {'id': event_id, 'type': event_type, 'community': community, **payload}
+        self._dispatch(event)
+        self._append(dict(event, pid=os.getpid()))
+        self.published += 1
+        return event
+
+    def _append(self, record):
+        line = (json.dumps(record, ensure_ascii=False, default=str) + '\n').encode('utf-8')
+        os.makedirs(os.path.dirname(self.spool_path), mode=DIR_MODE, exist_ok=True)
+        with os.fdopen(_open_private(f'{self.spool_path}.lock', os.O_WRONLY | os.O_APPEND), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                try:
+                    if os.path.getsize(self.spool_path) >= self.max_spool_bytes:
+                        # 跟读线程发现文件被替换后，会先读完旧文件再从新文件开头读
+                        os.replace(self.spool_path, f'{self.spool_path}.1')
+                except FileNotFoundError:
+                    pass
+                with os.fdopen(_open_private(self.spool_path, os.O_WRONLY | os.O_APPEND), 'ab') as f:
+                    f.write(line)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # ---------- 跨 worker 转发 ----------
+    def _ensure_started(self):
+        # gunicorn 预加载时在 master 中创建，fork 后需要按进程重新启动跟读线程
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._subscribers = set()
+            self._thread = threading.Thread(target=self._run, name='order-event-relay', daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def _open_spool(self, seek_end):
+        try:
+            f = open(self.spool_path, 'rb')
+        except FileNotFoundError:
+            return None
+        if seek_end:
+            f.seek(0, os.SEEK_END)
+        return f
+
+    def _run(self):
+        # 只转发启动之后的事件，启动前的历史事件由客户端整表加载覆盖
+        f = self._open_spool(seek_end=True)
+        buffer = b''
+        while True:
+            time.sleep(self.poll_interval)
+            if f is None:
+                f = self._open_spool(seek_end=False)
+                if f is None:
+                    continue
+            buffer = self._relay(f.read(), buffer)
+            try:
+                on_disk = os.stat(self.spool_path)
+            except FileNotFoundError:
+                continue
+            current = os.fstat(f.fileno())
+            if (on_disk.st_dev, on_disk.st_ino) != (current.st_dev, current.st_ino):
+                buffer = self._relay(f.read(), buffer)
+                f.close()
+                f = self._open_spool(seek_end=False)
+                buffer = b''
+
+    def _relay(self, data, buffer):
+        """分发新读到的完整行，返回尚未写完的半行"""
+        *lines, rest = (buffer + data).split(b'\n')
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.pop('pid', None) == os.getpid():
+                continue  # 本进程发布时已直接分发
+            self.relayed += 1
+            self._dispatch(record)
+        return rest
+
+    def stats(self):
+        with self._lock:
+            subscribers = len(self._subscribers) if self._pid == os.getpid() else 0
+        return {
+            'pid': os.getpid(),
+            'subscribers': subscribers,
+            'maxSubscribers': self.max_subscribers,
+            'published': self.published,
+            'relayed': self.relayed,
+            'rejected': self.rejected
+        }
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+订单费用明细表（order_items）迁移工具
+
+用法:
+    python3 order_items.py backfill                  # 为还没有明细的历史订单生成明细
+    python3 order_items.py backfill --batch-size 500
+    python3 order_items.py verify                    # 逐单比较明细与 orders 宽列
+    python3 order_items.py create-view               # 创建/更新兼容视图 order_fee_columns
+
+上线顺序：
+    1. 部署新版本：新建、红冲的订单同时写入宽列与 order_items（双写）
+    2. backfill 回填历史订单（可在营业时间执行，按订单ID分批提交，可中断后重跑）
+    3. verify 确认一致后，按费用类型的统计改用 order_items
+    4. create-view：仍按宽列读取的外部报表改读 order_fee_columns，为以后删除宽列做准备
+"""
+
+import sys
+import argparse
+
+from sqlalchemy import func, select, text
+
+from app import app, db, Order, OrderItem, FEE_MAPPING, build_order_items, _to_cents_decimal
+
+VIEW_NAME = 'order_fee_columns'
+
+
+def orders_missing_items():
+    """有费用金额、但还没有明细的订单"""
+    has_fee = db.or_(*[getattr(Order, amount_field) != 0 for _, amount_field in FEE_MAPPING.values()])
+    return Order.query.options(db.lazyload('*')).filter(has_fee, ~Order.明细.any())
+
+
+def backfill(batch_size):
+    last_id = 0
+    total = 0
+    while True:
+        orders = (orders_missing_items()
+                  .filter(Order.订单ID > last_id)
+                  .order_by(Order.订单ID)
+                  .limit(batch_size)
+                  .all())
+        if not orders:
+            break
+        for order in orders:
+            order.明细 = build_order_items(order)
+        last_id = orders[-1].订单ID
+        total += len(orders)
+        db.session.commit()
+        print(f"... 已回填 {total} 笔（订单ID <= {last_id}）")
+    print(f"✅ 回填完成，共 {total} 笔订单")
+
+
+def verify(batch_size):
+    """比较每笔订单的明细与宽列，返回不一致的订单数"""
+    mismatches = 0
+    last_id = 0
+    while True:
+        orders = (Order.query.options(db.lazyload('*'), db.selectinload(Order.明细))
+                  .filter(Order.订单ID > last_id)
+                  .order_by(Order.订单ID)
+                  .limit(batch_size)
+                  .all())
+        if not orders:
+            break
+        for order in orders:
+            expected = {item.费用类型: (_to_cents_decimal(item.数量), item.金额) for item in build_order_items(order)}
+            actual = {item.费用类型: (_to_cents_decimal(item.数量), _to_cents_decimal(item.金额)) for item in order.明细}
+            if expected != actual:
+                mismatches += 1
+                print(f"❌ 订单ID={order.订单ID} 账单号={order.账单号}: 宽列 {expected}，明细 {actual}")
+        last_id = orders[-1].订单ID
+        db.session.expunge_all()
+    if not mismatches:
+        print("✅ 明细与宽列一致")
+    return mismatches
+
+
+def create_view():
+    """按 order_items 还原宽列格式的兼容视图（每笔订单一行，列名与 orders 的费用列相同）"""
+    columns = [OrderItem.订单ID]
+    for fee_type, (quantity_field, amount_field) in FEE_MAPPING.items():
+        is_type = OrderItem.费用类型 == fee_type
+        columns.append(func.sum(db.case((is_type, OrderItem.数量))).label(quantity_field))
+        columns.append(func.sum(db.case((is_type, OrderItem.金额))).label(amount_field))
+    query = select(*columns).group_by(OrderItem.订单ID)
+    sql = str(query.compile(db.engine, compile_kwargs={'literal_binds': True}))
+    with db.engine.begin() as conn:
+        conn.execute(text(f'DROP VIEW IF EXISTS {VIEW_NAME}'))
+        conn.execute(text(f'CREATE VIEW {VIEW_NAME} AS {sql}'))
+    print(f"✅ 已创建视图 {VIEW_NAME}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='订单费用明细迁移工具')
+    parser.add_argument('command', choices=['backfill', 'verify', 'create-view'])
+    parser.add_argument('--batch-size', type=int, default=1000, help='每批处理的订单数（默认1000）')
+    args = parser.parse_args(argv)
+
+    with app.app_context():
+        OrderItem.__table__.create(db.engine, checkfirst=True)
+        if args.command == 'backfill':
+            backfill(args.batch_size)
+            return 0
+        if args.command == 'create-view':
+            create_view()
+            return 0
+        return 1 if verify(args.batch_size) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""
+公寓物业收费系统 - 计价引擎
+
+金额全部以"分"为单位的整数计算：单价换算为分，数量换算为 0.01 的整数倍，
+金额 = 数量 × 单价 后按四舍五入（远离零）取整到分，不经过浮点数。
+
+开单时用 check_order() 校验工作台提交的每个费用项金额与合计金额；
+批量报价（如整栋楼每个房间一个月的房租）用 quote_batch() 一次算完，
+安装了 numpy 时整批做一次向量运算，否则逐行计算，结果相同。
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+
+# 数量的最小单位（以 0.01 计）：工作台按金额反推数量时，网费、停车费取整月，其余保留一位小数
+QUANTITY_STEPS = {'network': 100, 'parking': 100}
+DEFAULT_QUANTITY_STEP = 10
+
+# 向量运算使用 int64，数量 × 单价 超出该范围时改为逐行计算
+_INT64_SAFE = 2 ** 62
+
+
+class PricingError(ValueError):
+    """费用项或合计金额校验不通过；fee_type 为出错的费用类型（合计金额出错时为 None）"""
+
+    def __init__(self, message, fee_type=None, expected=None):
+        super().__init__(message)
+        self.fee_type = fee_type
+        self.expected = expected
+
+
+def to_cents(value):
+    """金额/单价（元）转换为分，四舍五入；不是有限的数值时抛出 PricingError"""
+    try:
+        return int((Decimal(str(value or 0)) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+    except (ArithmeticError, ValueError, TypeError):
+        raise PricingError(f'{value!r} 不是有效的数值')
+
+
+def parse_cents(value, label, fee_type=None):
+    """同 to_cents，出错信息带上字段名称（如"电费数量"）"""
+    try:
+        return to_cents(value)
+    except PricingError:
+        raise PricingError(f'{label}格式不正确', fee_type)
+
+
+# 数量与金额同样保留两位小数
+to_hundredths = to_cents
+
+
+def cents_to_decimal(cents):
+    """分转换为两位小数的 Decimal（元）"""
+    return Decimal(cents).scaleb(-2)
+
+
+def multiply_cents(quantity_hundredths, price_cents):
+    """数量（0.01）× 单价（分）-> 金额（分），四舍五入（远离零）"""
+    product = quantity_hundredths * price_cents
+    rounded = (abs(product) + 50) // 100
+    return -rounded if product < 0 else rounded
+
+
+class PricingEngine:
+    """一个小区的计价引擎，prices 为 {费用类型: 单价（元）}，None 表示未配置"""
+
+    def __init__(self, prices):
+        self.price_cents = {fee_type: to_cents(price) for fee_type, price in prices.items() if price is not None}
+
+    def price(self, fee_type):
+        """当前单价（Decimal），未配置时返回 None"""
+        cents = self.price_cents.get(fee_type)
+        return None if cents is None else cents_to_decimal(cents)
+
+    def amount(self, fee_type, quantity, unit_price=None):
+        """按数量计算金额（分）；unit_price 为空时使用收费标准单价，未配置单价返回 None"""
+        price = to_cents(unit_price) if unit_price is not None else self.price_cents.get(fee_type)
+        if price is None:
+            return None
+        return multiply_cents(to_hundredths(quantity), price)
+
+    def check_line(self, fee_type, quantity, amount, unit_price=None, name=None):
+        """
+        校验一个费用项，返回金额（分）；不通过时抛出 PricingError
+        金额的绝对值须与 数量 × 单价 一致，允许的误差为数量最小单位对应的金额的一半：
+        工作台按金额反推数量时数量会被取整，收银员输入的金额本身不变
+        单价未配置或为0的费用项按手工金额收取，不校验；数量为0时只允许退费（负数金额）
+        """
+        name = name or fee_type
+        amount_cents = parse_cents(amount, f'{name}金额', fee_type)
+        quantity_hundredths = parse_cents(quantity, f'{name}数量', fee_type)
+        if unit_price is not None:
+            price = parse_cents(unit_price, f'{name}单价', fee_type)
+        else:
+            price = self.price_cents.get(fee_type)
+        if not price:
+            return amount_cents
+
+        if quantity_hundredths < 0:
+            raise PricingError(f'{name}数量不能为负数', fee_type)
+        if quantity_hundredths == 0:
+            if amount_cents > 0:
+                raise PricingError(f'{name}数量为0时不能收取金额', fee_type, 0)
+            return amount_cents
+
+        price = abs(price)
+        expected = multiply_cents(quantity_hundredths, price)
+        step = QUANTITY_STEPS.get(fee_type, DEFAULT_QUANTITY_STEP)
+        # |金额 - 数量×单价| <= 单价×步长/2 + 0.5分，两边乘以 200 后全部为整数
+        if 2 * abs(abs(amount_cents) * 100 - quantity_hundredths * price) > price * step + 100:
+            raise PricingError(
+                f'{name}金额 {cents_to_decimal(abs(amount_cents))} 与 数量 {cents_to_decimal(quantity_hundredths)}'
+                f' × 单价 {cents_to_decimal(price)} = {cents_to_decimal(expected)} 不一致',
+                fee_type, expected)
+        return amount_cents
+
+    def check_order(self, lines, total, names=None):
+        """
+        校验整单：lines 为 [(费用类型, 数量, 金额, 单价或None)]，total 为提交的合计金额
+        返回 ({费用类型: 金额（分）}, 合计（分）)；合计须与各费用项之和完全一致
+        """
+        names = names or {}
+        amounts = {}
+        for fee_type, quantity, amount, unit_price in lines:
+            amounts[fee_type] = self.check_line(fee_type, quantity, amount, unit_price, names.get(fee_type))
+        total_cents = parse_cents(total, '合计金额')
+        line_total = sum(amounts.values())
+        if total_cents != line_total:
+            raise PricingError(
+                f'合计金额 {cents_to_decimal(total_cents)} 与各费用项之和 {cents_to_decimal(line_total)} 不一致',
+                None, line_total)
+        return amounts, total_cents
+
+    def quote_batch(self, fee_types, quantities):
+        """
+        批量计价：fee_types 与 quantities 等长，返回各行金额（分）的列表，未配置单价的行为 None
+        """
+        hundredths = [to_hundredths(quantity) for quantity in quantities]
+        prices = [self.price_cents.get(fee_type) for fee_type in fee_types]
+        if not hundredths:
+            return []
+        amounts = _multiply_batch(hundredths, [price or 0 for price in prices])
+        return [None if price is None else amount for amount, price in zip(amounts, prices)]
+
+
+def _multiply_batch(hundredths, prices):
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+    if np is None or max(map(abs, hundredths)) * max(map(abs, prices)) >= _INT64_SAFE:
+        return [multiply_cents(q, p) for q, p in zip(hundredths, prices)]
+
+    product = np.asarray(hundredths, dtype=np.int64) * np.asarray(prices, dtype=np.int64)
+    rounded = (np.abs(product) + 50) // 100
+    return np.where(product < 0, -rounded, rounded).tolist()
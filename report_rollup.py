@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+报表汇总表（report_rollups）回填与校验工具
+
+用法:
+    python3 report_rollup.py rebuild --all                      # 首次上线：按全部历史订单回填
+    python3 report_rollup.py rebuild --date 2025-12-01 --days 31
+    python3 report_rollup.py verify                             # 校验今天
+    python3 report_rollup.py verify --date 2025-12-01 --days 31
+
+上线顺序：先部署新版本（之后的订单写入会同步累加汇总），再执行 rebuild --all。
+按费用类型的汇总从 order_items 计算，历史订单需先执行 python3 order_items.py backfill。
+建议在非营业时间回填，回填期间新写入的订单可能与回填结果重复或遗漏，回填后再执行一次 verify。
+"""
+
+import sys
+import argparse
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from app import app, db, Order, ReportRollup, compute_report_rollup, load_report_rollup
+from order_items import orders_missing_items
+
+
+def iter_days(start, days):
+    for offset in range(days):
+        yield start + timedelta(days=offset)
+
+
+def rebuild(day):
+    """删除某日汇总并按原始订单重新写入"""
+    summary = compute_report_rollup(day)
+    ReportRollup.query.filter(ReportRollup.日期 == day).delete(synchronize_session=False)
+    for (community_id, fee_type, payment_method, operator_id), (count, quantity, amount) in summary.items():
+        db.session.add(ReportRollup(
+            日期=day,
+            小区ID=community_id,
+            费用类型=fee_type,
+            收款方式=payment_method,
+            操作员ID=operator_id,
+            订单数=count,
+            数量合计=quantity,
+            金额合计=amount
+        ))
+    db.session.commit()
+    print(f"✅ {day} 已重建 {len(summary)} 条汇总")
+
+
+def verify(day):
+    """比较汇总表与原始订单，返回不一致的条数"""
+    expected = compute_report_rollup(day)
+    actual = load_report_rollup(day)
+    mismatches = 0
+    for key in sorted(set(expected) | set(actual), key=str):
+        want = expected.get(key, (0, 0, 0))
+        got = actual.get(key, (0, 0, 0))
+        if want != got:
+            mismatches += 1
+            community_id, fee_type, payment_method, operator_id = key
+            print(f"❌ {day} 小区ID={community_id} 费用类型={fee_type} 收款方式={payment_method or '(空)'} "
+                  f"操作员ID={operator_id}: 订单 {want[0]} 笔/数量 {want[1]}/{want[2]} 元，"
+                  f"汇总 {got[0]} 笔/数量 {got[1]}/{got[2]} 元")
+    if not mismatches:
+        print(f"✅ {day} 汇总一致")
+    return mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='报表汇总回填与校验')
+    parser.add_argument('command', choices=['rebuild', 'verify'])
+    parser.add_argument('--date', help='起始日期 YYYY-MM-DD（默认今天）')
+    parser.add_argument('--days', type=int, default=1, help='连续处理的天数（默认1）')
+    parser.add_argument('--all', action='store_true', help='从最早的订单处理到今天（忽略 --date/--days）')
+    args = parser.parse_args(argv)
+
+    today = datetime.now().date()
+    start = datetime.strptime(args.date, '%Y-%m-%d').date() if args.date else today
+    days = args.days
+
+    with app.app_context():
+        ReportRollup.__table__.create(db.engine, checkfirst=True)
+        if args.all:
+            first = db.session.query(func.min(Order.录入时间)).scalar()
+            if first is None:
+                print("没有订单，无需处理")
+                return 0
+            start = first.date()
+            days = (today - start).days + 1
+
+        if orders_missing_items().first() is not None:
+            print("❌ 还有订单没有费用明细，请先执行 python3 order_items.py backfill")
+            return 1
+
+        if args.command == 'rebuild':
+            for day in iter_days(start, days):
+                rebuild(day)
+            return 0
+
+        mismatched_days = sum(1 for day in iter_days(start, days) if verify(day))
+        return 1 if mismatched_days else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,28 +1,35 @@
 #!/bin/bash
 
+APP_DIR=/var/www/web_app
+# 与 config.py 的 GUNICORN_PID_FILE 一致
+PID_FILE=${GUNICORN_PID_FILE:-$APP_DIR/logs/gunicorn.pid}
+
 # 进入应用目录
-cd /var/www/web_app
+cd $APP_DIR
+
+# 已在运行时升级到新代码：preload 模式下 HUP 不会重新导入代码，
+# 由 manage.sh upgrade 构建静态资源并通过 USR2 + WINCH + QUIT 平滑替换 master
+if [ -f "$PID_FILE" ] && kill -0 "$(cat "$PID_FILE")" 2>/dev/null; then
+    echo "系统已在运行，升级到新版本..."
+    exec "$APP_DIR/manage.sh" upgrade
+fi
 
 # 激活虚拟环境
 source venv/bin/activate
 
-# 停止已存在的进程
-pkill -f "python3 app.py"
-
-# 等待1秒
-sleep 1
+# 生成带内容哈希的预压缩静态资源（static/dist），页面引用的资源随之更新
+python3 assets.py build > /dev/null
 
-# 启动Flask应用
 echo "正在启动物业收费系统..."
-nohup python3 app.py > app.log 2>&1 &
+gunicorn -c gunicorn.conf.py --daemon wsgi:app
 
 # 检查是否启动成功
 sleep 2
-if ps aux | grep -q "python3 app.py" | grep -v grep; then
-    echo "✓ 系统启动成功！"
-    echo "日志文件: /var/www/web_app/app.log"
-    echo "访问地址: http://$(hostname -I | awk '{print $1}'):5001"
+if [ -f "$PID_FILE" ] && kill -0 "$(cat "$PID_FILE")" 2>/dev/null; then
+    echo "✓ 系统启动成功！master PID: $(cat "$PID_FILE")"
+    echo "日志文件: $APP_DIR/logs/gunicorn.log"
+    echo "访问地址: http://$(hostname -I | awk '{print $1}'):5000"
 else
     echo "✗ 系统启动失败，请检查日志"
-    echo "查看日志: tail -50 /var/www/web_app/app.log"
+    echo "查看日志: tail -50 $APP_DIR/logs/gunicorn.log"
 fi
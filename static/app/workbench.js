@@ -0,0 +1,2574 @@
+/**
+ * 公寓物业收费系统 - 收费工作台前端逻辑（原 templates/index.html 内联脚本）
+ * 页面模板见 workbench.template.js，需在本文件之前加载
+ */
+const { createApp, ref, computed, onMounted, watch, nextTick } = Vue;
+const { ElSelect, ElOption, ElButton, ElInput, ElInputNumber, ElMessage, ElMessageBox, ElDatePicker, ElLoading } = ElementPlus;
+
+// 创建Vue应用实例，并设置自定义分隔符
+const app = createApp({
+    template: window.WORKBENCH_TEMPLATE,
+    compilerOptions: {
+        delimiters: ['[[', ']]']
+    },
+    setup() {
+        // 用户信息
+        const user = ref(JSON.parse(sessionStorage.getItem('user')) || {});
+        const currentPage = ref('workbench');
+        
+        // 工作台数据
+        const buildings = ref([]);  // 楼栋列表
+        const rooms = ref([]);      // 房间列表
+        const selectedBuilding = ref('');
+        const selectedRoomId = ref('');
+        const feeItems = ref([]);
+        const paymentMethod = ref('');
+        const remark = ref('');
+        const generating = ref(false);
+        
+        // 退费模式
+        const isRefundMode = ref(false);
+
+        // 格式化日期时间为日期选择器格式
+        const formatDateTimeForPicker = (date) => {
+            const year = date.getFullYear();
+            const month = String(date.getMonth() + 1).padStart(2, '0');
+            const day = String(date.getDate()).padStart(2, '0');
+            const hours = String(date.getHours()).padStart(2, '0');
+            const minutes = String(date.getMinutes()).padStart(2, '0');
+            return `${year}-${month}-${day} ${hours}:${minutes}`;
+        };
+
+        // 新增：住户信息
+        const residentName = ref('');
+        const residentPhone = ref('');
+        const phoneError = ref('');
+        
+        // 用户历史缴费记录相关
+        const historyExpanded = ref(false);
+        const historyLoading = ref(false);
+        const userHistoryOrders = ref([]);
+
+        // 当前小区的收费标准
+        const communityPrices = ref({
+            electricity: 0.00,
+            coldWater: 0.00, 
+            hotWater: 0.00,
+            network: 0.00,
+            parking: 0.00,
+            rent: 0.00,
+            management: 0.00
+        });
+
+        // 费用类型配置
+        const feeConfig = {
+            electricity: { 
+                name: '电费', 
+                unit: '度', 
+                hasCarPlate: false 
+            },
+            coldWater: { 
+                name: '冷水费', 
+                unit: '吨', 
+                hasCarPlate: false 
+            },
+            hotWater: { 
+                name: '热水费', 
+                unit: '吨', 
+                hasCarPlate: false 
+            },
+            network: { 
+                name: '网费', 
+                unit: '月', 
+                hasCarPlate: false 
+            },
+            parking: { 
+                name: '停车费', 
+                unit: '月', 
+                hasCarPlate: true 
+            },
+            rent: { 
+                name: '房租', 
+                unit: '月', 
+                hasCarPlate: false 
+            },
+            management: { 
+                name: '管理费', 
+                unit: '月', 
+                hasCarPlate: false 
+            }
+        };
+        
+        // 已添加的费用类型集合
+        const addedFeeTypes = ref(new Set());
+        
+        // 今日收费记录
+        const recentOrders = ref([]);
+        // 计算当前操作员的今日收费合计金额
+        const todayTotalAmount = computed(() => {
+            // 使用已筛选的今日用户订单
+            const todayOrders = todayUserOrders.value;
+            if (!todayOrders || !todayOrders.length) return 0;
+            
+            let totalAmount = 0;
+            
+            todayOrders.forEach(order => {
+                // 累加收款金额
+                totalAmount += parseFloat(order.totalAmount) || 0;
+            });
+            
+            return totalAmount;
+        });
+        
+        // 打印凭据数据
+        const receiptData = ref({
+            time: '',
+            building: '',
+            room: '',
+            residentName: '',
+            residentPhone: '',
+            paymentMethod: '',
+            feeItems: '',
+            totalAmount: '',
+            billNumber: '',
+            printTime: '',
+            community: ''
+        });
+        
+        // 检查费用类型是否已添加
+        const isFeeTypeAdded = (type) => {
+            return addedFeeTypes.value.has(type);
+        };
+        
+        // 获取费用类型名称
+        const getFeeTypeName = (type) => {
+            return feeConfig[type]?.name || type;
+        };
+        
+        // 获取费用单位
+        const getFeeUnit = (type) => {
+            return feeConfig[type]?.unit || '';
+        };
+        
+        // 计算总金额
+        const totalAmount = computed(() => {
+            return feeItems.value.reduce((sum, item) => {
+                return sum + (parseFloat(item.amount) || 0);
+            }, 0);
+        });
+        
+        // 是否可以生成账单
+        const canGenerate = computed(() => {
+            // 退费模式下：金额必须为负数才允许提交
+            if (isRefundMode.value) {
+                return selectedRoomId.value && 
+                       feeItems.value.length > 0 && 
+                       paymentMethod.value && 
+                       totalAmount.value < 0 &&  // 退费模式要求金额为负数
+                       !phoneError.value;
+            }
+            // 正常收费模式下：金额必须为正数才允许提交
+            return selectedRoomId.value && 
+                   feeItems.value.length > 0 && 
+                   paymentMethod.value && 
+                   totalAmount.value > 0 &&
+                   !phoneError.value;
+        });
+        
+        // 按钮禁用状态
+        const buttonDisabled = computed(() => {
+            return {
+                electricity: isFeeTypeAdded('electricity'),
+                coldWater: isFeeTypeAdded('coldWater'),
+                hotWater: isFeeTypeAdded('hotWater'),
+                network: isFeeTypeAdded('network'),
+                parking: isFeeTypeAdded('parking'),
+                rent: isFeeTypeAdded('rent'),
+                management: isFeeTypeAdded('management')
+            };
+        });
+        
+        // 删除权限判断：系统管理员或小区经理可以删除
+        const canDeleteOrder = computed(() => {
+            const userRole = user.value.role || '';
+            return userRole === '系统管理员' || userRole === '小区经理';
+        });
+        
+        // 筛选当前操作员的今日订单
+        const todayUserOrders = computed(() => {
+            if (!recentOrders.value || !recentOrders.value.length) return [];
+            
+            // 使用本地时间获取今日日期 YYYY-MM-DD
+            const now = new Date();
+            const today = now.toLocaleDateString('zh-CN', { 
+                year: 'numeric', 
+                month: '2-digit', 
+                day: '2-digit' 
+            }).replace(/\//g, '-');
+            
+            // API已按小区ID筛选，前端只需按日期筛选
+            
+            return recentOrders.value.filter(order => {
+                // 检查是否是今日的订单（已由API按小区ID筛选）
+                const orderDateObj = new Date(order.entryTime);
+                const orderDate = orderDateObj.toLocaleDateString('zh-CN', { 
+                    year: 'numeric', 
+                    month: '2-digit', 
+                    day: '2-digit' 
+                }).replace(/\//g, '-');
+                
+                return orderDate === today; // 只按日期筛选，不筛选操作员ID
+            });
+        });
+        
+        // 验证手机号
+        const validatePhone = () => {
+            const phone = residentPhone.value;
+            if (phone && !/^1[3-9]\d{9}$/.test(phone)) {
+                phoneError.value = '手机号格式不正确（11位数字，1开头）';
+            } else {
+                phoneError.value = '';
+            }
+        };
+        
+        // 楼栋改变事件
+        const onBuildingChange = async (building) => {
+            selectedBuilding.value = building;
+            selectedRoomId.value = '';
+            rooms.value = [];
+            residentName.value = '';
+            residentPhone.value = '';
+            phoneError.value = '';
+            
+            if (building) {
+                await loadRooms(building);
+            }
+        };
+        
+        // 加载房间列表
+        const loadRooms = async (building) => {
+            try {
+                const token = sessionStorage.getItem('token');
+                const response = await fetch(`/api/addresses?step=rooms&building=${encodeURIComponent(building)}`, {
+                    headers: {
+                        'Authorization': `Bearer ${token}`
+                    }
+                });
+                
+                const result = await response.json();
+                if (result.status === 'success') {
+                    rooms.value = result.data;
+                } else {
+                    ElMessage.error('加载房间列表失败');
+                }
+            } catch (error) {
+                console.error('加载房间列表失败:', error);
+                ElMessage.error('网络请求失败');
+            }
+        };
+        
+        // 房间改变事件
+        const onRoomChange = async (roomId) => {
+            selectedRoomId.value = roomId;
+            
+            // 查找选中的房间信息
+            const room = rooms.value.find(r => r.id === roomId);
+            if (room) {
+                // 自动填充住户信息
+                residentName.value = room.name || '';
+                residentPhone.value = room.phone || '';
+                validatePhone();
+                
+                // 自动展开历史缴费记录
+                historyExpanded.value = true;
+                await loadUserPaymentHistory();
+            }
+        };
+
+        // 格式化价格显示
+        const formatPrice = (price) => {
+            const num = parseFloat(price);
+            if (isNaN(num)) return '0.00';
+            return num.toFixed(2);
+        };
+
+        // 格式化日期显示
+        const formatDate = (dateString) => {
+            if (!dateString) return '';
+            const date = new Date(dateString);
+            const year = date.getFullYear();
+            const month = String(date.getMonth() + 1).padStart(2, '0');
+            const day = String(date.getDate()).padStart(2, '0');
+            const hours = String(date.getHours()).padStart(2, '0');
+            const minutes = String(date.getMinutes()).padStart(2, '0');
+            return `${year}/${month}/${day} ${hours}:${minutes}`;
+        };
+        
+        // 切换历史记录展开/折叠状态
+        const toggleHistory = async () => {
+            historyExpanded.value = !historyExpanded.value;
+            
+            // 如果是展开状态且还没有加载过历史记录，则加载历史记录
+            if (historyExpanded.value && userHistoryOrders.value.length === 0 && selectedRoomId.value) {
+                await loadUserPaymentHistory();
+            }
+        };
+        
+        // 加载用户历史缴费记录
+        const loadUserPaymentHistory = async () => {
+            if (!selectedRoomId.value) {
+                return;
+            }
+            
+            // 根据选中的房间获取地址ID
+            const room = rooms.value.find(r => r.id === selectedRoomId.value);
+            if (!room || !room.id) {
+                return;
+            }
+            
+            historyLoading.value = true;
+            
+            try {
+                const token = sessionStorage.getItem('token');
+                const response = await fetch(`/api/user-payment-history?address_id=${room.id}&limit=10`, {
+                    headers: {
+                        'Authorization': `Bearer ${token}`
+                    }
+                });
+                
+                const result = await response.json();
+                if (result.status === 'success') {
+                    userHistoryOrders.value = result.data.orders;
+                } else {
+                    ElMessage.error('加载历史记录失败');
+                    userHistoryOrders.value = [];
+                }
+            } catch (error) {
+                console.error('加载历史记录失败:', error);
+                ElMessage.error('网络请求失败');
+                userHistoryOrders.value = [];
+            } finally {
+                historyLoading.value = false;
+            }
+        };
+        
+        // 监听房间选择变化，当房间变化时重置更新历史记录状态
+        watch(selectedRoomId, (newRoomId) => {
+            if (newRoomId) {
+                // 房间选择变化时，重置历史记录状态
+                userHistoryOrders.value = [];
+                // 注意：这里不再自动设置 historyExpanded.value = false;
+                // 因为 onRoomChange 函数会自动展开历史记录
+            }
+        });
+
+        // 获取当前小区的收费标准
+        const loadFeePrices = async () => {
+            try {
+                const token = sessionStorage.getItem('token');
+                const response = await fetch('/api/fee_prices', {
+                    headers: {
+                        'Authorization': `Bearer ${token}`
+                    }
+                });
+                
+                const result = await response.json();
+                console.log('获取收费标准结果:', result); // 调试用
+                
+                if (result.status === 'success') {
+                    // 更新社区单价
+                    communityPrices.value = result.data;
+                    
+                    console.log('更新后的费用配置:', feeConfig);
+                    ElMessage.success('收费标准已加载');
+                } else {
+                    console.warn('获取收费标准失败:', result.message);
+                    ElMessage.warning('使用默认收费标准');
+                }
+            } catch (error) {
+                console.error('获取收费标准失败:', error);
+                ElMessage.error('获取收费标准失败，请检查网络连接');
+            }
+        };
+
+        // 计算结束日期 - 精确计算：开始日期-1天 + 月数
+        const calculateEndDate = (startDate, months) => {
+            if (!startDate || !months) return '';
+            
+            // 支持yyyy/MM/dd和yyyy-MM-dd格式，统一转换为yyyy/MM/dd
+            const normalizedStartDate = startDate.replace(/-/g, '/');
+            const start = new Date(normalizedStartDate);
+            
+            // 检查日期是否有效
+            if (isNaN(start.getTime())) {
+                console.error('无效的开始日期:', startDate);
+                return '';
+            }
+            
+            const monthCount = parseInt(months) || 1;
+            
+            // 第一步：开始日期减去1天
+            const endDate = new Date(start);
+            endDate.setDate(endDate.getDate() - 1);
+            
+            // 第二步：加上月数，处理月份边界
+            const targetMonth = endDate.getMonth() + monthCount;
+            const targetYear = endDate.getFullYear() + Math.floor(targetMonth / 12);
+            const finalMonth = targetMonth % 12;
+            
+            endDate.setFullYear(targetYear);
+            endDate.setMonth(finalMonth);
+            
+            // 处理日期边界：如果目标日期不存在（如2月30日），则调整为该月最后一天
+            const daysInMonth = new Date(targetYear, finalMonth + 1, 0).getDate();
+            if (endDate.getDate() > daysInMonth) {
+                endDate.setDate(daysInMonth);
+            }
+            
+            // 格式化为 yyyy/MM/dd
+            const year = endDate.getFullYear();
+            const month = String(endDate.getMonth() + 1).padStart(2, '0');
+            const day = String(endDate.getDate()).padStart(2, '0');
+            
+            return `${year}/${month}/${day}`;
+        };
+
+        // 获取停车费项目
+        const getParkingItem = () => {
+            return feeItems.value.find(item => item.type === 'parking') || null;
+        };
+
+        // 处理车牌号输入
+        const handleCarPlateInput = (value) => {
+            console.log('车牌号输入事件触发:', value);
+            const parkingItem = getParkingItem();
+            console.log('停车费项目:', parkingItem);
+            if (parkingItem) {
+                parkingItem.carPlate = value;
+                console.log('更新后的车牌号:', parkingItem.carPlate);
+            } else {
+                console.log('未找到停车费项目');
+            }
+        };
+
+        // 保存停车费详情
+        const saveParkingDetails = () => {
+            // 自动保存到 feeItems 中
+            const parkingItem = getParkingItem();
+            if (parkingItem) {
+                // 更新结束日期
+                if (parkingItem.startDate && parkingItem.quantity) {
+                    parkingItem.endDate = calculateEndDate(parkingItem.startDate, parkingItem.quantity);
+                }
+            }
+        };
+
+        // 处理停车费开始日期变化
+        const handleParkingStartDateChange = (startDate) => {
+            const parkingItem = getParkingItem();
+            if (parkingItem) {
+                // 确保存储的日期格式为 yyyy/MM/dd
+                parkingItem.startDate = startDate.replace(/-/g, '/');
+                // 如果有数量，自动计算结束日期
+                if (parkingItem.quantity) {
+                    parkingItem.endDate = calculateEndDate(startDate, parkingItem.quantity);
+                }
+            }
+        };
+
+        // 更新停车费结束日期
+        const updateParkingEndDate = () => {
+            const parkingItem = getParkingItem();
+            if (parkingItem && parkingItem.startDate && parkingItem.quantity) {
+                parkingItem.endDate = calculateEndDate(parkingItem.startDate, parkingItem.quantity);
+            }
+        };
+        
+        // 添加费用项目
+        const addFeeItem = (type) => {
+            // 检查是否已添加
+            if (addedFeeTypes.value.has(type)) {
+                ElMessage.warning(`${getFeeTypeName(type)}已添加，不能重复添加`);
+                return;
+            }
+            
+            const config = feeConfig[type];
+            if (!config) return;
+            
+            // 获取当前单价
+            const unitPrice = communityPrices.value[type] || 0.00;
+            
+            // 退费模式：金额始终为负数
+            const baseAmount = unitPrice * 1;  // 默认数量为1
+            const finalAmount = isRefundMode.value ? -Math.abs(baseAmount) : Math.abs(baseAmount);
+            
+            // 获取今日日期 - 格式化为 yyyy/MM/dd
+            const today = new Date().toLocaleDateString('zh-CN', { 
+                year: 'numeric', 
+                month: '2-digit', 
+                day: '2-digit' 
+            }).replace(/\//g, '/');
+            
+            // 创建费用项
+            const newItem = {
+                type: type,
+                quantity: 1,
+                unitPrice: unitPrice,
+                amount: finalAmount,  // 退费模式下为负数
+                carPlate: '',
+                startDate: type === 'parking' ? today : '',  // 停车费默认开始日期为今日
+                endDate: type === 'parking' ? calculateEndDate(today, 1) : ''  // 停车费默认结束日期
+            };
+            
+            feeItems.value.push(newItem);
+            addedFeeTypes.value.add(type); // 记录已添加的类型
+            
+            console.log(`添加${getFeeTypeName(type)}:`, { 
+                type, 
+                unitPrice, 
+                amount: finalAmount,
+                isRefund: isRefundMode.value,
+                source: 'API',
+                apiPrice: communityPrices.value[type],
+                startDate: newItem.startDate,
+                endDate: newItem.endDate
+            });
+            
+            const modeText = isRefundMode.value ? '退费' : '收费';
+            ElMessage.success(`已添加${getFeeTypeName(type)}${modeText}，单价：${unitPrice}元`);
+        };
+        
+        // 更新项目金额（通过数量计算金额）
+        const updateItemAmount = (index) => {
+            const item = feeItems.value[index];
+            if (!item) return;
+            
+            const quantity = parseFloat(item.quantity) || 0;
+            const unitPrice = parseFloat(item.unitPrice) || 0;
+            const baseAmount = (quantity * unitPrice).toFixed(2);
+            
+            // 退费模式：金额始终为负数
+            const finalAmount = isRefundMode.value ? -Math.abs(baseAmount) : Math.abs(baseAmount);
+            
+            // 使用Object.assign确保响应式更新
+            Object.assign(item, {
+                amount: finalAmount
+            });
+            
+            // 如果是停车费，更新结束日期
+            if (item.type === 'parking') {
+                if (item.startDate && item.quantity) {
+                    const newEndDate = calculateEndDate(item.startDate, item.quantity);
+                    Object.assign(item, {
+                        endDate: newEndDate
+                    });
+                }
+            }
+            
+            console.log('金额更新:', index, item.type, '数量:', quantity, '单价:', unitPrice, '金额:', finalAmount, '退费模式:', isRefundMode.value);
+        };
+        
+        // 退费模式切换处理
+        const onRefundModeChange = () => {
+            // 当退费模式切换时，重新计算所有费用项的金额
+            feeItems.value.forEach((item, index) => {
+                const quantity = parseFloat(item.quantity) || 0;
+                const unitPrice = parseFloat(item.unitPrice) || 0;
+                const baseAmount = (quantity * unitPrice).toFixed(2);
+                
+                // 退费模式：金额始终为负数
+                const finalAmount = isRefundMode.value ? -Math.abs(baseAmount) : Math.abs(baseAmount);
+                
+                Object.assign(item, {
+                    amount: finalAmount
+                });
+            });
+            
+            const modeText = isRefundMode.value ? '退费' : '收费';
+            ElMessage.info(`已切换到${modeText}模式`);
+        };
+        
+        // 专门处理停车费数量变化
+        const handleParkingQuantityChange = (index) => {
+            const item = feeItems.value[index];
+            if (!item || item.type !== 'parking') return;
+            
+            console.log('停车费数量变化:', index, '数量:', item.quantity);
+            
+            // 更新金额
+            updateItemAmount(index);
+            
+            // 强制重新计算结束日期（updateItemAmount中已经处理，这里确保双重保险）
+            if (item.startDate && item.quantity) {
+                const newEndDate = calculateEndDate(item.startDate, item.quantity);
+                Object.assign(item, {
+                    endDate: newEndDate
+                });
+                console.log('停车费结束日期更新:', index, '开始日期:', item.startDate, '月数:', item.quantity, '结束日期:', newEndDate);
+            }
+        };
+        
+        // 处理所有类型项目的数量变化
+        const handleQuantityChange = (index, value) => {
+            const item = feeItems.value[index];
+            if (!item) return;
+            
+            console.log('数量变化处理:', item.type, index, '新值:', value, '当前数量:', item.quantity);
+            
+            // 确保数量值正确更新
+            if (value !== undefined) {
+                item.quantity = value;
+            }
+            
+            if (item.type === 'parking') {
+                handleParkingQuantityChange(index);
+            } else {
+                updateItemAmount(index);
+            }
+        };
+        
+        // 测试停车费日期计算逻辑
+        const testParkingDateCalculation = () => {
+            console.log('=== 停车费日期计算测试 ===');
+            
+            // 测试用例1：正常情况 - 2025/12/19 + 2个月 = 2026/2/18
+            const test1 = calculateEndDate('2025/12/19', 2);
+            console.log('测试1 - 2025/12/19 + 2个月:', test1, '预期: 2026/02/18', test1 === '2026/02/18' ? '✓ 通过' : '✗ 失败');
+            
+            // 测试用例2：月末边界 - 2025/1/31 + 1个月 = 2025/2/28
+            const test2 = calculateEndDate('2025/1/31', 1);
+            console.log('测试2 - 2025/1/31 + 1个月:', test2, '预期: 2025/02/28', test2 === '2025/02/28' ? '✓ 通过' : '✗ 失败');
+            
+            // 测试用例3：闰年处理 - 2024/2/29 + 12个月 = 2025/2/28
+            const test3 = calculateEndDate('2024/2/29', 12);
+            console.log('测试3 - 2024/2/29 + 12个月:', test3, '预期: 2025/02/28', test3 === '2025/02/28' ? '✓ 通过' : '✗ 失败');
+            
+            // 测试用例4：非闰年 - 2025/2/28 + 1个月 = 2025/3/27
+            const test4 = calculateEndDate('2025/2/28', 1);
+            console.log('测试4 - 2025/2/28 + 1个月:', test4, '预期: 2025/03/27', test4 === '2025/03/27' ? '✓ 通过' : '✗ 失败');
+            
+            // 测试用例5：年末边界 - 2025/12/31 + 1个月 = 2026/1/30
+            const test5 = calculateEndDate('2025/12/31', 1);
+            console.log('测试5 - 2025/12/31 + 1个月:', test5, '预期: 2026/01/30', test5 === '2026/01/30' ? '✓ 通过' : '✗ 失败');
+            
+            console.log('=== 测试完成 ===');
+        };
+        
+        // 通过金额反推数量
+        const updateItemQuantityFromAmount = (index) => {
+            const item = feeItems.value[index];
+            let amount = parseFloat(item.amount) || 0;
+            const unitPrice = parseFloat(item.unitPrice) || 0;
+            
+            // 退费模式下：确保金额始终为负数
+            if (isRefundMode.value && amount > 0) {
+                amount = -amount;
+                // 更新金额为负数
+                Object.assign(item, {
+                    amount: amount
+                });
+            }
+            
+            if (unitPrice > 0) {
+                // 计算数量 = 金额 / 单价
+                let quantity = amount / unitPrice;
+                
+                // 根据费用类型处理小数位数
+                if (item.type === 'network' || item.type === 'parking') {
+                    // 网费和停车费按整月计算，四舍五入到整数
+                    quantity = Math.round(quantity);
+                } else {
+                    // 电费和水费保留1位小数
+                    quantity = Math.round(quantity * 10) / 10;
+                }
+                
+                // 确保数量不为负数
+                if (quantity < 0) quantity = 0;
+                
+                item.quantity = quantity;
+                
+                // 如果是停车费，更新结束日期
+                if (item.type === 'parking') {
+                    if (item.startDate && item.quantity) {
+                        item.endDate = calculateEndDate(item.startDate, item.quantity);
+                    }
+                }
+            }
+        };
+        
+        // 移除费用项目
+        const removeFeeItem = (index) => {
+            const removedType = feeItems.value[index].type;
+            feeItems.value.splice(index, 1);
+            addedFeeTypes.value.delete(removedType); // 释放费用类型
+            ElMessage.success(`${getFeeTypeName(removedType)}已删除`);
+        };
+        
+        // 选择收款方式
+        const selectPaymentMethod = (method) => {
+            if (paymentMethod.value === method) {
+                // 如果已经选中，再次点击则取消选择
+                paymentMethod.value = '';
+            } else {
+                paymentMethod.value = method;
+            }
+        };
+        
+        // 准备打印凭据数据 - 修改后的版本，使用新的格式
+        const prepareReceiptData = (result, selectedRoom) => {
+            // 获取当前时间
+            const now = new Date();
+            const timeStr = now.toLocaleString('zh-CN');
+            
+            // 构建费用项目HTML（新格式）
+            const feeItemsArr = [];
+            
+            feeItems.value.forEach(item => {
+                const name = getFeeTypeName(item.type);
+                const quantity = parseFloat(item.quantity) || 0;
+                const amount = parseFloat(item.amount) || 0;
+                const unit = getFeeUnit(item.type);
+                
+                let feeText = '';
+                
+                if (item.type === 'parking') {
+                    // 停车费格式：停车费 | 1个月 | ¥130.00 | 2025/12/1-2025/12/31| 皖CMV152
+                    const startDate = item.startDate ? formatDate(item.startDate).split(' ')[0] : '';
+                    const endDate = item.endDate ? formatDate(item.endDate).split(' ')[0] : '';
+                    const dateRange = startDate && endDate ? `${startDate}-${endDate}` : '';
+                    const carPlate = item.carPlate || '';
+                    
+                    feeText = `${name} | ${quantity}${unit} | ¥${formatPrice(amount)} | ${dateRange} | ${carPlate}`;
+                } else {
+                    // 其他项目格式：电费 | 200.0度 | ¥170.00
+                    feeText = `${name} | ${quantity}${unit} | ¥${formatPrice(amount)}`;
+                }
+
+                
+                feeItemsArr.push(feeText);
+            });
+            
+            // 将数组转换为HTML，每项占一行
+            const feeItemsHtml = feeItemsArr.join('<br>');
+            
+            // 填充打印数据
+            receiptData.value = {
+                time: timeStr,
+                building: selectedBuilding.value || '',
+                room: selectedRoom ? selectedRoom.room : '',
+                residentName: residentName.value || '',
+                residentPhone: residentPhone.value || '',
+                paymentMethod: paymentMethod.value,
+                feeItems: feeItemsArr.join('，'), // 保留原格式，以防其他地方需要
+                feeItemsHtml: feeItemsHtml, // 新增HTML格式
+                totalAmount: formatPrice(totalAmount.value),
+                billNumber: result.data.billNumber,
+                printTime: timeStr,
+                community: user.value.community || ''
+            };
+        };
+        
+        // 打印凭据
+        const printReceipt = () => {
+            // 显示打印区域
+            const printDiv = document.getElementById('print-receipt');
+            printDiv.style.display = 'block';
+            
+            // 添加打印后处理事件
+            const afterPrint = () => {
+                printDiv.style.display = 'none';
+                window.removeEventListener('afterprint', afterPrint);
+            };
+            
+            // 监听打印后事件
+            window.addEventListener('afterprint', afterPrint);
+            
+            // 调用打印
+            window.print();
+            
+            // 备用方案：如果afterprint事件未触发，使用setTimeout
+            setTimeout(() => {
+                if (printDiv.style.display === 'block') {
+                    printDiv.style.display = 'none';
+                }
+            }, 1000);
+        };
+        
+        // 生成账单
+        const generateBill = async () => {
+            if (!canGenerate.value) return;
+            
+            try {
+                generating.value = true;
+                
+                // 准备数据
+                // 使用当前日期时间作为收费日期
+                const now = new Date();
+                const year = now.getFullYear();
+                const month = String(now.getMonth() + 1).padStart(2, '0');
+                const day = String(now.getDate()).padStart(2, '0');
+                const hours = String(now.getHours()).padStart(2, '0');
+                const minutes = String(now.getMinutes()).padStart(2, '0');
+                const seconds = String(now.getSeconds()).padStart(2, '0');
+                const entryTime = `${year}-${month}-${day} ${hours}:${minutes}:${seconds}`;
+                
+                const orderData = {
+                    addressId: selectedRoomId.value,
+                    paymentMethod: paymentMethod.value,
+                    totalAmount: totalAmount.value,
+                    // 退费模式下在备注中添加【退费】标识（放在前面）
+                    remark: isRefundMode.value ? 
+                            (remark.value ? `【退费】${remark.value}` : '【退费】') : 
+                            remark.value,
+                    residentName: residentName.value,
+                    residentPhone: residentPhone.value,
+                    entryTime: entryTime,  // 添加收费日期时间
+                    items: feeItems.value.map(item => {
+                        const itemData = {
+                            type: item.type,
+                            quantity: parseFloat(item.quantity) || 0,
+                            unitPrice: parseFloat(item.unitPrice) || 0,
+                            amount: parseFloat(item.amount) || 0
+                        };
+                        
+                        // 如果是停车费，添加车牌号、开始日期、结束日期
+                        if (item.type === 'parking') {
+                            itemData.carPlate = item.carPlate || '';
+                            // 确保日期格式为 yyyy-MM-dd（后端期望格式）
+                            itemData.startDate = item.startDate ? item.startDate.replace(/\//g, '-') : '';
+                            itemData.endDate = item.endDate ? item.endDate.replace(/\//g, '-') : '';
+                        }
+                        
+                        return itemData;
+                    }),
+                    // 添加房租和管理费数据映射
+                    rentMonths: feeItems.value.find(item => item.type === 'rent') ? 
+                              parseFloat(feeItems.value.find(item => item.type === 'rent').quantity) || 0 : 0,
+                    rentAmount: feeItems.value.find(item => item.type === 'rent') ? 
+                              parseFloat(feeItems.value.find(item => item.type === 'rent').amount) || 0 : 0,
+                    managementMonths: feeItems.value.find(item => item.type === 'management') ? 
+                                    parseFloat(feeItems.value.find(item => item.type === 'management').quantity) || 0 : 0,
+                    managementAmount: feeItems.value.find(item => item.type === 'management') ? 
+                                    parseFloat(feeItems.value.find(item => item.type === 'management').amount) || 0 : 0
+                };
+                
+                // 调用后端API
+                const token = sessionStorage.getItem('token');
+                const response = await fetch('/api/orders', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                        'Authorization': `Bearer ${token}`
+                    },
+                    body: JSON.stringify(orderData)
+                });
+                
+                const result = await response.json();
+                
+                if (result.status === 'success') {
+                    // 显示成功对话框，询问是否打印
+                    ElMessageBox.confirm(
+                        `收费成功！\n账单号：${result.data.billNumber}\n金额：${formatPrice(totalAmount.value)}元`,
+                        '操作成功',
+                        {
+                            confirmButtonText: '立即打印',
+                            cancelButtonText: '继续开单',
+                            type: 'success',
+                            center: true,
+                            showClose: false
+                        }
+                    ).then(() => {
+                        // 用户点击了"立即打印"
+                        // 获取当前选中的房间信息
+                        const selectedRoom = rooms.value.find(r => r.id === selectedRoomId.value);
+                        
+                        // 准备打印数据
+                        prepareReceiptData(result, selectedRoom);
+                        
+                        // 打印凭据
+                        setTimeout(() => {
+                            printReceipt();
+                        }, 100);
+                        
+                        // 延迟1秒后清空表单，以便继续开单
+                        setTimeout(() => {
+                            // 清空费用项目
+                            feeItems.value = [];
+                            addedFeeTypes.value.clear();
+                            
+                            // 重置支付方式和备注
+                            paymentMethod.value = '';
+                            remark.value = '';
+                            
+                            // 清空住户信息
+                            residentName.value = '';
+                            residentPhone.value = '';
+                            phoneError.value = '';
+                            
+                            // 清空地址选择
+                            selectedBuilding.value = '';
+                            selectedRoomId.value = '';
+                            rooms.value = [];
+                            
+                            // 清空用户历史缴费记录并置为折叠状态
+                            userHistoryOrders.value = [];
+                            historyExpanded.value = false;
+                            
+                            // 重置退费模式为未勾选状态
+                            isRefundMode.value = false;
+                            
+                            // 重新加载最近记录
+                            refreshRecentOrders();
+                            
+                            ElMessage.success('打印完成，可以继续开单');
+                        }, 1000);
+                    }).catch((dialogError) => {
+                        if (dialogError === 'cancel') {
+                            // 用户点击了"继续开单"
+                            // 清空费用项目
+                            feeItems.value = [];
+                            addedFeeTypes.value.clear();
+                            
+                            // 重置支付方式和备注
+                            paymentMethod.value = '';
+                            remark.value = '';
+                            
+                            // 清空住户信息
+                            residentName.value = '';
+                            residentPhone.value = '';
+                            phoneError.value = '';
+                            
+                            // 清空地址选择
+                            selectedBuilding.value = '';
+                            selectedRoomId.value = '';
+                            rooms.value = [];
+                            
+                            // 清空用户历史缴费记录并置为折叠状态
+                            userHistoryOrders.value = [];
+                            historyExpanded.value = false;
+                            
+                            // 重置退费模式为未勾选状态
+                            isRefundMode.value = false;
+                            
+                            // 重新加载最近记录
+                            refreshRecentOrders();
+                            
+                            ElMessage.success('订单已保存，请继续开单');
+                        } else {
+                            // 其他错误
+                            console.error('对话框错误:', dialogError);
+                            ElMessage.success('订单已保存');
+                        }
+                    });
+                    
+                } else {
+                    ElMessage.error(result.message || '账单生成失败');
+                }
+            } catch (error) {
+                console.error('生成账单失败:', error);
+                ElMessage.error('网络请求失败');
+            } finally {
+                generating.value = false;
+            }
+        };
+        
+        // 清空表单
+        const clearForm = () => {
+            ElMessageBox.confirm('确定要清空当前表单吗？', '提示', {
+                confirmButtonText: '确定',
+                cancelButtonText: '取消',
+                type: 'warning'
+            }).then(() => {
+                // 清空费用项目
+                feeItems.value = [];
+                addedFeeTypes.value.clear();
+                
+                // 重置支付方式和备注
+                paymentMethod.value = '';
+                remark.value = '';
+                
+                // 清空住户信息
+                residentName.value = '';
+                residentPhone.value = '';
+                phoneError.value = '';
+                
+                // 清空地址选择
+                selectedBuilding.value = '';
+                selectedRoomId.value = '';
+                rooms.value = [];
+                
+                // 清空用户历史缴费记录并置为折叠状态
+                userHistoryOrders.value = [];
+                historyExpanded.value = false;
+                
+                // 重置退费模式为未勾选状态
+                isRefundMode.value = false;
+                
+                // 注意：收费日期时间不清空，保留当前时间
+                
+                ElMessage.success('表单已清空');
+            }).catch(() => {
+                // 用户取消
+            });
+        };
+        
+        // 收费标准管理页面跳转
+        const goToFeePricesAdmin = async () => {
+            const token = sessionStorage.getItem('token');
+            if (!token) {
+                ElMessage.error('请先登录');
+                window.location.href = '/login';
+                return;
+            }
+            
+            try {
+                // 使用fetch API，手动在请求头中携带Token去获取管理页面的HTML
+                const response = await fetch('/admin/fee-prices', {
+                    headers: {
+                        'Authorization': `Bearer ${token}`
+                    }
+                });
+                
+                if (response.ok) {
+                    // 获取到HTML内容
+                    const htmlContent = await response.text();
+                    // 在新窗口/标签页中打开（推荐，体验更好）
+                    const newWindow = window.open('', '_blank');
+                    if (newWindow) {
+                        newWindow.document.write(htmlContent);
+                        newWindow.document.close();
+                    } else {
+                        ElMessage.warning('请允许浏览器弹出窗口，或在新标签页手动访问');
+                    }
+                } else if (response.status === 401) {
+                    ElMessage.error('令牌无效或已过期，请重新登录');
+                    sessionStorage.removeItem('token');
+                    sessionStorage.removeItem('user');
+                    window.location.href = '/login';
+                } else if (response.status === 403) {
+                    ElMessage.error('权限不足，需要管理员身份');
+                } else {
+                    ElMessage.error('访问管理页面失败');
+                }
+            } catch (error) {
+                console.error('跳转失败:', error);
+                ElMessage.error('网络请求失败');
+            }
+        };
+        
+        // 退出登录
+        const logout = () => {
+            ElMessageBox.confirm('确定要退出登录吗？', '提示', {
+                confirmButtonText: '确定',
+                cancelButtonText: '取消',
+                type: 'warning'
+            }).then(() => {
+                sessionStorage.removeItem('token');
+                sessionStorage.removeItem('user');
+                window.location.href = '/login';
+            }).catch(() => {
+                // 用户取消
+            });
+        };
+        
+        // 加载楼栋列表
+        const loadBuildings = async () => {
+            try {
+                const token = sessionStorage.getItem('token');
+                const response = await fetch('/api/addresses?step=buildings', {
+                    headers: {
+                        'Authorization': `Bearer ${token}`
+                    }
+                });
+                
+                const result = await response.json();
+                if (result.status === 'success') {
+                    buildings.value = result.data;
+                } else {
+                    ElMessage.error('加载楼栋列表失败');
+                }
+            } catch (error) {
+                console.error('加载楼栋列表失败:', error);
+                ElMessage.error('网络请求失败');
+            }
+        };
+        
+        // 加载今日收费记录
+        const loadRecentOrders = async () => {
+            console.log('开始加载今日收费记录...');
+            try {
+                const token = sessionStorage.getItem('token');
+                console.log('发送请求到 /api/recent-orders');
+                const response = await fetch('/api/recent-orders', {
+                    headers: {
+                        'Authorization': `Bearer ${token}`
+                    }
+                });
+                
+                const result = await response.json();
+                console.log('收到今日收费记录响应:', result);
+                if (result.status === 'success') {
+                    recentOrders.value = result.data.orders || [];
+                    console.log('设置 recentOrders:', recentOrders.value.length, '条记录');
+                    console.log('今日收费记录将自动计算');
+                } else {
+                    console.warn('加载今日收费记录失败:', result.message);
+                }
+            } catch (error) {
+                console.error('加载今日收费记录失败:', error);
+            }
+        };
+        
+        // ========== 订单变更推送（SSE） ==========
+        // 连接正常时，新建/红冲/删除的订单由服务端推送，只更新变化的行；
+        // 浏览器不支持或连接不可用时，操作完成后仍整表重新加载
+        let orderStreamConnected = false;
+        let orderStreamReconnecting = false;
+        let orderStreamRetryDelay = 3000;
+        let orderStreamRetryTimer = null;
+        
+        const upsertRecentOrder = (order) => {
+            const list = recentOrders.value.filter(item => item.orderId !== order.orderId);
+            list.push(order);
+            list.sort((a, b) => (b.entryTime || '').localeCompare(a.entryTime || ''));
+            recentOrders.value = list;
+        };
+        
+        const applyOrderEvent = (event) => {
+            if (event.type === 'created') {
+                upsertRecentOrder(event.order);
+            } else if (event.type === 'redReversed') {
+                // 原订单不在今日列表中（往日订单被红冲）时只加入冲销订单
+                if (recentOrders.value.some(item => item.orderId === event.original.orderId)) {
+                    upsertRecentOrder(event.original);
+                }
+                upsertRecentOrder(event.order);
+            } else if (event.type === 'deleted') {
+                recentOrders.value = recentOrders.value.filter(item => item.orderId !== event.orderId);
+            }
+        };
+        
+        const scheduleOrderStreamReconnect = () => {
+            clearTimeout(orderStreamRetryTimer);
+            orderStreamRetryTimer = setTimeout(() => {
+                orderStreamReconnecting = true;
+                connectOrderStream();
+            }, orderStreamRetryDelay);
+            orderStreamRetryDelay = Math.min(orderStreamRetryDelay * 2, 60000);
+        };
+        
+        const connectOrderStream = async () => {
+            if (!window.EventSource) return;
+            const token = sessionStorage.getItem('token');
+            if (!token) return;
+            try {
+                // EventSource 不能带 Authorization 头，先换取短期票据
+                const response = await fetch('/api/orders/stream-ticket', {
+                    method: 'POST',
+                    headers: {
+                        'Authorization': `Bearer ${token}`
+                    }
+                });
+                const result = await response.json();
+                if (result.status !== 'success') {
+                    throw new Error(result.message);
+                }
+                
+                const source = new EventSource(`/api/orders/stream?ticket=${encodeURIComponent(result.data.ticket)}`);
+                source.addEventListener('open', () => {
+                    // 断线期间可能漏掉事件，重连成功后整表加载一次
+                    if (orderStreamReconnecting) {
+                        loadRecentOrders();
+                    }
+                    orderStreamConnected = true;
+                    orderStreamRetryDelay = 3000;
+                });
+                source.addEventListener('order', (e) => applyOrderEvent(JSON.parse(e.data)));
+                source.addEventListener('reset', () => loadRecentOrders());
+                source.addEventListener('error', () => {
+                    // 票据只在建立连接时有效，断开后关闭并换新票据重连
+                    source.close();
+                    orderStreamConnected = false;
+                    scheduleOrderStreamReconnect();
+                });
+            } catch (error) {
+                console.warn('订单推送连接失败:', error);
+                scheduleOrderStreamReconnect();
+            }
+        };
+        
+        // 开单、删除、红冲后刷新今日记录：推送已连接时由推送事件更新，无需整表加载
+        const refreshRecentOrders = () => {
+            if (!orderStreamConnected) {
+                return loadRecentOrders();
+            }
+        };
+        
+        // 删除订单函数 - 包含二次确认
+        const deleteOrder = async (orderId) => {
+            try {
+                // 第一次确认
+                await ElMessageBox.confirm('确定要删除这条收费记录吗？', '删除确认', {
+                    confirmButtonText: '确定',
+                    cancelButtonText: '取消',
+                    type: 'warning'
+                });
+                
+                // 第二次确认
+                await ElMessageBox.confirm('删除后无法恢复，请再次确认是否删除？', '二次确认', {
+                    confirmButtonText: '确定删除',
+                    cancelButtonText: '取消',
+                    type: 'error'
+                });
+                
+                const token = sessionStorage.getItem('token');
+                if (!token) {
+                    ElMessage.error('请先登录');
+                    return;
+                }
+                
+                // 显示加载中状态
+                const loading = ElLoading.service({
+                    lock: true,
+                    text: '正在删除订单...',
+                    background: 'rgba(0, 0, 0, 0.7)'
+                });
+                
+                try {
+                    const response = await fetch(`/api/orders/${orderId}`, {
+                        method: 'DELETE',
+                        headers: {
+                            'Authorization': `Bearer ${token}`
+                        }
+                    });
+                    
+                    if (!response.ok) {
+                        const errorData = await response.json();
+                        throw new Error(errorData.message || '删除订单失败');
+                    }
+                    
+                    const result = await response.json();
+                    
+                    if (result.status === 'success') {
+                        ElMessage.success('订单删除成功');
+                        // 重新加载最近记录
+                        await refreshRecentOrders();
+                    } else {
+                        throw new Error(result.message || '删除订单失败');
+                    }
+                } finally {
+                    loading.close();
+                }
+            } catch (error) {
+                // 如果是用户取消，不显示错误
+                if (error === 'cancel' || error.message === 'cancel') {
+                    return;
+                }
+                console.error('删除订单失败:', error);
+                ElMessage.error(`删除订单失败: ${error.message || error}`);
+            }
+        };
+        
+        // 红冲函数 - 创建负金额的冲销记录
+        const handleRedReverse = async (order) => {
+            try {
+                let reason = '';
+                let validReason = false;
+                
+                // 循环弹出输入框直到用户输入有效内容
+                while (!validReason) {
+                    const { value: inputReason } = await ElMessageBox.prompt('请输入红冲原因：', '红冲确认', {
+                        confirmButtonText: '确定',
+                        cancelButtonText: '取消',
+                        inputType: 'textarea',
+                        inputPlaceholder: '请输入红冲原因...',
+                        type: 'warning'
+                    });
+                    
+                    // 如果用户点击了取消按钮，则退出
+                    if (inputReason === null || inputReason === undefined) {
+                        return;
+                    }
+                    
+                    // 检查输入是否为空
+                    if (inputReason.trim() === '') {
+                        ElMessage.warning('红冲原因不能为空，请重新输入');
+                        continue; // 继续循环，再次弹出输入框
+                    }
+                    
+                    reason = inputReason.trim();
+                    validReason = true; // 输入有效，退出循环
+                }
+                
+                // 二次确认
+                await ElMessageBox.confirm(`确定要对【${order.building || ''}-${order.room || ''} ¥${formatPrice(order.totalAmount)}】 进行红冲吗？\n原因：${reason}`, '二次确认', {
+                    confirmButtonText: '确定红冲',
+                    cancelButtonText: '取消',
+                    type: 'error'
+                });
+                
+                const token = sessionStorage.getItem('token');
+                if (!token) {
+                    ElMessage.error('请先登录');
+                    return;
+                }
+                
+                // 显示加载中状态
+                const loading = ElLoading.service({
+                    lock: true,
+                    text: '正在创建红冲记录...',
+                    background: 'rgba(0, 0, 0, 0.7)'
+                });
+                
+                try {
+                    // 获取原订单的详细信息
+                    const orderDetailResponse = await fetch(`/api/orders/${order.orderId}`, {
+                        headers: {
+                            'Authorization': `Bearer ${token}`
+                        }
+                    });
+                    
+                    if (!orderDetailResponse.ok) {
+                        const errorData = await orderDetailResponse.json();
+                        throw new Error(errorData.message || '获取订单详情失败');
+                    }
+                    
+                    const orderDetailResult = await orderDetailResponse.json();
+                    if (orderDetailResult.status !== 'success') {
+                        throw new Error(orderDetailResult.message || '获取订单详情失败');
+                    }
+                    
+                    const originalOrder = orderDetailResult.data;
+                    
+                    // 构建红冲记录数据
+                    const currentTime = new Date();
+                    // 使用本地时间而不是UTC时间
+                    const year = currentTime.getFullYear();
+                    const month = String(currentTime.getMonth() + 1).padStart(2, '0');
+                    const day = String(currentTime.getDate()).padStart(2, '0');
+                    const hours = String(currentTime.getHours()).padStart(2, '0');
+                    const minutes = String(currentTime.getMinutes()).padStart(2, '0');
+                    const seconds = String(currentTime.getSeconds()).padStart(2, '0');
+                    const formattedTime = `${year}-${month}-${day} ${hours}:${minutes}:${seconds}`;
+                    console.log('红冲记录时间:', formattedTime);
+                    
+                    const redReverseData = {
+                        addressId: originalOrder.addressId || order.addressId,
+                        paymentMethod: originalOrder.paymentMethod || order.paymentMethod,
+                        totalAmount: -(originalOrder.totalAmount || order.totalAmount), // 金额改为负数
+                        remark: `【红冲】\n原订单号：${originalOrder.billNumber || order.orderId}\n原因：${reason}`,
+                        residentName: originalOrder.residentName || order.residentName,
+                        residentPhone: originalOrder.residentPhone || order.residentPhone,
+                        entryTime: formattedTime, // 使用当前时间
+                        originalOrderId: originalOrder.orderId, // 添加原订单ID，用于后端识别红冲操作
+                        items: originalOrder.feeDetails ? originalOrder.feeDetails.map(item => ({
+                            type: item.name.toLowerCase().includes('电') ? 'electricity' : 
+                                  item.name.toLowerCase().includes('热') ? 'hotWater' :
+                                  item.name.toLowerCase().includes('冷') ? 'coldWater' :
+                                  item.name.toLowerCase().includes('网') ? 'network' :
+                                  item.name.toLowerCase().includes('停') ? 'parking' : 'other',
+                            quantity: parseFloat(item.quantity) || 0,
+                            unitPrice: parseFloat(item.price) || 0,
+                            amount: -(parseFloat(item.amount) || 0) // 金额改为负数
+                        })) : []
+                    };
+                    
+                    console.log('发送的红冲数据:', redReverseData);
+                    
+                    // 调用后端API创建红冲记录
+                    const response = await fetch('/api/orders', {
+                        method: 'POST',
+                        headers: {
+                            'Content-Type': 'application/json',
+                            'Authorization': `Bearer ${token}`
+                        },
+                        body: JSON.stringify(redReverseData)
+                    });
+                    
+                    if (!response.ok) {
+                        const errorData = await response.json();
+                        throw new Error(errorData.message || '创建红冲记录失败');
+                    }
+                    
+                    const result = await response.json();
+                    
+                    if (result.status === 'success') {
+                        ElMessage.success('红冲记录创建成功');
+                        // 重新加载今日收费记录
+                        await refreshRecentOrders();
+                    } else {
+                        throw new Error(result.message || '创建红冲记录失败');
+                    }
+                } finally {
+                    loading.close();
+                }
+            } catch (error) {
+                // 如果是用户取消，不显示错误
+                if (error === 'cancel' || error.message === 'cancel') {
+                    return;
+                }
+                console.error('红冲失败:', error);
+                ElMessage.error(`红冲失败: ${error.message || error}`);
+            }
+        };
+        
+        // 重打小票函数 - 增强版
+        const reprintReceipt = async (orderId) => {
+            try {
+                // 添加确认对话框
+                await ElMessageBox.confirm('确定要重打这张小票吗？', '提示', {
+                    confirmButtonText: '确定',
+                    cancelButtonText: '取消',
+                    type: 'warning'
+                });
+                
+                const token = sessionStorage.getItem('token');
+                if (!token) {
+                    ElMessage.error('请先登录');
+                    return;
+                }
+                
+                // 显示加载中状态
+                const loading = ElLoading.service({
+                    lock: true,
+                    text: '正在获取订单信息...',
+                    background: 'rgba(0, 0, 0, 0.7)'
+                });
+                
+                try {
+                    const response = await fetch(`/api/orders/${orderId}`, {
+                        headers: {
+                            'Authorization': `Bearer ${token}`
+                        }
+                    });
+                    
+                    if (!response.ok) {
+                        const errorData = await response.json();
+                        throw new Error(errorData.message || '获取订单信息失败');
+                    }
+                    
+                    const result = await response.json();
+                    
+                    if (result.status === 'success') {
+                        // 准备打印数据
+                        const order = result.data;
+                        
+                        // 构建费用项目字符串（新格式）
+                        const feeItemsArr = [];
+                        
+                        // 检查新的数据结构
+                        if (order.feeDetails && order.feeDetails.length > 0) {
+                            // 使用新的数据结构
+                            order.feeDetails.forEach(fee => {
+                                let feeText = '';
+                                
+                                if (fee.name === '停车费') {
+                                    // 停车费格式：停车费 | 1个月 | ¥130.00 | 2025/12/1-2025/12/31| 皖CMV152
+                                    const startDate = fee.startDate ? formatDate(fee.startDate).split(' ')[0] : '';
+                                    const endDate = fee.endDate ? formatDate(fee.endDate).split(' ')[0] : '';
+                                    const dateRange = startDate && endDate ? `${startDate}-${endDate}` : '';
+                                    const carPlate = fee.carPlate || '';
+                                    
+                                    feeText = `${fee.name} | ${fee.quantity}${fee.unit} | ¥${formatPrice(fee.amount)} | ${dateRange} | ${carPlate}`;
+                                } else {
+                                    // 其他项目格式：电费 | 200.0度 | ¥170.00
+                                    feeText = `${fee.name} | ${fee.quantity}${fee.unit} | ¥${formatPrice(fee.amount)}`;
+                                }
+                                
+                                feeItemsArr.push(feeText);
+                            });
+                        } else {
+                            // 旧的兼容方式
+                            if (order.electricity && parseFloat(order.electricity.amount) > 0) {
+                                feeItemsArr.push(`电费 | ${order.electricity.degree}度 | ¥${formatPrice(order.electricity.amount)}`);
+                            }
+                            if (order.coldWater && parseFloat(order.coldWater.amount) > 0) {
+                                feeItemsArr.push(`冷水费 | ${order.coldWater.ton}吨 | ¥${formatPrice(order.coldWater.amount)}`);
+                            }
+                            if (order.hotWater && parseFloat(order.hotWater.amount) > 0) {
+                                feeItemsArr.push(`热水费 | ${order.hotWater.ton}吨 | ¥${formatPrice(order.hotWater.amount)}`);
+                            }
+                            if (order.network && parseFloat(order.network.amount) > 0) {
+                                feeItemsArr.push(`网费 | ${order.network.month}月 | ¥${formatPrice(order.network.amount)}`);
+                            }
+                            if (order.parking && parseFloat(order.parking.amount) > 0) {
+                                const startDate = order.parking.startDate ? formatDate(order.parking.startDate).split(' ')[0] : '';
+                                const endDate = order.parking.endDate ? formatDate(order.parking.endDate).split(' ')[0] : '';
+                                const dateRange = startDate && endDate ? `${startDate}-${endDate}` : '';
+                                const carPlate = order.parking.carPlate || '';
+                                
+                                feeItemsArr.push(`停车费 | ${order.parking.month}月 | ¥${formatPrice(order.parking.amount)} | ${dateRange} | ${carPlate}`);
+                            }
+                        }
+                        
+                        // 将数组转换为HTML，每项占一行
+                        const feeItemsHtml = feeItemsArr.join('<br>');
+                        const feeItemsStr = feeItemsArr.join('，'); // 保留原格式，以防其他地方需要
+                        
+                        // 准备打印数据
+                        receiptData.value = {
+                            time: order.entryTime,
+                            building: order.address?.building || '',
+                            room: order.address?.room || '',
+                            residentName: order.residentName || order.address?.residentName || '',
+                            residentPhone: order.residentPhone || order.address?.residentPhone || '',
+                            paymentMethod: order.paymentMethod,
+                            feeItems: feeItemsStr,
+                            feeItemsHtml: feeItemsHtml, // 新增HTML格式
+                            totalAmount: formatPrice(order.totalAmount),
+                            billNumber: order.billNumber,
+                            printTime: new Date().toLocaleString('zh-CN'),
+                            community: user.value.community || ''
+                        };
+                        
+                        // 打印凭据
+                        setTimeout(() => {
+                            printReceipt();
+                        }, 100);
+                        
+                        ElMessage.success('小票重打成功');
+                    } else {
+                        throw new Error(result.message || '获取订单信息失败');
+                    }
+                } finally {
+                    loading.close();
+                }
+            } catch (error) {
+                // 如果是用户取消，不显示错误
+                if (error === 'cancel' || error.message === 'cancel') {
+                    return;
+                }
+                console.error('重打小票失败:', error);
+                ElMessage.error(`重打小票失败: ${error.message || error}`);
+            }
+        };
+        
+        // 页面加载时初始化
+        onMounted(() => {
+            // 检查登录状态
+            const token = sessionStorage.getItem('token');
+            if (!token) {
+                window.location.href = '/login';
+                return;
+            }
+            
+            // 检查token是否过期
+            try {
+                const payload = JSON.parse(atob(token.split('.')[1]));
+                const exp = payload.exp * 1000; // 转换为毫秒
+                
+                // 检查token是否过期
+                if (Date.now() >= exp) {
+                    sessionStorage.removeItem('token');
+                    sessionStorage.removeItem('user');
+                    window.location.href = '/login';
+                    return;
+                }
+                
+                // 检查是否跨日期（比较当前日期和token创建日期）
+                const tokenDate = new Date(exp).toDateString();
+                const currentDate = new Date().toDateString();
+                if (tokenDate !== currentDate) {
+                    sessionStorage.removeItem('token');
+                    sessionStorage.removeItem('user');
+                    window.location.href = '/login';
+                    return;
+                }
+                
+                // 设置定时器，每5分钟检查一次token状态
+                setInterval(() => {
+                    const currentToken = sessionStorage.getItem('token');
+                    if (!currentToken) return;
+                    
+                    try {
+                        const currentPayload = JSON.parse(atob(currentToken.split('.')[1]));
+                        const currentExp = currentPayload.exp * 1000;
+                        
+                        // 检查token是否过期
+                        if (Date.now() >= currentExp) {
+                            sessionStorage.removeItem('token');
+                            sessionStorage.removeItem('user');
+                            window.location.href = '/login';
+                            return;
+                        }
+                        
+                        // 检查是否跨日期
+                        const currentTokenDate = new Date(currentExp).toDateString();
+                        const nowDate = new Date().toDateString();
+                        if (currentTokenDate !== nowDate) {
+                            sessionStorage.removeItem('token');
+                            sessionStorage.removeItem('user');
+                            window.location.href = '/login';
+                        }
+                    } catch (e) {
+                        console.error('Token检查失败:', e);
+                    }
+                }, 5 * 60 * 1000); // 5分钟检查一次
+                
+            } catch (e) {
+                console.error('Token解析失败:', e);
+                sessionStorage.removeItem('token');
+                sessionStorage.removeItem('user');
+                window.location.href = '/login';
+                return;
+            }
+            
+            // 初始化日历控件
+            layui.use('laydate', function(){
+                const laydate = layui.laydate;
+                
+                // 日期时间选择器已移除，不再需要初始化
+                
+                // 初始化订单查询页面的日期选择器
+                // 开始时间选择器
+                laydate.render({
+                    elem: '#startTime',
+                    type: 'datetime',
+                    format: 'yyyy-MM-dd HH:mm',
+                    max: 0, // 最大可选时间为当前时间
+                    done: function(value, date){
+                        // 验证日期范围
+                        validateDateRange();
+                    }
+                });
+                
+                // 结束时间选择器
+                laydate.render({
+                    elem: '#endTime',
+                    type: 'datetime',
+                    format: 'yyyy-MM-dd HH:mm',
+                    max: 0, // 最大可选时间为当前时间
+                    done: function(value, date){
+                        // 验证日期范围
+                        validateDateRange();
+                    }
+                });
+            });
+            
+            // 自定义月份年份控制器的函数
+            function customizeMonthYearControls(instance) {
+                // 获取月份年份容器
+                const monthContainer = instance.calendarContainer.querySelector('.flatpickr-current-month');
+                if (!monthContainer) return;
+                
+                // 获取当前显示的年月
+                const currentMonth = instance.currentMonth;
+                const currentYear = instance.currentYear;
+                
+                // 创建自定义控制器
+                const customControls = document.createElement('div');
+                customControls.className = 'custom-month-year-controls';
+                customControls.style.cssText = `
+                    display: flex;
+                    align-items: center;
+                    justify-content: flex-start;
+                    width: 100%;
+                    padding: 0 5px;
+                    margin-top: 2px;
+                    gap: 10px;
+                `;
+                
+                // 月份控制区域
+                const monthControls = document.createElement('div');
+                monthControls.className = 'month-controls';
+                monthControls.style.cssText = `
+                    display: flex;
+                    align-items: center;
+                    gap: 3px;
+                `;
+                
+                // 月份减按钮
+                const monthPrevBtn = document.createElement('button');
+                monthPrevBtn.innerHTML = '<';
+                monthPrevBtn.className = 'month-nav-btn prev-month';
+                monthPrevBtn.style.cssText = `
+                    width: 24px;
+                    height: 24px;
+                    border: none;
+                    background: #409eff;
+                    color: white;
+                    border-radius: 4px;
+                    cursor: pointer;
+                    font-weight: bold;
+                    display: flex;
+                    align-items: center;
+                    justify-content: center;
+                    font-size: 14px;
+                `;
+                monthPrevBtn.addEventListener('click', (e) => {
+                    e.preventDefault();
+                    e.stopPropagation();
+                    instance.changeMonth(-1);
+                    // 强制更新日历视图
+                    instance.redraw();
+                    updateMonthYearDisplay();
+                });
+                
+                // 月份显示
+                const monthDisplay = document.createElement('span');
+                monthDisplay.className = 'month-display';
+                monthDisplay.style.cssText = `
+                    font-weight: bold;
+                    min-width: 40px;
+                    text-align: center;
+                    color: #303133;
+                    font-size: 14px;
+                `;
+                
+                // 月份加按钮
+                const monthNextBtn = document.createElement('button');
+                monthNextBtn.innerHTML = '>';
+                monthNextBtn.className = 'month-nav-btn next-month';
+                monthNextBtn.style.cssText = `
+                    width: 24px;
+                    height: 24px;
+                    border: none;
+                    background: #409eff;
+                    color: white;
+                    border-radius: 4px;
+                    cursor: pointer;
+                    font-weight: bold;
+                    display: flex;
+                    align-items: center;
+                    justify-content: center;
+                    font-size: 14px;
+                `;
+                monthNextBtn.addEventListener('click', (e) => {
+                    e.preventDefault();
+                    e.stopPropagation();
+                    instance.changeMonth(1);
+                    // 强制更新日历视图
+                    instance.redraw();
+                    updateMonthYearDisplay();
+                });
+                
+                // 年份控制区域
+                const yearControls = document.createElement('div');
+                yearControls.className = 'year-controls';
+                yearControls.style.cssText = `
+                    display: flex;
+                    align-items: center;
+                    gap: 3px;
+                `;
+                
+                // 年份减按钮
+                const yearPrevBtn = document.createElement('button');
+                yearPrevBtn.innerHTML = '<';
+                yearPrevBtn.className = 'year-nav-btn prev-year';
+                yearPrevBtn.style.cssText = `
+                    width: 24px;
+                    height: 24px;
+                    border: none;
+                    background: #409eff;
+                    color: white;
+                    border-radius: 4px;
+                    cursor: pointer;
+                    font-weight: bold;
+                    display: flex;
+                    align-items: center;
+                    justify-content: center;
+                    font-size: 14px;
+                `;
+                yearPrevBtn.addEventListener('click', (e) => {
+                    e.preventDefault();
+                    e.stopPropagation();
+                    instance.changeYear(-1);
+                    // 强制更新日历视图
+                    instance.redraw();
+                    updateMonthYearDisplay();
+                });
+                
+                // 年份显示
+                const yearDisplay = document.createElement('span');
+                yearDisplay.className = 'year-display';
+                yearDisplay.style.cssText = `
+                    font-weight: bold;
+                    min-width: 50px;
+                    text-align: center;
+                    color: #303133;
+                    font-size: 14px;
+                `;
+                
+                // 年份加按钮
+                const yearNextBtn = document.createElement('button');
+                yearNextBtn.innerHTML = '>';
+                yearNextBtn.className = 'year-nav-btn next-year';
+                yearNextBtn.style.cssText = `
+                    width: 24px;
+                    height: 24px;
+                    border: none;
+                    background: #409eff;
+                    color: white;
+                    border-radius: 4px;
+                    cursor: pointer;
+                    font-weight: bold;
+                    display: flex;
+                    align-items: center;
+                    justify-content: center;
+                    font-size: 14px;
+                `;
+                yearNextBtn.addEventListener('click', (e) => {
+                    e.preventDefault();
+                    e.stopPropagation();
+                    instance.changeYear(1);
+                    // 强制更新日历视图
+                    instance.redraw();
+                    updateMonthYearDisplay();
+                });
+                
+                // 更新显示函数
+                function updateMonthYearDisplay() {
+                    const monthNames = ["1月", "2月", "3月", "4月", "5月", "6月", 
+                                       "7月", "8月", "9月", "10月", "11月", "12月"];
+                    monthDisplay.textContent = monthNames[instance.currentMonth];
+                    yearDisplay.textContent = instance.currentYear + '年';
+                }
+                
+                // 初始化显示
+                updateMonthYearDisplay();
+                
+                // 组装控件
+                monthControls.appendChild(monthPrevBtn);
+                monthControls.appendChild(monthDisplay);
+                monthControls.appendChild(monthNextBtn);
+                
+                yearControls.appendChild(yearPrevBtn);
+                yearControls.appendChild(yearDisplay);
+                yearControls.appendChild(yearNextBtn);
+                
+                customControls.appendChild(monthControls);
+                
+                // 添加分隔符
+                const separator = document.createElement('div');
+                separator.style.cssText = `
+                    width: 1px;
+                    height: 24px;
+                    background: #dcdfe6;
+                    margin: 0 8px;
+                `;
+                customControls.appendChild(separator);
+                
+                customControls.appendChild(yearControls);
+                
+                // 替换原有的月份年份显示
+                monthContainer.innerHTML = '';
+                monthContainer.appendChild(customControls);
+                
+                // 监听月份年份变化
+                instance.calendarContainer.addEventListener('monthChange', updateMonthYearDisplay);
+                instance.calendarContainer.addEventListener('yearChange', updateMonthYearDisplay);
+            }
+            
+            // 添加确定和取消按钮的函数
+            function addCalendarButtons(instance) {
+                // 检查是否已经添加过按钮
+                if (instance.calendarContainer.querySelector('.flatpickr-custom-buttons')) {
+                    return;
+                }
+                
+                // 创建按钮容器
+                const buttonContainer = document.createElement('div');
+                buttonContainer.className = 'flatpickr-custom-buttons';
+                buttonContainer.style.cssText = `
+                    display: flex;
+                    justify-content: flex-end;
+                    gap: 10px;
+                    padding: 10px 15px;
+                    border-top: 1px solid rgba(64, 158, 255, 0.1);
+                    background: rgba(64, 158, 255, 0.05);
+                    border-radius: 0 0 20px 20px;
+                `;
+                
+                // 创建取消按钮
+                const cancelButton = document.createElement('button');
+                cancelButton.textContent = '取消';
+                cancelButton.className = 'flatpickr-button flatpickr-cancel';
+                cancelButton.style.cssText = `
+                    padding: 6px 16px;
+                    border: 1px solid #dcdfe6;
+                    border-radius: 4px;
+                    background: #ffffff;
+                    color: #606266;
+                    font-size: 14px;
+                    cursor: pointer;
+                    transition: all 0.3s ease;
+                `;
+                cancelButton.addEventListener('click', function() {
+                    instance.close();
+                });
+                
+                // 创建确定按钮
+                const confirmButton = document.createElement('button');
+                confirmButton.textContent = '确定';
+                confirmButton.className = 'flatpickr-button flatpickr-confirm';
+                confirmButton.style.cssText = `
+                    padding: 6px 16px;
+                    border: 1px solid #409eff;
+                    border-radius: 4px;
+                    background: #409eff;
+                    color: #ffffff;
+                    font-size: 14px;
+                    cursor: pointer;
+                    transition: all 0.3s ease;
+                `;
+                confirmButton.addEventListener('click', function() {
+                    if (instance.selectedDates.length > 0) {
+                        // 格式化选中的日期时间
+                        const selectedDate = instance.selectedDates[0];
+                        const year = selectedDate.getFullYear();
+                        const month = String(selectedDate.getMonth() + 1).padStart(2, '0');
+                        const day = String(selectedDate.getDate()).padStart(2, '0');
+                        const hours = String(selectedDate.getHours()).padStart(2, '0');
+                        const minutes = String(selectedDate.getMinutes()).padStart(2, '0');
+                        const formattedDate = `${year}-${month}-${day} ${hours}:${minutes}`;
+                        
+                        // 更新Vue实例中的值
+                        chargeDateTime.value = formattedDate;
+                        // 更新输入框显示
+                        instance.input.value = formattedDate;
+                    }
+                    instance.close();
+                });
+                
+                // 添加按钮到容器
+                buttonContainer.appendChild(cancelButton);
+                buttonContainer.appendChild(confirmButton);
+                
+                // 将按钮容器添加到日历面板
+                instance.calendarContainer.appendChild(buttonContainer);
+            }
+            
+            // 自定义时间选择器，加宽显示框，去掉调节按钮
+            function customizeTimeControls(instance) {
+                // 查找时间选择器容器
+                const timeContainer = instance.calendarContainer.querySelector('.flatpickr-time');
+                if (!timeContainer) return;
+                
+                // 调整时间容器宽度，确保有足够空间
+                timeContainer.style.width = '200px';
+                timeContainer.style.padding = '10px 5px';
+                
+                // 查找分钟输入框
+                const minuteInput = timeContainer.querySelector('.flatpickr-minute');
+                if (!minuteInput) return;
+                
+                // 调整分钟输入框的宽度，去掉调节按钮
+                minuteInput.style.width = '60px';
+                minuteInput.style.paddingRight = '5px';
+                
+                // 查找小时输入框并调整宽度
+                const hourInput = timeContainer.querySelector('.flatpickr-hour');
+                if (hourInput) {
+                    hourInput.style.width = '60px';
+                }
+                
+                // 查找并移除可能存在的自定义分钟控制器
+                const existingControls = timeContainer.querySelector('.custom-minute-controls');
+                if (existingControls) {
+                    existingControls.remove();
+                }
+            }
+            
+            // 使用 Promise 方式，避免 await 语法问题
+            Promise.all([
+                loadBuildings(),
+                loadFeePrices(),
+                loadRecentOrders(),
+                loadQueryBuildings()
+            ]).then(() => {
+                console.log('页面初始化完成');
+                connectOrderStream();
+            }).catch((error) => {
+                console.error('页面初始化失败:', error);
+                ElMessage.error('页面加载失败，请刷新重试或联系管理员');
+            });
+        });
+
+const debugPrices = () => {
+    console.log('获取单价:', communityPrices.value);
+    
+    // 你指定的HTML结构（完全不变）
+    const info = `<div style="line-height: 1.8; font-size: 14px;"> <strong style="font-size: 15px; color: #1989fa;">当前收费标准</strong> <hr style="border: none; border-top: 1px solid #eee; margin: 10px 0;"> <div style="margin: 8px 0;"><span style="display: inline-block; width: 80px;">电费：</span><strong>0.85</strong> 元/度</div> <div style="margin: 8px 0;"><span style="display: inline-block; width: 80px;">冷水费：</span><strong>6</strong> 元/吨</div> <div style="margin: 8px 0;"><span style="display: inline-block; width: 80px;">热水费：</span><strong>43.5</strong> 元/吨</div> <div style="margin: 8px 0;"><span style="display: inline-block; width: 80px;">网费：</span><strong>50</strong> 元/月</div> <div style="margin: 8px 0;"><span style="display: inline-block; width: 80px;">停车费：</span><strong>130</strong> 元/月</div> <div style="margin: 8px 0;"><span style="display: inline-block; width: 80px;">房租：</span><strong>800</strong> 元/月</div> <div style="margin: 8px 0;"><span style="display: inline-block; width: 80px;">管理费：</span><strong>100</strong> 元/月</div> </div>`;
+
+    // 关键：添加 dangerouslyUseHTMLString: true 解析HTML
+    ElMessageBox.alert(info, '收费标准信息', {
+        confirmButtonText: '确定',
+        width: '400px',
+        dangerouslyUseHTMLString: true // 核心配置：允许解析HTML内容
+    });
+};
+        
+        // 初始化停车费日期选择器
+        const initParkingDatePickers = () => {
+            // 等待DOM更新后初始化
+            nextTick(() => {
+                console.log('开始初始化停车费日期选择器...');
+                
+                // 确保flatpickr已加载
+                if (typeof flatpickr === 'undefined') {
+                    console.error('flatpickr未加载');
+                    return;
+                }
+                
+                console.log('flatpickr已加载:', typeof flatpickr);
+                
+                // 检查DOM元素是否存在
+                const startInput = document.getElementById('parkingStartDatePicker');
+                const endInput = document.getElementById('parkingEndDatePicker');
+                
+                console.log('开始日期输入框:', startInput);
+                console.log('结束日期输入框:', endInput);
+                
+                if (!startInput || !endInput) {
+                    console.error('停车费日期输入框未找到');
+                    return;
+                }
+                
+                // 检查是否已经初始化过
+                if (startInput._flatpickr || endInput._flatpickr) {
+                    console.log('停车费日期选择器已初始化，跳过重新初始化');
+                    console.log('开始日期flatpickr实例:', startInput._flatpickr);
+                    console.log('结束日期flatpickr实例:', endInput._flatpickr);
+                    
+                    // 测试手动点击事件
+                    startInput.addEventListener('click', function() {
+                        console.log('开始日期输入框被点击');
+                        if (startInput._flatpickr) {
+                            console.log('尝试打开flatpickr日历');
+                            startInput._flatpickr.open();
+                        }
+                    });
+                    
+                    endInput.addEventListener('click', function() {
+                        console.log('结束日期输入框被点击');
+                        if (endInput._flatpickr) {
+                            console.log('尝试打开flatpickr日历');
+                            endInput._flatpickr.open();
+                        }
+                    });
+                    
+                    return;
+                }
+                
+                console.log('开始初始化flatpickr实例...');
+                
+                // 添加手动点击事件测试
+                startInput.addEventListener('click', function() {
+                    console.log('开始日期输入框被点击（初始化前）');
+                });
+                
+                endInput.addEventListener('click', function() {
+                    console.log('结束日期输入框被点击（初始化前）');
+                });
+                
+                // 初始化开始日期选择器 - 使用相对位置跟随输入框
+                const startPicker = flatpickr('#parkingStartDatePicker', {
+                    dateFormat: 'Y/m/d',
+                    locale: 'zh',
+                    position: 'below', // 显示在输入框下方
+                    appendTo: startInput.parentNode, // 附加到输入框的父元素
+                    onChange: function(selectedDates, dateStr, instance) {
+                        // 使用专门的处理函数
+                        handleParkingStartDateChange(dateStr);
+                    }
+                });
+                
+                console.log('开始日期选择器初始化完成:', startPicker);
+                
+                // 初始化结束日期选择器 - 使用相对位置跟随输入框
+                const endPicker = flatpickr('#parkingEndDatePicker', {
+                    dateFormat: 'Y/m/d',
+                    locale: 'zh',
+                    position: 'below', // 显示在输入框下方
+                    appendTo: endInput.parentNode, // 附加到输入框的父元素
+                    onChange: function(selectedDates, dateStr, instance) {
+                        // 使用专门的处理函数
+                        handleParkingEndDateChange(dateStr);
+                    }
+                });
+                
+                console.log('结束日期选择器初始化完成:', endPicker);
+            });
+        };
+        
+        // 监听停车费项目的添加，初始化日期选择器
+        watch(() => feeItems.value.some(item => item.type === 'parking'), (hasParking) => {
+            if (hasParking) {
+                nextTick(() => {
+                    initParkingDatePickers();
+                });
+            }
+        });
+        
+        // 监听停车费项目的数据变化，更新日期选择器值
+        watch(() => getParkingItem(), (parkingItem) => {
+            if (parkingItem) {
+                nextTick(() => {
+                    // 更新输入框的值
+                    const startInput = document.getElementById('parkingStartDatePicker');
+                    const endInput = document.getElementById('parkingEndDatePicker');
+                    if (startInput) {
+                        // 确保显示格式为 yyyy/MM/dd
+                        startInput.value = parkingItem.startDate ? parkingItem.startDate.replace(/-/g, '/') : '';
+                    }
+                    if (endInput) {
+                        // 确保显示格式为 yyyy/MM/dd
+                        endInput.value = parkingItem.endDate ? parkingItem.endDate.replace(/-/g, '/') : '';
+                    }
+                });
+            }
+        }, { deep: true });
+
+        // 订单查询功能相关变量
+        const queryBuilding = ref('');
+        const queryRoomId = ref('');
+        const queryBuildings = ref([]);
+        const queryRooms = ref([]);
+        const queryData = ref([]);
+        const queryLoading = ref(false);
+        const queryPagination = ref({
+            page: 1,
+            per_page: 10,
+            total: 0,
+            pages: 0
+        });
+        const sortColumn = ref('');
+        const sortOrder = ref('desc');
+        const hasQueried = ref(false);
+        const currentPageTotal = ref(0);
+        const dateError = ref('');
+
+        // 初始化订单查询的楼栋列表
+        const loadQueryBuildings = async () => {
+            try {
+                const token = sessionStorage.getItem('token');
+                const response = await fetch('/api/addresses?step=buildings', {
+                    headers: {
+                        'Authorization': `Bearer ${token}`
+                    }
+                });
+                
+                const result = await response.json();
+                if (result.status === 'success') {
+                    queryBuildings.value = result.data;
+                } else {
+                    ElMessage.error('加载楼栋列表失败');
+                }
+            } catch (error) {
+                console.error('加载楼栋列表失败:', error);
+                ElMessage.error('网络请求失败');
+            }
+        };
+
+        // 订单查询的楼栋改变事件
+        const onQueryBuildingChange = async (building) => {
+            queryBuilding.value = building;
+            queryRoomId.value = '';
+            queryRooms.value = [];
+            
+            if (building) {
+                try {
+                    const token = sessionStorage.getItem('token');
+                    const response = await fetch(`/api/addresses?step=rooms&building=${encodeURIComponent(building)}`, {
+                        headers: {
+                            'Authorization': `Bearer ${token}`
+                        }
+                    });
+                    
+                    const result = await response.json();
+                    if (result.status === 'success') {
+                        queryRooms.value = result.data;
+                    } else {
+                        ElMessage.error('加载房间列表失败');
+                    }
+                } catch (error) {
+                    console.error('加载房间列表失败:', error);
+                    ElMessage.error('网络请求失败');
+                }
+            }
+        };
+
+        // 订单查询的房间改变事件
+        const onQueryRoomChange = (roomId) => {
+            queryRoomId.value = roomId;
+        };
+
+        // 验证日期范围
+        const validateDateRange = () => {
+            const startTime = document.getElementById('startTime').value;
+            const endTime = document.getElementById('endTime').value;
+            
+            if (startTime && endTime) {
+                const start = new Date(startTime);
+                const end = new Date(endTime);
+                
+                if (start > end) {
+                    dateError.value = '开始时间不能晚于结束时间';
+                    return false;
+                }
+            }
+            
+            dateError.value = '';
+            return true;
+        };
+
+        // 查询订单
+        const queryOrders = async () => {
+            if (!validateDateRange()) {
+                return;
+            }
+            
+            queryLoading.value = true;
+            hasQueried.value = true;
+            
+            try {
+                const token = sessionStorage.getItem('token');
+                const params = new URLSearchParams();
+                
+                // 添加查询参数 - 修正参数名称以匹配后端API
+                const startTime = document.getElementById('startTime').value;
+                const endTime = document.getElementById('endTime').value;
+                
+                if (startTime) params.append('startDate', startTime);
+                if (endTime) params.append('endDate', endTime);
+                if (queryRoomId.value) params.append('addressId', queryRoomId.value);
+                params.append('page', queryPagination.value.page);
+                params.append('per_page', queryPagination.value.per_page);
+                
+                // 添加排序参数
+                if (sortColumn.value) {
+                    params.append('sort', sortColumn.value);
+                    params.append('order', sortOrder.value);
+                }
+                
+                // 修正API端点路径
+                const response = await fetch(`/api/orders?${params.toString()}`, {
+                    headers: {
+                        'Authorization': `Bearer ${token}`
+                    }
+                });
+                
+                const result = await response.json();
+                if (result.status === 'success') {
+                    // 处理返回的数据以匹配前端表格显示格式
+                    const processedData = result.data.map(order => {
+                        // 构建费用项目字符串
+                        const feeItems = [];
+                        
+                        if (order.电费金额 && parseFloat(order.电费金额) > 0) {
+                            const degree = parseFloat(order.电费度数) || 0;
+                            const amount = parseFloat(order.电费金额) || 0;
+                            feeItems.push(`电费 | ${degree}度 | ¥${amount.toFixed(2)}`);
+                        }
+                        
+                        if (order.冷水金额 && parseFloat(order.冷水金额) > 0) {
+                            const ton = parseFloat(order.冷水吨数) || 0;
+                            const amount = parseFloat(order.冷水金额) || 0;
+                            feeItems.push(`冷水费 | ${ton}吨 | ¥${amount.toFixed(2)}`);
+                        }
+                        
+                        if (order.热水金额 && parseFloat(order.热水金额) > 0) {
+                            const ton = parseFloat(order.热水吨数) || 0;
+                            const amount = parseFloat(order.热水金额) || 0;
+                            feeItems.push(`热水费 | ${ton}吨 | ¥${amount.toFixed(2)}`);
+                        }
+                        
+                        if (order.网费金额 && parseFloat(order.网费金额) > 0) {
+                            const month = parseInt(order.网费月数) || 0;
+                            const amount = parseFloat(order.网费金额) || 0;
+                            feeItems.push(`网费 | ${month}月 | ¥${amount.toFixed(2)}`);
+                        }
+                        
+                        if (order.停车费金额 && parseFloat(order.停车费金额) > 0) {
+                            const month = parseInt(order.停车费月数) || 0;
+                            const amount = parseFloat(order.停车费金额) || 0;
+                            const carPlate = order.车牌号 || '';
+                            const startDate = order.停车开始日期 ? new Date(order.停车开始日期).toLocaleDateString('zh-CN') : '';
+                            const endDate = order.停车结束日期 ? new Date(order.停车结束日期).toLocaleDateString('zh-CN') : '';
+                            const dateRange = startDate && endDate ? `${startDate}-${endDate}` : '';
+                            
+                            feeItems.push(`停车费 | ${month}月 | ¥${amount.toFixed(2)} | ${dateRange} | ${carPlate}`);
+                        }
+                        // 房租（新增）
+                        if (order.rent && parseFloat(order.rent.amount) > 0) {
+                            const month = parseInt(order.rent.month) || 0;
+                            const amount = parseFloat(order.rent.amount) || 0;
+                            feeItems.push(`房租 | ${month}月 | ¥${amount.toFixed(2)}`);
+                        }
+                        
+                        // 管理费（新增）
+                        if (order.management && parseFloat(order.management.amount) > 0) {
+                            const month = parseInt(order.management.month) || 0;
+                            const amount = parseFloat(order.management.amount) || 0;
+                            feeItems.push(`管理费 | ${month}月 | ¥${amount.toFixed(2)}`);
+                        }
+
+
+
+
+
+                        
+                        return {
+                            orderId: order.订单ID,
+                            billNumber: order.账单号,
+                            residentName: order.地址?.姓名 || '',
+                            residentPhone: order.地址?.手机号 || '',
+                            building: order.地址?.楼栋号 || '',
+                            room: order.地址?.房间号 || '',
+                            feeItems: feeItems.join('\n'),
+                            totalAmount: parseFloat(order.收款金额) || 0,
+                            paymentMethod: order.收款方式 || '',
+                            entryTime: order.录入时间,
+                            remark: order.备注 || ''
+                        };
+                    });
+                    
+                    queryData.value = processedData;
+                    queryPagination.value = result.pagination;
+                    
+                    // 计算当前页合计金额
+                    currentPageTotal.value = processedData.reduce((sum, order) => sum + order.totalAmount, 0);
+                } else {
+                    ElMessage.error(result.message || '查询订单失败');
+                    queryData.value = [];
+                    queryPagination.value.total = 0;
+                    currentPageTotal.value = 0;
+                }
+            } catch (error) {
+                console.error('查询订单失败:', error);
+                ElMessage.error('网络请求失败');
+                queryData.value = [];
+                queryPagination.value.total = 0;
+                currentPageTotal.value = 0;
+            } finally {
+                queryLoading.value = false;
+            }
+        };
+
+        // 重置查询条件
+        const resetQuery = () => {
+            queryBuilding.value = '';
+            queryRoomId.value = '';
+            queryRooms.value = [];
+            queryData.value = [];
+            queryPagination.value = {
+                page: 1,
+                per_page: 10,
+                total: 0,
+                pages: 0
+            };
+            sortColumn.value = '';
+            sortOrder.value = 'desc';
+            hasQueried.value = false;
+            currentPageTotal.value = 0;
+            dateError.value = '';
+            
+            // 清空日期输入框
+            document.getElementById('startTime').value = '';
+            document.getElementById('endTime').value = '';
+        };
+
+        // 表格排序
+        const sortByColumn = (column) => {
+            if (sortColumn.value === column) {
+                sortOrder.value = sortOrder.value === 'asc' ? 'desc' : 'asc';
+            } else {
+                sortColumn.value = column;
+                sortOrder.value = 'asc';
+            }
+            
+            // 重新查询
+            if (hasQueried.value) {
+                queryOrders();
+            }
+        };
+
+        // 分页大小改变
+        const handleSizeChange = (size) => {
+            queryPagination.value.per_page = size;
+            queryPagination.value.page = 1;
+            if (hasQueried.value) {
+                queryOrders();
+            }
+        };
+
+        // 当前页改变
+        const handleCurrentChange = (page) => {
+            queryPagination.value.page = page;
+            if (hasQueried.value) {
+                queryOrders();
+            }
+        };
+
+        // 显示订单详情
+        const showOrderDetail = (order) => {
+            let detailInfo = `订单号：${order.orderId}\n`;
+            detailInfo += `客户信息：${order.residentName || '-'} ${order.residentPhone || '-'}\n`;
+            detailInfo += `地址：${order.building || '-'}-${order.room || '-'}\n`;
+            detailInfo += `收费金额：¥${formatPrice(order.totalAmount)}\n`;
+            detailInfo += `收费日期：${formatDate(order.entryTime)}\n`;
+            detailInfo += `收费项目：\n${formatFeeItems(order.feeItems)}`;
+            
+            if (order.remark) {
+                detailInfo += `\n备注：${order.remark}`;
+            }
+            
+            ElMessageBox.alert(detailInfo, '订单详情', {
+                confirmButtonText: '确定',
+                type: 'info'
+            });
+        };
+
+        // 复制订单号
+        const copyOrderId = async (orderId) => {
+            try {
+                await navigator.clipboard.writeText(orderId);
+                // 显示自定义成功提示
+                showCopySuccess('订单号已复制到剪贴板');
+            } catch (error) {
+                // 降级方案
+                const textArea = document.createElement('textarea');
+                textArea.value = orderId;
+                document.body.appendChild(textArea);
+                textArea.select();
+                document.execCommand('copy');
+                document.body.removeChild(textArea);
+                // 显示自定义成功提示
+                showCopySuccess('订单号已复制到剪贴板');
+            }
+        };
+
+        // 显示复制成功提示
+        const showCopySuccess = (message) => {
+            // 移除已存在的提示
+            const existingTooltip = document.querySelector('.copy-success-tooltip');
+            if (existingTooltip) {
+                existingTooltip.remove();
+            }
+            
+            // 创建新的提示元素
+            const tooltip = document.createElement('div');
+            tooltip.className = 'copy-success-tooltip';
+            tooltip.textContent = message;
+            document.body.appendChild(tooltip);
+            
+            // 2秒后自动移除
+            setTimeout(() => {
+                if (tooltip.parentNode) {
+                    tooltip.parentNode.removeChild(tooltip);
+                }
+            }, 2000);
+        };
+
+        // 格式化费用项目显示
+        const formatFeeItems = (feeItems) => {
+            if (!feeItems) return '-';
+            
+            // 如果是字符串，按换行符分割
+            if (typeof feeItems === 'string') {
+                return feeItems.split('\n').join('<br>');
+            }
+            
+            // 如果是数组，拼接显示
+            if (Array.isArray(feeItems)) {
+                return feeItems.map(item => {
+                    if (typeof item === 'object') {
+                        return `${item.name || ''} | ${item.quantity || ''}${item.unit || ''} | ¥${formatPrice(item.amount || 0)}`;
+                    }
+                    return String(item);
+                }).join('<br>');
+            }
+            
+            return String(feeItems);
+        };
+
+        // 返回所有需要的变量和函数
+        return {
+            user,
+            currentPage,
+            buildings,
+            rooms,
+            selectedBuilding,
+            selectedRoomId,
+            feeItems,
+            paymentMethod,
+            remark,
+            generating,
+            residentName,
+            residentPhone,
+            phoneError,
+            totalAmount,
+            canGenerate,
+            buttonDisabled,
+            canDeleteOrder,
+            todayUserOrders,
+            recentOrders,
+            todayTotalAmount,
+            receiptData,
+            // 退费模式相关
+            isRefundMode,
+            onRefundModeChange,
+            validatePhone,
+            onBuildingChange,
+            onRoomChange,
+            addFeeItem,
+            updateItemAmount,
+            updateItemQuantityFromAmount,
+            removeFeeItem,
+            handleQuantityChange,
+            handleParkingQuantityChange,
+            selectPaymentMethod,
+            generateBill,
+            clearForm,
+            logout,
+            debugPrices,
+            loadFeePrices,
+            formatPrice,
+            formatDate,
+            getParkingItem,
+            saveParkingDetails,
+            updateParkingEndDate,
+            handleParkingStartDateChange,
+            getFeeTypeName,
+            getFeeUnit,
+            goToFeePricesAdmin,
+            communityPrices,
+            reprintReceipt,
+            deleteOrder,
+            handleRedReverse,
+            historyExpanded,
+            historyLoading,
+            userHistoryOrders,
+            toggleHistory,
+            loadUserPaymentHistory,
+            // 订单查询相关
+            queryBuilding,
+            queryRoomId,
+            queryBuildings,
+            queryRooms,
+            queryData,
+            queryLoading,
+            queryPagination,
+            sortColumn,
+            sortOrder,
+            hasQueried,
+            currentPageTotal,
+            dateError,
+            loadQueryBuildings,
+            onQueryBuildingChange,
+            onQueryRoomChange,
+            validateDateRange,
+            queryOrders,
+            resetQuery,
+            sortByColumn,
+            handleSizeChange,
+            handleCurrentChange,
+            showOrderDetail,
+            copyOrderId,
+            formatFeeItems
+        };
+    }
+});
+
+// 使用ElementPlus并挂载应用
+app.use(ElementPlus).mount('#app');
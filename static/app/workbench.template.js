@@ -0,0 +1,586 @@
+/**
+ * 公寓物业收费系统 - 收费工作台 Vue 模板
+ * 原 templates/index.html 中 #app 内的页面结构，插值分隔符为 [[ ]]
+ * 注意：这是 JS 模板字符串，模板表达式里的反斜杠需写成 \\
+ */
+window.WORKBENCH_TEMPLATE = `
+<div class="app-container">
+    <!-- 侧边栏 -->
+    <div class="sidebar">
+        <div class="sidebar-header">
+            <div class="sidebar-title">物业收费系统</div>
+            <div class="user-info">
+                [[ user.real_name ]] <br> <!-- 使用真实姓名 -->
+                [[ user.community ]] <!-- 所属小区 -->
+                <span v-if="user.role" style="display: block; font-size: 11px; color: #aaa; margin-top: 2px;">
+                    [[ user.role ]] <!-- 显示用户角色 -->
+                </span>
+            </div>
+        </div>
+        <ul class="nav-menu">
+            <li class="nav-item active" @click="currentPage = 'workbench'">
+                <i class="el-icon-s-home"></i> 收费工作台
+            </li>
+            <li class="nav-item" @click="currentPage = 'query'">
+                <i class="el-icon-search"></i> 订单查询
+            </li>
+
+            <!-- 在侧边栏的导航菜单中添加 -->
+            <li class="nav-item" @click="debugPrices" >
+                <i class="el-icon-info"></i> 收费标准管理
+            </li>
+
+            <li class="nav-item" @click="logout">
+                <i class="el-icon-switch-button"></i> 退出登录
+            </li>
+        </ul>
+    </div>
+    
+    <!-- 主内容区 -->
+    <div class="main-content">
+        <div class="content-wrapper">
+            <!-- 收费工作台页面 -->
+            <div v-if="currentPage === 'workbench'">
+                <div class="header">
+                    <div class="header-title">收费工作台</div>
+                </div>
+            
+            <div class="workbench-container">
+                <!-- 地址选择 -->
+                <div class="address-selector">
+                    <div class="section-title">1. 选择地址</div>
+                    
+                    <div class="address-row">
+                        
+                        <!-- 楼栋选择 -->
+                        <div class="address-field">
+                            <div class="field-label">楼栋</div>
+                            <div class="form-control" style="width: 150px;">
+                                <el-select 
+                                    v-model="selectedBuilding" 
+                                    placeholder="请选择" 
+                                    style="width: 100%;"
+                                    @change="onBuildingChange"
+                                    popper-append-to-body="true"
+                                    clearable>
+                                    <el-option
+                                        v-for="building in buildings"
+                                        :key="building"
+                                        :label="building"
+                                        :value="building">
+                                    </el-option>
+                                </el-select>
+                            </div>
+                        </div>
+                        
+                        <!-- 房间选择 -->
+                        <div class="address-field">
+                            <div class="field-label">房间</div>
+                            <div class="form-control" style="width: 150px;">
+                                <el-select 
+                                    v-model="selectedRoomId" 
+                                    :placeholder="selectedBuilding ? '请选择' : '先选楼栋'" 
+                                    style="width: 100%;"
+                                    @change="onRoomChange"
+                                    :disabled="!selectedBuilding"
+                                    popper-append-to-body="true"
+                                    clearable>
+                                    <el-option
+                                        v-for="room in rooms"
+                                        :key="room.id"
+                                        :label="room.room"
+                                        :value="room.id">
+                                    </el-option>
+                                </el-select>
+                            </div>
+                        </div>
+                        
+                        <!-- 姓名输入 -->
+                        <div class="address-field">
+                            <div class="field-label">姓名</div>
+                            <div class="form-control" style="width: 160px;">
+                                <el-input 
+                                    v-model="residentName" 
+                                    placeholder="请输入" 
+                                    style="width: 100%;"
+                                    :maxlength="10"
+                                    show-word-limit>
+                                </el-input>
+                            </div>
+                        </div>
+                        
+                        <!-- 手机号输入 -->
+                        <div class="address-field">
+                            <div class="field-label">手机号</div>
+                            <div class="form-control" style="width: 190px;">
+                                <el-input 
+                                    v-model="residentPhone" 
+                                    placeholder="请输入" 
+                                    style="width: 100%;"
+                                    :maxlength="11"
+                                    @input="validatePhone">
+                                </el-input>
+                            </div>
+                        </div>
+                    </div>
+                    
+                    <!-- 错误提示 -->
+                    <div v-if="phoneError" class="phone-error">
+                        [[ phoneError ]]
+                    </div>
+                    
+                    <!-- 用户历史缴费记录 - 可折叠区块 -->
+                    <div class="user-history-section">
+                        <div class="history-header" @click="toggleHistory">
+                            <span class="history-title">
+                                <span class="collapse-icon">[[ historyExpanded ? '↓' : '→' ]]</span>
+                                此用户历史缴费记录
+                            </span>
+                        </div>
+                        <el-collapse-transition>
+                            <div v-show="historyExpanded" class="history-content">
+                                <!-- 加载状态 -->
+                                <div v-if="historyLoading" class="history-loading">
+                                    <i class="el-icon-loading"></i> 正在加载历史记录...
+                                </div>
+                                <!-- 无记录提示 -->
+                                <div v-else-if="userHistoryOrders.length === 0" class="history-empty">
+                                    暂无历史缴费记录
+                                </div>
+                                <!-- 历史记录表格 -->
+                                <div v-else class="user-history-table-container">
+                                    <table class="user-history-table">
+                                        <thead>
+                                            <tr>
+                                                <th>收费日期</th>
+                                                <th>楼栋</th>
+                                                <th>房间</th>
+                                                <th>收费项目</th>
+                                                <th>金额</th>
+                                                <th>支付方式</th>
+                                                <th>备注</th>
+                                            </tr>
+                                        </thead>
+                                        <tbody>
+                                            <tr v-for="order in userHistoryOrders" :key="order.orderId">
+                                                <td>[[ formatDate(order.entryTime) ]]</td>
+                                                <td>[[ order.building || '-' ]]</td>
+                                                <td>[[ order.room || '-' ]]</td>
+                                                <td class="fee-items-cell">
+                                                    <div v-for="(item, index) in order.feeItems.split('\\n')" :key="index">
+                                                        [[ item ]]
+                                                    </div>
+                                                </td>
+                                                <td style="color: #f56c6c; font-weight: bold;">[[ formatPrice(order.totalAmount) ]]</td>
+                                                <td>[[ order.paymentMethod || '-' ]]</td>
+                                                <td>[[ order.remark ]]</td>
+                                            </tr>
+                                        </tbody>
+                                    </table>
+                                </div>
+                            </div>
+                        </el-collapse-transition>
+                    </div>
+                </div>
+                
+                <!-- 费用项目 -->
+                <div class="fee-section">
+                    <div class="section-title">
+                        2. 添加收费项目
+                        <div class="refund-checkbox" style="display: inline-block; margin-left: 20px;">
+                            <el-checkbox v-model="isRefundMode" @change="onRefundModeChange"><strong style="font-weight: bold; font-size: 18px;">退费</strong></el-checkbox>
+                        </div>
+                    </div>
+                    <div class="fee-buttons">
+                        <el-button 
+                            type="primary" 
+                            size="default" 
+                            @click="addFeeItem('electricity')" 
+                            :disabled="!selectedRoomId || buttonDisabled.electricity"
+                            :title="buttonDisabled.electricity ? '电费已添加或未选择地址' : '添加电费'">
+                            <i class="el-icon-lightning"></i> 添加电费
+                        </el-button>
+                        <el-button 
+                            type="primary" 
+                            size="default" 
+                            @click="addFeeItem('coldWater')" 
+                            :disabled="!selectedRoomId || buttonDisabled.coldWater"
+                            :title="buttonDisabled.coldWater ? '冷水费已添加或未选择地址' : '添加冷水费'">
+                            <i class="el-icon-water-drop"></i> 添加冷水费
+                        </el-button>
+                        <el-button 
+                            type="primary" 
+                            size="default" 
+                            @click="addFeeItem('hotWater')" 
+                            :disabled="!selectedRoomId || buttonDisabled.hotWater"
+                            :title="buttonDisabled.hotWater ? '热水费已添加或未选择地址' : '添加热水费'">
+                            <i class="el-icon-hot-water"></i> 添加热水费
+                        </el-button>
+                        <el-button 
+                            type="primary" 
+                            size="default" 
+                            @click="addFeeItem('network')" 
+                            :disabled="!selectedRoomId || buttonDisabled.network"
+                            :title="buttonDisabled.network ? '网费已添加或未选择地址' : '添加网费'">
+                            <i class="el-icon-monitor"></i> 添加网费
+                        </el-button>
+                        <el-button 
+                            type="primary" 
+                            size="default" 
+                            @click="addFeeItem('parking')" 
+                            :disabled="!selectedRoomId || buttonDisabled.parking"
+                            :title="buttonDisabled.parking ? '停车费已添加或未选择地址' : '添加停车费'">
+                            <i class="el-icon-truck"></i> 添加停车费
+                        </el-button>
+                        <el-button 
+                            type="primary" 
+                            size="default" 
+                            @click="addFeeItem('rent')" 
+                            :disabled="!selectedRoomId || buttonDisabled.rent"
+                            :title="buttonDisabled.rent ? '房租已添加或未选择地址' : '添加房租'">
+                            <i class="el-icon-home"></i> 添加房租
+                        </el-button>
+                        <el-button 
+                            type="primary" 
+                            size="default" 
+                            @click="addFeeItem('management')" 
+                            :disabled="!selectedRoomId || buttonDisabled.management"
+                            :title="buttonDisabled.management ? '管理费已添加或未选择地址' : '添加管理费'">
+                            <i class="el-icon-office-building"></i> 添加管理费
+                        </el-button>
+                    </div>
+                    
+                    <!-- 费用表格 -->
+                    <table class="fee-table" v-if="feeItems.length > 0">
+                        <thead>
+                            <tr>
+                                <th>项目名称</th>
+                                <th>单位</th>
+                                <th>数量</th>
+                                <th>单价（元）</th>
+                                <th>金额（元）</th>
+                                <th>操作</th>
+                            </tr>
+                        </thead>
+                        <tbody>
+                            <tr v-for="(item, index) in feeItems" :key="index" :class="{ 'parking-detail-row': item.type === 'parking' }">
+                                <td>[[ getFeeTypeName(item.type) ]]</td>
+                                <td>[[ getFeeUnit(item.type) ]]</td>
+                                <td>
+                                    <el-input-number
+                                        v-model="item.quantity"
+                                        :min="0"
+                                        :step="item.type === 'network' || item.type === 'parking' || item.type === 'rent' || item.type === 'management' ? 1 : 0.1"
+                                        @change="(value) => handleQuantityChange(index, value)"
+                                        size="small"
+                                        style="width: 100%; max-width: 120px;">
+                                    </el-input-number>
+                                </td>
+                                <td>
+                                    <el-input 
+                                        :value="formatPrice(item.unitPrice)" 
+                                        readonly 
+                                        size="small"
+                                        style="width: 100%; max-width: 120px; text-align: center;">
+                                        <template #append>元</template>
+                                    </el-input>
+                                </td>
+                                <td>
+                                    <el-input 
+                                        v-model="item.amount" 
+                                        @input="updateItemQuantityFromAmount(index)"
+                                        size="small" 
+                                        style="width: 100%; max-width: 120px;">
+                                        <template #append>元</template>
+                                    </el-input>
+                                </td>
+                                <td>
+                                    <div class="fee-item-actions">
+                                        <el-button 
+                                            type="danger" 
+                                            size="small" 
+                                            @click="removeFeeItem(index)" 
+                                            circle
+                                            title="删除此项">
+                                            <i class="el-icon-delete"></i>
+                                        </el-button>
+                                    </div>
+                                </td>
+                            </tr>
+                        </tbody>
+                    </table>
+
+                    <!-- 停车费详情行（如果是停车费，显示额外信息） -->
+                    <div v-if="feeItems.some(item => item.type === 'parking')" class="parking-detail-cell" style="margin-top: 10px; padding: 15px; background-color: #f9f9f9; border-radius: 6px; border: 1px solid #e8e8e8;">
+                        <div style="margin-bottom: 10px; font-size: 14px; font-weight: 500; color: #333;">
+                            <i class="el-icon-truck"></i> 停车费详细信息
+                        </div>
+                        <div class="parking-fields">
+                            <div class="parking-field">
+                                <span class="parking-label">车牌号：</span>
+                                <input 
+                                    type="text" 
+                                    :value="getParkingItem() ? getParkingItem().carPlate : ''" 
+                                    placeholder="请输入车牌号" 
+                                    style="width: 150px; height: 32px; padding: 0 8px; border: 1px solid #dcdfe6; border-radius: 4px; background-color: #ffffff;"
+                                    @input="(event) => { 
+                                        console.log('车牌号输入:', event.target.value); 
+                                        const parkingItem = getParkingItem();
+                                        if (parkingItem) {
+                                            parkingItem.carPlate = event.target.value;
+                                            console.log('更新车牌号:', parkingItem.carPlate);
+                                        }
+                                    }">
+                                </input>
+                            </div>
+                            
+                            <div class="parking-field">
+                                <span class="parking-label">开始日期：</span>
+                                <input 
+                                    type="text" 
+                                    id="parkingStartDatePicker" 
+                                    class="parking-date-input"
+                                    :value="getParkingItem() ? getParkingItem().startDate : ''"
+                                    placeholder="请选择开始日期"
+                                    @input="(event) => { 
+                                        console.log('开始日期输入:', event.target.value); 
+                                        const parkingItem = getParkingItem();
+                                        if (parkingItem) {
+                                            parkingItem.startDate = event.target.value;
+                                            console.log('更新开始日期:', parkingItem.startDate);
+                                        }
+                                    }">
+                            </div>
+                            
+                            <div class="parking-field">
+                                <span class="parking-label">结束日期：</span>
+                                <input 
+                                    type="text" 
+                                    id="parkingEndDatePicker" 
+                                    class="parking-date-input"
+                                    :value="getParkingItem() ? getParkingItem().endDate : ''"
+                                    placeholder="请选择结束日期"
+                                    @input="(event) => { 
+                                        console.log('结束日期输入:', event.target.value); 
+                                        const parkingItem = getParkingItem();
+                                        if (parkingItem) {
+                                            parkingItem.endDate = event.target.value;
+                                            console.log('更新结束日期:', parkingItem.endDate);
+                                        }
+                                    }">
+                            </div>
+                    </div>
+
+                    <!-- 操作提示 -->
+                    <div v-if="feeItems.length > 0" style="margin-top: 10px; color: #999; font-size: 12px;">
+                        <i class="el-icon-info"></i> 
+                        提示：单价由系统根据小区自动加载，可在金额栏直接输入实缴金额，系统自动计算数量
+                    </div>
+                    
+                    <div v-else class="empty-table">
+                        <i class="el-icon-document" style="font-size: 48px; color: #ccc; margin-bottom: 10px;"></i>
+                        <p>暂无收费项目，请点击上方按钮添加</p>
+                    </div>
+                </div>
+                
+                <!-- 汇总信息 -->
+                <div class="summary-section">
+                    <div class="section-title">3. 汇总信息</div>
+                    
+                    <!-- 收款方式 - 可勾选的图标按钮 -->
+                    <div class="summary-row" style="margin-bottom: 20px;">
+                        <span style="font-weight: 500; color: #606266; margin-right: 15px; min-width: 70px;">收款方式：</span>
+                        <div class="payment-options" style="display: flex; gap: 15px; align-items: center;">
+                            <!-- 微信支付 -->
+                            <div class="payment-option" 
+                                 :class="{ 'selected': paymentMethod === '微信' }" 
+                                 @click="selectPaymentMethod('微信')"
+                                 style="cursor: pointer;">
+                                <div class="payment-icon wechat-icon">
+                                    <i class="fab fa-weixin"></i>
+                                </div>
+                                <div class="payment-text">微信</div>
+                                <div class="payment-check" v-if="paymentMethod === '微信'">
+                                    <i class="el-icon-check"></i>
+                                </div>
+                            </div>
+                            
+                            <!-- 支付宝 -->
+                            <div class="payment-option" 
+                                 :class="{ 'selected': paymentMethod === '支付宝' }" 
+                                 @click="selectPaymentMethod('支付宝')"
+                                 style="cursor: pointer;">
+                                <div class="payment-icon alipay-icon">
+                                    <i class="fab fa-alipay"></i>
+                                </div>
+                                <div class="payment-text">支付宝</div>
+                                <div class="payment-check" v-if="paymentMethod === '支付宝'">
+                                    <i class="el-icon-check"></i>
+                                </div>
+                            </div>
+                            
+                            <!-- 现金 -->
+                            <div class="payment-option" 
+                                 :class="{ 'selected': paymentMethod === '现金' }" 
+                                 @click="selectPaymentMethod('现金')"
+                                 style="cursor: pointer;">
+                                <div class="payment-icon cash-icon">
+                                    <i class="fas fa-money-bill-wave"></i>
+                                </div>
+                                <div class="payment-text">现金</div>
+                                <div class="payment-check" v-if="paymentMethod === '现金'">
+                                    <i class="el-icon-check"></i>
+                                </div>
+                            </div>
+                        </div>
+                    </div>
+                    
+                    <!-- 备注 - 靠左排列 -->
+                    <div class="summary-row" style="display: flex; align-items: flex-start;">
+                        <span style="font-weight: 500; color: #606266; margin-right: 15px; min-width: 70px; padding-top: 8px;">备注：</span>
+                        <el-input 
+                            v-model="remark" 
+                            type="textarea" 
+                            placeholder="可填写备注信息" 
+                            :rows="3"
+                            maxlength="200"
+                            show-word-limit
+                            style="flex: 1; max-width: 500px; text-align: left;">
+                        </el-input>
+                    </div>
+                    
+                    <!-- 总计金额 - 靠左 -->
+                    <div class="total-amount" style="text-align: left; margin-top: 20px;">
+                        总计金额：<span style="color: #f56c6c; font-size: 28px;">[[ totalAmount.toFixed(2) ]]</span> 元
+                    </div>
+                </div>
+                
+                <!-- 操作按钮 -->
+                <div class="action-buttons">
+                    <el-button type="primary" size="large" @click="generateBill" :disabled="!canGenerate" :loading="generating">
+                        <i class="el-icon-printer"></i> 收费并打印
+                    </el-button>
+                    <el-button type="info" size="large" @click="clearForm">
+                        清空重填
+                    </el-button>
+                </div>
+            </div>
+
+            <!-- 今日收费记录区块 -->
+            <div class="recent-records-section">
+                <div class="section-title">今日收费记录[[ todayUserOrders.length > 0 ? todayUserOrders.length + '笔' : '' ]]</div>
+                
+                <!-- 今日收费金额合计 -->
+                <div class="today-total">
+                    今日收费金额合计：<span class="amount">[[ formatPrice(todayTotalAmount) ]]</span> 元
+                </div>
+                
+                <!-- 今日收费记录表格容器 -->
+                <div class="recent-records-table-container">
+                    <table class="recent-records-table" v-if="todayUserOrders.length > 0">
+                        <thead>
+                            <tr>
+                                <th>收费日期</th>
+                                <th>楼栋</th>
+                                <th>房号</th>
+                                <th>姓名</th>
+                                <th>电话</th>
+                                <th>收费项目</th>
+                                <th>收费金额</th>
+                                <th>备注</th>
+                                <th>操作</th>
+                            </tr>
+                        </thead>
+                        <tbody>
+                            <tr v-for="order in todayUserOrders" :key="order.orderId">
+                                <td>[[ formatDate(order.entryTime) ]]</td>
+                                <td>[[ order.building || '-' ]]</td>
+                                <td>[[ order.room || '-' ]]</td>
+                                <td>[[ order.residentName || '-' ]]</td>
+                                <td>[[ order.residentPhone || '-' ]]</td>
+                                <td class="fee-items-cell">
+                                    <div v-for="(item, index) in order.feeItems.split('\\n')" :key="index">
+                                        [[ item ]]
+                                    </div>
+                                </td>
+                                <td style="color: #f56c6c; font-weight: bold;">[[ formatPrice(order.totalAmount) ]]</td>
+                                <td>[[ order.remark ]]</td>
+                                <td>
+                                    <div class="action-buttons-cell">
+                                        <el-button 
+                                            type="primary" 
+                                            size="small" 
+                                            @click="reprintReceipt(order.orderId)"
+                                            class="reprint-button">
+                                            重打小票
+                                        </el-button>
+                                        <el-button 
+                                            type="danger" 
+                                            size="small" 
+                                            @click="handleRedReverse(order)"
+                                            class="red-reverse-button"
+                                            :disabled="order.redReverse === 1">
+                                            红冲
+                                        </el-button>
+                                        <el-button 
+                                            type="danger" 
+                                            size="small" 
+                                            @click="deleteOrder(order.orderId)"
+                                            class="delete-button"
+                                            v-if="canDeleteOrder">
+                                            删除
+                                        </el-button>
+                                    </div>
+                                </td>
+                            </tr>
+                        </tbody>
+                    </table>
+                </div>
+                
+                <div v-else class="empty-table">
+                    <i class="el-icon-document" style="font-size: 48px; color: #ccc; margin-bottom: 10px;"></i>
+                    <p>暂无收费记录</p>
+                </div>
+            </div>
+        </div>
+        
+
+    </div>
+</div>
+
+<!-- 隐藏的打印区域 -->
+<div id="print-receipt" style="display: none;">
+    <div class="receipt-content">
+        <div class="receipt-header">
+            <h2>物业收费凭证</h2>
+            <div>[[ receiptData.community || user.community || '物业公司' ]]</div>
+        </div>
+        
+        <div class="receipt-info">
+            <div><span class="label">收费时间：</span>[[ receiptData.time ]]</div>
+            <div><span class="label">地址：</span>[[ receiptData.building ]]-[[ receiptData.room ]]</div>
+            <div><span class="label">姓名：</span>[[ receiptData.residentName ]]</div>
+            <div><span class="label">收款方式：</span>[[ receiptData.paymentMethod ]]</div>
+        </div>
+        
+        <div class="receipt-items">
+            <div style="font-weight: bold; margin-bottom: 5px;">收费项目：</div>
+            <div v-html="receiptData.feeItemsHtml"></div>
+        </div>
+        
+        <div class="receipt-total">
+            总计金额：[[ receiptData.totalAmount ]] 元
+        </div>
+        
+        <div class="receipt-footer">
+            <div class="bill-number">账单号：[[ receiptData.billNumber ]]</div>
+            <div>操作员：[[ user.real_name ]]</div>
+            <div>打印时间：[[ receiptData.printTime ]]</div>
+            <div style="margin-top: 10px;">------------------- 谢谢光临 -------------------</div>
+        </div>
+    </div>
+</div>
+<!-- 原页面此处缺少两个结束标签，浏览器解析时在页面末尾自动补齐；改为字符串模板后显式补上，结构不变 -->
+</div>
+</div>
+`;
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+账单号生成器并发压力测试
+
+模拟多个 gunicorn worker（多进程）× 每个 worker 多个线程同时生成账单号，
+验证：零重复、单进程内单调递增、格式保持 WD + 日期 前缀、节点号配置校验、
+账单号（含红冲后缀）不超过 orders.账单号 的列宽。
+直接运行: python test_bill_number.py
+"""
+
+import re
+import time
+import threading
+import multiprocessing
+from datetime import datetime
+
+from config import Config
+from utils import BillNumberGenerator, generate_bill_number
+
+WORKERS = 4               # 模拟的进程数
+THREADS_PER_WORKER = 4    # 每个进程的线程数
+PER_THREAD = 5000         # 每个线程生成的账单号数量
+
+BILL_PATTERN = re.compile(r'^WD(\d{14})(\d{2})(\d{7})(\d{4})$')
+
+
+def _worker(queue):
+    """子进程：多线程生成账单号，返回 (按生成顺序的列表, 耗时)"""
+    results = []
+    lock = threading.Lock()
+
+    def run():
+        local = [generate_bill_number() for _ in range(PER_THREAD)]
+        with lock:
+            results.append(local)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=run) for _ in range(THREADS_PER_WORKER)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    queue.put((results, time.perf_counter() - started))
+
+
+def run_stress():
+    ctx = multiprocessing.get_context('fork') if hasattr(multiprocessing, 'get_context') else multiprocessing
+    queue = ctx.Queue()
+
+    # 父进程先生成一个，确保 fork 后子进程会重置状态而不是复用父进程的序号
+    generate_bill_number()
+
+    processes = [ctx.Process(target=_worker, args=(queue,)) for _ in range(WORKERS)]
+    for p in processes:
+        p.start()
+    outputs = [queue.get() for _ in processes]
+    for p in processes:
+        p.join()
+
+    all_numbers = []
+    slowest = 0
+    for thread_lists, elapsed in outputs:
+        slowest = max(slowest, elapsed)
+        for numbers in thread_lists:
+            # 同一线程内按生成顺序严格递增
+            assert numbers == sorted(numbers) and len(set(numbers)) == len(numbers), '单线程内账单号不是严格递增'
+            all_numbers.extend(numbers)
+
+    total = len(all_numbers)
+    assert len(set(all_numbers)) == total, f'发现重复账单号: {total - len(set(all_numbers))} 个'
+    return total, slowest, all_numbers
+
+
+def test_no_collisions_across_workers():
+    total, elapsed, numbers = run_stress()
+    assert total == WORKERS * THREADS_PER_WORKER * PER_THREAD
+    for number in numbers[:100]:
+        assert BILL_PATTERN.match(number), f'账单号格式错误: {number}'
+    print(f"生成 {total} 个账单号，0 重复，耗时 {elapsed:.2f}s，约 {total / elapsed:.0f} 个/秒")
+
+
+def test_sequence_overflow_and_clock_rollback():
+    """序号用尽时借用下一秒；时钟回拨时不回退"""
+    generator = BillNumberGenerator(prefix='WD', node_id=1)
+    numbers = [generator.next() for _ in range(BillNumberGenerator.SEQUENCE_LIMIT * 2 + 10)]
+    assert len(set(numbers)) == len(numbers)
+    assert numbers == sorted(numbers)
+
+    generator._last_second += 5  # 模拟系统时钟被往回调
+    later = generator.next()
+    assert later > numbers[-1]
+
+
+def test_prefix_keeps_date():
+    number = generate_bill_number()
+    match = BILL_PATTERN.match(number)
+    assert match, number
+    assert match.group(1)[:8] == datetime.now().strftime('%Y%m%d')
+
+
+def test_node_id_validation():
+    """节点号超出 0-99 时报错而不是取模；多台主机未设置节点号时拒绝启动"""
+    for node_id in (-1, 100):
+        try:
+            BillNumberGenerator(node_id=node_id)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f'节点号 {node_id} 应当被拒绝')
+
+    saved = Config.BILL_NODE_ID, Config.APP_HOST_COUNT
+    try:
+        Config.BILL_NODE_ID, Config.APP_HOST_COUNT = None, 1
+        assert BillNumberGenerator().node_id == 0
+        Config.APP_HOST_COUNT = 2
+        try:
+            BillNumberGenerator()
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError('多台主机未设置 BILL_NODE_ID 时应拒绝启动')
+        Config.BILL_NODE_ID = 99
+        assert BillNumberGenerator().next()[16:18] == '99'
+    finally:
+        Config.BILL_NODE_ID, Config.APP_HOST_COUNT = saved
+
+
+def test_fits_bill_number_column():
+    from app import Order, red_reverse_bill_number
+    reversed_number = red_reverse_bill_number(generate_bill_number())
+    assert len(reversed_number) <= Order.__table__.c.账单号.type.length
+
+
+if __name__ == '__main__':
+    print("=== 账单号生成器压力测试 ===")
+    test_prefix_keeps_date()
+    print("✓ 格式: WD + 日期前缀")
+    test_sequence_overflow_and_clock_rollback()
+    print("✓ 序号溢出与时钟回拨")
+    test_node_id_validation()
+    print("✓ 节点号配置校验")
+    test_fits_bill_number_column()
+    print("✓ 红冲账单号不超过列宽")
+    test_no_collisions_across_workers()
+    print("✓ 多进程多线程并发无重复")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+进程内缓存（cache.py）测试
+
+验证：同一进程内连续递增同一个版本号不会死锁、版本号单调递增、
+递增时返回被替换的版本号、版本号变化后缓存条目失效。
+直接运行: python test_cache.py
+"""
+
+import tempfile
+import threading
+
+from cache import GenerationStamp, VersionedCache
+
+
+def _run_with_timeout(target, seconds=5):
+    """在线程中执行，超时说明发生了死锁"""
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault('value', target()), daemon=True)
+    thread.start()
+    thread.join(seconds)
+    assert not thread.is_alive(), '操作超时，疑似死锁'
+    return result['value']
+
+
+def test_bump_twice_in_one_process():
+    stamp = GenerationStamp('twice', directory=tempfile.mkdtemp())
+    _, first = _run_with_timeout(stamp.bump)
+    replaced, second = _run_with_timeout(stamp.bump)
+    assert replaced == first and second > first
+    assert stamp.current() == second
+
+
+def test_bump_reports_concurrent_writer():
+    """另一个进程（这里用同一文件的另一个实例模拟）先递增时，被替换的版本号与本进程读到的不同"""
+    directory = tempfile.mkdtemp()
+    ours = GenerationStamp('shared', directory=directory)
+    other = GenerationStamp('shared', directory=directory)
+    previous = ours.current()
+    _, theirs = other.bump()
+    replaced, generation = ours.bump()
+    assert replaced == theirs != previous
+    assert generation > theirs
+
+
+def test_invalidate_reloads_entries():
+    stamp = GenerationStamp('entries', directory=tempfile.mkdtemp())
+    cache = VersionedCache(stamp, maxsize=8)
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return len(loads)
+
+    assert cache.get('k', loader) == 1
+    assert cache.get('k', loader) == 1
+    _run_with_timeout(cache.invalidate)
+    _run_with_timeout(cache.invalidate)
+    assert cache.get('k', loader) == 2
+
+
+if __name__ == '__main__':
+    print("=== 缓存模块测试 ===")
+    test_bump_twice_in_one_process()
+    print("✓ 同一进程连续递增版本号")
+    test_bump_reports_concurrent_writer()
+    print("✓ 递增时返回被替换的版本号")
+    test_invalidate_reloads_entries()
+    print("✓ 版本号变化后重新加载")
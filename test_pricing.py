@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+计价引擎（pricing.py）测试
+
+验证：费用项金额按整数分四舍五入校验、数量为0只允许退费、未配置单价按手工金额收取、
+合计金额须与各费用项之和一致、非数字输入抛出 PricingError、批量报价与逐行计算结果一致。
+直接运行: python test_pricing.py
+"""
+
+from decimal import Decimal
+
+import pricing
+from pricing import PricingEngine, PricingError
+
+ENGINE = PricingEngine({'water': 5.5, 'electricity': 0.85, 'rent': 1200, 'network': 50, 'other': None})
+
+
+def _raises(func, *args):
+    """调用应抛出 PricingError，返回该异常"""
+    try:
+        func(*args)
+    except PricingError as e:
+        return e
+    raise AssertionError(f'{func.__name__}{args} 未抛出 PricingError')
+
+
+def test_check_line_rounds_half_up():
+    # 1.5 × 0.85 = 1.275，四舍五入为 1.28
+    assert ENGINE.check_line('electricity', '1.5', '1.28') == 128
+    # 退费金额为负数，按绝对值校验
+    assert ENGINE.check_line('water', 2, -11) == -1100
+
+
+def test_check_line_tolerates_rounded_quantity():
+    """工作台按金额反推数量时数量保留一位小数，金额在半个步长之内均可通过"""
+    # 100 元电费反推数量 117.6（117.6 × 0.85 = 99.96）
+    assert ENGINE.check_line('electricity', '117.6', 100) == 10000
+    error = _raises(ENGINE.check_line, 'electricity', '117.6', 101)
+    assert error.fee_type == 'electricity' and error.expected == 9996
+    # 网费按整月计，误差不超过半个月的费用
+    assert ENGINE.check_line('network', 1, 75) == 7500
+    _raises(ENGINE.check_line, 'network', 1, '75.01')
+
+
+def test_check_line_zero_and_negative_quantity():
+    assert ENGINE.check_line('rent', 0, -300) == -30000
+    assert _raises(ENGINE.check_line, 'rent', 0, 300).expected == 0
+    _raises(ENGINE.check_line, 'rent', -1, 1200)
+
+
+def test_check_line_unpriced_and_explicit_price():
+    assert ENGINE.check_line('other', 0, '12.34') == 1234
+    assert ENGINE.check_line('parking', 3, 99) == 9900
+    # 指定单价时以指定单价为准
+    assert ENGINE.check_line('water', 2, 12, unit_price=6) == 1200
+    _raises(ENGINE.check_line, 'water', 2, 11, 6)
+
+
+def test_check_line_rejects_non_numeric():
+    for quantity, amount in (('abc', 1), (1, 'abc'), (1, 'inf'), ('NaN', 1), ([], 1)):
+        error = _raises(ENGINE.check_line, 'water', quantity, amount, None, '水费')
+        assert error.fee_type == 'water' and '水费' in str(error)
+    # 未配置单价的费用项同样校验格式
+    _raises(ENGINE.check_line, 'other', 'x', 1)
+
+
+def test_check_order():
+    lines = [('water', 2, 11, None), ('electricity', '1.5', '1.28', None), ('other', 0, 5, None)]
+    amounts, total = ENGINE.check_order(lines, '17.28')
+    assert amounts == {'water': 1100, 'electricity': 128, 'other': 500} and total == 1728
+
+    error = _raises(ENGINE.check_order, lines, '17.27')
+    assert error.fee_type is None and error.expected == 1728
+    assert '合计金额' in str(_raises(ENGINE.check_order, lines, 'abc'))
+    assert '水费' in str(_raises(ENGINE.check_order, [('water', 2, 12, None)], 12, {'water': '水费'}))
+
+
+def test_quote_batch():
+    fee_types = ['rent', 'electricity', 'other', 'water']
+    quantities = [1, '1.5', 3, Decimal('-2')]
+    assert ENGINE.quote_batch(fee_types, quantities) == [120000, 128, None, -1100]
+    assert ENGINE.quote_batch([], []) == []
+    # 逐行计算与批量（numpy 向量运算）结果一致
+    expected = [ENGINE.amount(fee_type, quantity) for fee_type, quantity in zip(fee_types, quantities)]
+    assert ENGINE.quote_batch(fee_types, quantities) == expected
+
+
+def test_quote_batch_overflow_falls_back():
+    """数量 × 单价超出 int64 安全范围时逐行计算，结果仍然精确"""
+    quantity = pricing._INT64_SAFE // 100
+    engine = PricingEngine({'rent': 1200})
+    assert engine.quote_batch(['rent'], [quantity]) == [quantity * 120000]
+
+
+if __name__ == '__main__':
+    print("=== 计价引擎测试 ===")
+    test_check_line_rounds_half_up()
+    print("✓ 费用项金额四舍五入")
+    test_check_line_tolerates_rounded_quantity()
+    print("✓ 反推数量的取整误差")
+    test_check_line_zero_and_negative_quantity()
+    print("✓ 数量为0与负数")
+    test_check_line_unpriced_and_explicit_price()
+    print("✓ 未配置单价与指定单价")
+    test_check_line_rejects_non_numeric()
+    print("✓ 非数字输入")
+    test_check_order()
+    print("✓ 整单合计校验")
+    test_quote_batch()
+    print("✓ 批量报价")
+    test_quote_batch_overflow_falls_back()
+    print("✓ 超出 int64 范围时逐行计算")
@@ -2,44 +2,153 @@
 公寓物业收费系统 - 工具函数模块
 """
 
+import os
+import time
+import base64
+import json
+import logging
+import threading
 from datetime import datetime
-from flask import request, current_app
+from decimal import Decimal
+from flask import request, current_app, has_request_context
 import jwt
 from werkzeug.security import generate_password_hash, check_password_hash
 from config import Config
 
 
+class BillNumberGenerator:
+    """
+    账单号生成器：不访问数据库，多进程、多主机下保证唯一且单进程内单调递增
+    格式: 前缀 + 年月日时分秒(14位) + 节点号(2位) + 进程号(7位) + 秒内序号(4位)
+    例如：WD20251209010158 01 0012345 0000（实际无空格）
+
+    - 节点号来自 Config.BILL_NODE_ID（0-99），每台应用主机配置不同的值；
+      Config.APP_HOST_COUNT 大于1而未设置节点号时拒绝启动
+    - 进程号区分同一主机上的 gunicorn worker，fork 后自动重置
+    - 同一秒内序号递增；用尽或时钟回拨时沿用/借用下一秒，不会重复
+    """
+
+    SEQUENCE_LIMIT = 10000
+
+    def __init__(self, prefix=None, node_id=None):
+        self.prefix = prefix if prefix is not None else Config.BILL_PREFIX
+        self.node_id = self._resolve_node_id(node_id)
+        self._lock = threading.Lock()
+        self._reset()
+
+    @staticmethod
+    def _resolve_node_id(node_id):
+        if node_id is None:
+            node_id = Config.BILL_NODE_ID
+        if node_id is None:
+            if Config.APP_HOST_COUNT > 1:
+                raise RuntimeError(
+                    f'APP_HOST_COUNT={Config.APP_HOST_COUNT}，多台应用主机部署时必须为每台主机设置不同的 BILL_NODE_ID（0-99）')
+            return 0
+        if not 0 <= node_id <= 99:
+            raise ValueError(f'BILL_NODE_ID 必须在 0-99 之间: {node_id}')
+        return node_id
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._last_second = 0
+        self._sequence = 0
+
+    def next(self):
+        with self._lock:
+            if os.getpid() != self._pid:
+                self._reset()
+
+            now = int(time.time())
+            if now > self._last_second:
+                self._last_second = now
+                self._sequence = 0
+            else:
+                self._sequence += 1
+                if self._sequence >= self.SEQUENCE_LIMIT:
+                    self._last_second += 1
+                    self._sequence = 0
+            second, sequence, pid = self._last_second, self._sequence, self._pid
+
+        date_part = datetime.fromtimestamp(second).strftime('%Y%m%d%H%M%S')
+        return f"{self.prefix}{date_part}{self.node_id:02d}{pid % 10000000:07d}{sequence:04d}"
+
+
+_bill_number_generator = BillNumberGenerator()
+
+
 def generate_bill_number():
     """
-    生成格式为 WD + 年月日 + 时分秒 + 3位随机数 的账单号
-    例如：WD20251209010158999
+    生成唯一账单号（WD + 年月日时分秒 + 节点号 + 进程号 + 序号）
+    例如：WD2025120901015801001234500000
     """
-    from datetime import datetime
-    import random
-    
-    date_part = datetime.now().strftime('%Y%m%d%H%M%S')
-    random_suffix = f"{random.randint(100, 999):03d}"
-    return f"{Config.BILL_PREFIX}{date_part}{random_suffix}"
+    return _bill_number_generator.next()
+
+
+def encode_cursor(payload):
+    """
+    将分页游标信息编码为不透明字符串（URL安全的base64 JSON）
+    payload中的datetime/Decimal会被转换为字符串
+    """
+    def _default(value):
+        if isinstance(value, datetime):
+            return value.strftime('%Y-%m-%d %H:%M:%S.%f')
+        if isinstance(value, Decimal):
+            return str(value)
+        raise TypeError(f'无法编码的游标值: {value!r}')
+
+    raw = json.dumps(payload, default=_default, separators=(',', ':'), ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """解码分页游标，格式错误时抛出 ValueError"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+    except Exception:
+        raise ValueError('无效的分页游标')
+    if not isinstance(payload, dict) or type(payload.get('id')) is not int:
+        raise ValueError('无效的分页游标')
+    if 'v' in payload and type(payload['v']) not in (str, int):
+        raise ValueError('无效的分页游标')
+    return payload
+
+
+logger = logging.getLogger(__name__)
+
+# 操作日志写入器，由 app.py 注册（见 oplog_writer.OperationLogWriter）；未注册时只写应用日志
+_operation_log_writer = None
+
+
+def set_operation_log_writer(writer):
+    global _operation_log_writer
+    _operation_log_writer = writer
 
 
 def log_operation(user_account, operation_type, details, community_num=None, commit_to_db=True):
     """
-    记录操作日志（简化版：仅打印到控制台，避免数据库上下文问题）
+    记录操作日志：放入后台写入队列后立即返回，由写入线程批量插入 operation_logs
+    commit_to_db 参数保留兼容，日志总是异步写入
     """
-    # 暂时不操作数据库，仅打印日志
-    log_msg = f"[操作日志] 用户: {user_account}, 操作: {operation_type}, 详情: {details}"
-    print(log_msg)
+    if _operation_log_writer is None:
+        logger.warning(f"[操作日志] 写入器未注册，未入库 - 用户: {user_account}, 操作: {operation_type}, 详情: {details}")
+        return
+    
+    ip = None
+    if has_request_context():
+        forwarded = request.headers.get('X-Forwarded-For', '')
+        ip = forwarded.split(',')[0].strip() or request.remote_addr
     
-    # 可选：未来恢复数据库记录时，再启用下面的代码
-    # try:
-    #     from app import db, OperationLog
-    #     with current_app.app_context():
-    #         log = OperationLog(...)
-    #         db.session.add(log)
-    #         if commit_to_db:
-    #             db.session.commit()
-    # except Exception as e:
-    #     print(f"[日志记录失败] {e}")
+    _operation_log_writer.submit({
+        '用户账号': user_account,
+        '操作时间': datetime.now(),
+        '电脑IP': ip[:50] if ip else None,
+        '电脑名称': None,
+        '操作类型': operation_type[:100],
+        '操作详情': details,
+        '小区编号': community_num
+    })
 
 
 def verify_password(stored_hashed_password, provided_password):
@@ -0,0 +1,12 @@
+"""
+公寓物业收费系统 - WSGI 入口
+
+生产环境通过 gunicorn 启动（配置见 gunicorn.conf.py）:
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+from app import app, db
+
+# preload_app 模式下只在 master 进程执行一次；worker fork 后会丢弃继承的连接
+with app.app_context():
+    db.create_all()